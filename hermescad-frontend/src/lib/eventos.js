@@ -0,0 +1,37 @@
+import { useEffect, useRef } from 'react'
+
+// Uma única conexão com /api/events para a página inteira; o EventSource
+// reconecta sozinho e envia o Last-Event-ID do último evento recebido
+let fonte = null
+const inscritos = new Map()
+
+function conectar() {
+  fonte = new EventSource('/api/events')
+  for (const tipo of ['entidade', 'campanha', 'reset']) {
+    fonte.addEventListener(tipo, (evento) => {
+      const dados = JSON.parse(evento.data)
+      for (const callback of inscritos.get(tipo) ?? []) callback(dados)
+    })
+  }
+}
+
+function inscrever(tipo, callback) {
+  if (!fonte) conectar()
+  if (!inscritos.has(tipo)) inscritos.set(tipo, new Set())
+  inscritos.get(tipo).add(callback)
+  return () => {
+    inscritos.get(tipo).delete(callback)
+    if ([...inscritos.values()].every((callbacks) => callbacks.size === 0)) {
+      fonte.close()
+      fonte = null
+    }
+  }
+}
+
+// Chama `callback(dados)` a cada evento `tipo` ('entidade', 'campanha' ou 'reset')
+export function useEvento(tipo, callback) {
+  const atual = useRef(callback)
+  atual.current = callback
+
+  useEffect(() => inscrever(tipo, (dados) => atual.current(dados)), [tipo])
+}
@@ -0,0 +1,59 @@
+import { useCallback, useEffect, useRef, useState } from 'react'
+import { useEvento } from '@/lib/eventos.js'
+
+// Aplica as exclusões e depois as linhas alteradas (novas vão para o fim, por id)
+function mesclar(atuais, alterados, excluidos) {
+  const porId = new Map(alterados.map((item) => [item.id, item]))
+  const removidos = new Set(excluidos.filter((id) => !porId.has(id)))
+  const resultado = []
+  for (const item of atuais) {
+    if (removidos.has(item.id)) continue
+    resultado.push(porId.get(item.id) ?? item)
+    porId.delete(item.id)
+  }
+  return resultado.concat([...porId.values()].sort((a, b) => a.id - b.id))
+}
+
+// Lista carregada uma vez e depois atualizada só com as alterações (?updated_since=);
+// com `entidade`, sincroniza sozinha quando o feed /api/events avisa uma alteração
+export function useColecaoSincronizada(url, entidade = null) {
+  const [itens, setItens] = useState([])
+  const token = useRef(null)
+
+  const recarregar = useCallback(async () => {
+    const response = await fetch(url)
+    if (!response.ok) throw new Error(response.statusText)
+    token.current = response.headers.get('X-Sync-Token')
+    setItens(await response.json())
+  }, [url])
+
+  const sincronizar = useCallback(async () => {
+    try {
+      if (!token.current) return await recarregar()
+      const separador = url.includes('?') ? '&' : '?'
+      const response = await fetch(`${url}${separador}updated_since=${encodeURIComponent(token.current)}`)
+      // Token expirado: recarrega a lista inteira
+      if (response.status === 410) return await recarregar()
+      if (!response.ok) throw new Error(response.statusText)
+      const { items, deleted, sync_token } = await response.json()
+      token.current = sync_token
+      setItens((atuais) => mesclar(atuais, items, deleted))
+    } catch (error) {
+      console.error(`Erro ao sincronizar ${url}:`, error)
+    }
+  }, [url, recarregar])
+
+  useEffect(() => {
+    sincronizar()
+  }, [sincronizar])
+
+  useEvento('entidade', (dados) => {
+    if (entidade && dados.entidade === entidade) sincronizar()
+  })
+  // Eventos perdidos (servidor reiniciado ou desconexão longa): sincroniza por garantia
+  useEvento('reset', () => {
+    if (entidade) sincronizar()
+  })
+
+  return { itens, sincronizar }
+}
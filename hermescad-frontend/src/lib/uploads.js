@@ -0,0 +1,63 @@
+// Arquivos acima disso vão em partes por /api/mala_direta/uploads, que
+// continua de onde parou se a conexão cair
+const LIMITE_ENVIO_UNICO = 8 * 1024 * 1024
+const TAMANHO_PARTE = 4 * 1024 * 1024
+const TENTATIVAS = 5
+
+async function lerJson(response) {
+  const data = await response.json().catch(() => ({}))
+  if (!response.ok && response.status !== 409) {
+    throw new Error(data.error || `Erro ${response.status} no upload`)
+  }
+  return data
+}
+
+// SHA-256 do arquivo em hex, conferido pelo servidor ao final; fora de
+// contexto seguro (http sem localhost) crypto.subtle não existe e o envio
+// segue sem a conferência
+async function calcularSha256(file) {
+  if (!globalThis.crypto?.subtle) return undefined
+  const hash = await crypto.subtle.digest('SHA-256', await file.arrayBuffer())
+  return Array.from(new Uint8Array(hash), (byte) => byte.toString(16).padStart(2, '0')).join('')
+}
+
+async function enviarEmPartes(file) {
+  let upload = await lerJson(await fetch('/api/mala_direta/uploads', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ nome: file.name, tamanho: file.size, sha256: await calcularSha256(file) })
+  }))
+  const url = `/api/mala_direta/uploads/${upload.upload_id}`
+  let recebido = 0
+  let falhas = 0
+
+  while (true) {
+    const fim = Math.min(recebido + TAMANHO_PARTE, file.size)
+    try {
+      const response = await fetch(url, {
+        method: 'PUT',
+        headers: { 'Content-Range': `bytes ${recebido}-${fim - 1}/${file.size}` },
+        body: file.slice(recebido, fim)
+      })
+      const data = await lerJson(response)
+      // 201: arquivo completo; 409: o servidor indica de onde continuar
+      if (response.status === 201) return data
+      recebido = data.recebido
+      falhas = 0
+    } catch (error) {
+      if (++falhas >= TENTATIVAS) throw error
+      await new Promise((resolve) => setTimeout(resolve, 1000 * falhas))
+      // Conexão perdida: pergunta ao servidor quanto chegou
+      upload = await lerJson(await fetch(url))
+      recebido = upload.recebido
+    }
+  }
+}
+
+// Envia o arquivo e retorna o anexo ({ id, nome, tamanho, ... }); campanhas usam o id
+export async function enviarArquivo(file) {
+  if (file.size > LIMITE_ENVIO_UNICO) return enviarEmPartes(file)
+  const formData = new FormData()
+  formData.append('file', file)
+  return lerJson(await fetch('/api/mala_direta/upload', { method: 'POST', body: formData }))
+}
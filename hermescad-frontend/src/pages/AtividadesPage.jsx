@@ -9,9 +9,11 @@ import { Dialog, DialogContent, DialogDescription, DialogHeader, DialogTitle, Di
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '@/components/ui/table.jsx'
 import { Badge } from '@/components/ui/badge.jsx'
 import { Plus, Edit, Trash2, Activity, Calendar, Clock } from 'lucide-react'
+import { useColecaoSincronizada } from '@/lib/sincronizacao.js'
 
 function AtividadesPage() {
-  const [atividades, setAtividades] = useState([])
+  // Depois da carga inicial, salvar ou excluir baixa só as alterações
+  const { itens: atividades, sincronizar: fetchAtividades } = useColecaoSincronizada('/api/atividades', 'atividade')
   const [clientes, setClientes] = useState([])
   const [oportunidades, setOportunidades] = useState([])
   const [isDialogOpen, setIsDialogOpen] = useState(false)
@@ -50,24 +52,13 @@ function AtividadesPage() {
   }
 
   useEffect(() => {
-    fetchAtividades()
     fetchClientes()
     fetchOportunidades()
   }, [])
 
-  const fetchAtividades = async () => {
-    try {
-      const response = await fetch('/api/atividades')
-      const data = await response.json()
-      setAtividades(data)
-    } catch (error) {
-      console.error('Erro ao buscar atividades:', error)
-    }
-  }
-
   const fetchClientes = async () => {
     try {
-      const response = await fetch('/api/clientes')
+      const response = await fetch('/api/clientes?fields=id,nome')
       const data = await response.json()
       setClientes(data)
     } catch (error) {
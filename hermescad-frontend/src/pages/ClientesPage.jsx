@@ -1,5 +1,5 @@
 
-import { useState, useEffect } from 'react'
+import { useState } from 'react'
 import { Button } from '@/components/ui/button.jsx'
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card.jsx'
 import { Input } from '@/components/ui/input.jsx'
@@ -7,9 +7,11 @@ import { Label } from '@/components/ui/label.jsx'
 import { Dialog, DialogContent, DialogDescription, DialogHeader, DialogTitle, DialogTrigger } from '@/components/ui/dialog.jsx'
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '@/components/ui/table.jsx'
 import { Plus, Edit, Trash2, Mail, Phone } from 'lucide-react'
+import { useColecaoSincronizada } from '@/lib/sincronizacao.js'
 
 function ClientesPage() {
-  const [clientes, setClientes] = useState([])
+  // Depois da carga inicial, salvar ou excluir baixa só as alterações
+  const { itens: clientes, sincronizar: fetchClientes } = useColecaoSincronizada('/api/clientes', 'cliente')
   const [isDialogOpen, setIsDialogOpen] = useState(false)
   const [editingCliente, setEditingCliente] = useState(null)
   const [formData, setFormData] = useState({
@@ -26,20 +28,6 @@ function ClientesPage() {
     cargo: ''
   })
 
-  useEffect(() => {
-    fetchClientes()
-  }, [])
-
-  const fetchClientes = async () => {
-    try {
-      const response = await fetch('/api/clientes')
-      const data = await response.json()
-      setClientes(data)
-    } catch (error) {
-      console.error('Erro ao buscar clientes:', error)
-    }
-  }
-
   const handleSubmit = async (e) => {
     e.preventDefault()
     
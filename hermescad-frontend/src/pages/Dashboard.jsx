@@ -14,19 +14,14 @@ function Dashboard() {
     // Buscar estatísticas do backend
     const fetchStats = async () => {
       try {
-        const [clientesRes, atividadesRes] = await Promise.all([
-          fetch('/api/clientes'),
-          fetch('/api/atividades')
-        ])
-
-        const clientes = await clientesRes.json()
-        const atividades = await atividadesRes.json()
+        const response = await fetch('/api/dashboard/stats')
+        const data = await response.json()
 
         setStats({
-          totalClientes: clientes.length,
-          totalCampanhas: 0, // Será implementado futuramente
-          totalAtividades: atividades.length,
-          campanhasEnviadas: 0 // Será implementado futuramente
+          totalClientes: data.total_clientes,
+          totalCampanhas: data.total_campanhas,
+          totalAtividades: data.total_atividades,
+          campanhasEnviadas: data.campanhas_enviadas
         })
       } catch (error) {
         console.error('Erro ao buscar estatísticas:', error)
@@ -6,14 +6,22 @@ import { Input } from '@/components/ui/input.jsx'
 import { Label } from '@/components/ui/label.jsx'
 import { Textarea } from '@/components/ui/textarea.jsx'
 import { Checkbox } from '@/components/ui/checkbox.jsx'
+import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select.jsx'
 import { Alert, AlertDescription } from '@/components/ui/alert.jsx'
 import { Mail, MessageCircle, Upload, Send, Users, CheckCircle, AlertCircle } from 'lucide-react'
+import { useEvento } from '@/lib/eventos.js'
+import { enviarArquivo } from '@/lib/uploads.js'
 
 export default function MalaDiretaPage() {
   const [clientes, setClientes] = useState([])
   const [selectedClients, setSelectedClients] = useState([])
+  // Segmentos salvos; com um segmento escolhido o servidor resolve os destinatários
+  const [segmentos, setSegmentos] = useState([])
+  const [segmentoId, setSegmentoId] = useState('manual')
   const [loading, setLoading] = useState(false)
   const [message, setMessage] = useState({ type: '', content: '' })
+  // Última campanha enviada desta página, com o progresso vindo de /api/events
+  const [campanha, setCampanha] = useState(null)
 
   // Estados para formulário de e-mail
   const [emailForm, setEmailForm] = useState({
@@ -31,11 +39,12 @@ export default function MalaDiretaPage() {
   // Carregar clientes ao montar o componente
   useEffect(() => {
     fetchClientes()
+    fetchSegmentos()
   }, [])
 
   const fetchClientes = async () => {
     try {
-      const response = await fetch('/api/clientes')
+      const response = await fetch('/api/clientes?fields=id,nome,email,numero_celular,possui_whatsapp')
       if (response.ok) {
         const data = await response.json()
         setClientes(data)
@@ -47,6 +56,40 @@ export default function MalaDiretaPage() {
     }
   }
 
+  const fetchSegmentos = async () => {
+    try {
+      const response = await fetch('/api/segmentos')
+      if (response.ok) {
+        setSegmentos(await response.json())
+      }
+    } catch (error) {
+      console.error('Erro ao carregar segmentos:', error)
+    }
+  }
+
+  const segmento = segmentos.find(item => String(item.id) === segmentoId)
+  const semDestinatarios = !segmento && selectedClients.length === 0
+  const destinatarios = () => (segmento ? { segmento_id: segmento.id } : { client_ids: selectedClients })
+
+  // Progresso a cada lote enviado
+  useEvento('campanha', (dados) => {
+    if (campanha && dados.id === campanha.id) setCampanha(dados)
+  })
+
+  // Fim, cancelamento ou falha da campanha: busca o estado final
+  useEvento('entidade', async (dados) => {
+    if (!campanha || dados.entidade !== 'campanha' || !dados.ids?.includes(campanha.id)) return
+    try {
+      const response = await fetch(`/api/mala_direta/campanhas/${campanha.id}`)
+      if (response.ok) {
+        const data = await response.json()
+        setCampanha({ id: data.id, status: data.status, enviados: data.enviados, falhas: data.falhas, total: data.total_destinatarios })
+      }
+    } catch (error) {
+      console.error('Erro ao atualizar a campanha:', error)
+    }
+  })
+
   const showMessage = (type, content) => {
     setMessage({ type, content })
     setTimeout(() => setMessage({ type: '', content: '' }), 5000)
@@ -69,40 +112,29 @@ export default function MalaDiretaPage() {
   }
 
   const handleFileUpload = async (file, type) => {
-    const formData = new FormData()
-    formData.append('file', file)
-
     try {
-      const response = await fetch('/api/mala_direta/upload', {
-        method: 'POST',
-        body: formData
-      })
-
-      if (response.ok) {
-        const data = await response.json()
-        if (type === 'email') {
-          setEmailForm(prev => ({
-            ...prev,
-            attachments: [...prev.attachments, data.file_path]
-          }))
-        } else if (type === 'whatsapp') {
-          setWhatsappForm(prev => ({
-            ...prev,
-            image: data.file_path
-          }))
-        }
-        showMessage('success', 'Arquivo enviado com sucesso')
-      } else {
-        showMessage('error', 'Erro ao enviar arquivo')
+      // Anexos são referenciados pelo id devolvido no upload
+      const anexo = await enviarArquivo(file)
+      if (type === 'email') {
+        setEmailForm(prev => ({
+          ...prev,
+          attachments: [...prev.attachments, anexo]
+        }))
+      } else if (type === 'whatsapp') {
+        setWhatsappForm(prev => ({
+          ...prev,
+          image: anexo
+        }))
       }
+      showMessage('success', 'Arquivo enviado com sucesso')
     } catch (error) {
-      showMessage('error', 'Erro ao conectar com o servidor')
+      showMessage('error', error.message || 'Erro ao enviar arquivo')
     }
   }
 
   const sendEmail = async () => {
-    if (selectedClients.length === 0) {
-      showMessage('error', 'Selecione pelo menos um cliente')
+    if (semDestinatarios) {
+      showMessage('error', 'Selecione pelo menos um cliente ou um segmento')
       return
     }
 
@@ -119,16 +151,17 @@ export default function MalaDiretaPage() {
           'Content-Type': 'application/json'
         },
         body: JSON.stringify({
-          client_ids: selectedClients,
+          ...destinatarios(),
           subject: emailForm.subject,
           body: emailForm.body,
-          attachments: emailForm.attachments
+          attachments: emailForm.attachments.map(anexo => anexo.id)
         })
       })
 
       const data = await response.json()
       if (response.ok) {
-        showMessage('success', `E-mails enviados com sucesso! ${data.sent_count}/${data.total_clients} enviados`)
+        showMessage('success', `Campanha #${data.campanha_id} na fila de envio para ${data.total_clients} clientes`)
+        setCampanha({ id: data.campanha_id, status: data.status, enviados: 0, falhas: 0, total: data.total_clients })
         setEmailForm({ subject: '', body: '', attachments: [] })
       } else {
         showMessage('error', data.error || 'Erro ao enviar e-mails')
@@ -141,8 +174,8 @@ export default function MalaDiretaPage() {
   }
 
   const sendWhatsApp = async () => {
-    if (selectedClients.length === 0) {
-      showMessage('error', 'Selecione pelo menos um cliente')
+    if (semDestinatarios) {
+      showMessage('error', 'Selecione pelo menos um cliente ou um segmento')
       return
     }
 
@@ -159,15 +192,17 @@ export default function MalaDiretaPage() {
           'Content-Type': 'application/json'
         },
         body: JSON.stringify({
-          client_ids: selectedClients,
+          ...destinatarios(),
           message: whatsappForm.message,
-          image_path: whatsappForm.image
+          image_id: whatsappForm.image?.id
         })
       })
 
       const data = await response.json()
       if (response.ok) {
-        showMessage('success', `Mensagens WhatsApp enviadas! ${data.sent_count}/${data.total_clients} enviadas`)
+        const semWhatsApp = data.failed_count ? ` (${data.failed_count} sem WhatsApp ou com celular inválido)` : ''
+        showMessage('success', `Campanha #${data.campanha_id} na fila de envio para ${data.total_clients} clientes${semWhatsApp}`)
+        setCampanha({ id: data.campanha_id, status: data.status, enviados: 0, falhas: data.failed_count, total: data.total_clients })
         setWhatsappForm({ message: '', image: null })
       } else {
         showMessage('error', data.error || 'Erro ao enviar mensagens WhatsApp')
@@ -195,6 +230,16 @@ export default function MalaDiretaPage() {
         </Alert>
       )}
 
+      {campanha && (
+        <Alert>
+          <Send className="h-4 w-4" />
+          <AlertDescription>
+            Campanha #{campanha.id} ({campanha.status}): {campanha.enviados} de {campanha.total} enviados
+            {campanha.falhas > 0 && `, ${campanha.falhas} com falha`}
+          </AlertDescription>
+        </Alert>
+      )}
+
       <div className="grid grid-cols-1 lg:grid-cols-3 gap-6">
         {/* Seleção de Clientes */}
         <Card className="lg:col-span-1">
@@ -204,11 +249,32 @@ export default function MalaDiretaPage() {
               Selecionar Clientes
             </CardTitle>
             <CardDescription>
-              Escolha os clientes que receberão a campanha
+              Escolha os clientes ou um segmento que receberá a campanha
             </CardDescription>
           </CardHeader>
           <CardContent>
             <div className="space-y-4">
+              <Select value={segmentoId} onValueChange={setSegmentoId}>
+                <SelectTrigger>
+                  <SelectValue placeholder="Destinatários" />
+                </SelectTrigger>
+                <SelectContent>
+                  <SelectItem value="manual">Seleção manual</SelectItem>
+                  {segmentos.map((item) => (
+                    <SelectItem key={item.id} value={String(item.id)}>
+                      {item.nome} ({item.total ?? '?'} clientes)
+                    </SelectItem>
+                  ))}
+                </SelectContent>
+              </Select>
+
+              {segmento ? (
+                <div className="text-sm text-gray-600">
+                  A campanha será enviada aos {segmento.total ?? ''} clientes do segmento "{segmento.nome}",
+                  avaliado no momento do envio
+                </div>
+              ) : (
+              <>
               <div className="flex items-center space-x-2">
                 <Checkbox
                   id="select-all"
@@ -233,7 +299,7 @@ export default function MalaDiretaPage() {
                         <div className="font-medium">{cliente.nome}</div>
                         <div className="text-sm text-gray-500">
                           {cliente.email && <div>📧 {cliente.email}</div>}
-                          {cliente.telefone && <div>📱 {cliente.telefone}</div>}
+                          {cliente.numero_celular && <div>📱 {cliente.numero_celular}{cliente.possui_whatsapp ? ' (WhatsApp)' : ''}</div>}
                         </div>
                       </div>
                     </Label>
@@ -244,6 +310,8 @@ export default function MalaDiretaPage() {
               <div className="text-sm text-gray-600">
                 {selectedClients.length} cliente(s) selecionado(s)
               </div>
+              </>
+              )}
             </div>
           </CardContent>
         </Card>
@@ -291,6 +359,9 @@ export default function MalaDiretaPage() {
                       value={emailForm.body}
                       onChange={(e) => setEmailForm(prev => ({ ...prev, body: e.target.value }))}
                     />
+                    <p className="mt-1 text-sm text-gray-500">
+                      {'Personalize com {{ nome }}, {{ cargo }} ou {{ area_atuacao }}'}
+                    </p>
                   </div>
                   
                   <div>
@@ -310,14 +381,14 @@ export default function MalaDiretaPage() {
                     </div>
                     {emailForm.attachments.length > 0 && (
                       <div className="mt-2 text-sm text-gray-600">
-                        {emailForm.attachments.length} arquivo(s) anexado(s)
+                        {emailForm.attachments.length} arquivo(s) anexado(s): {emailForm.attachments.map(anexo => anexo.nome).join(', ')}
                       </div>
                     )}
                   </div>
                   
                   <Button 
                     onClick={sendEmail} 
-                    disabled={loading || selectedClients.length === 0}
+                    disabled={loading || semDestinatarios}
                     className="w-full"
                   >
                     <Send className="h-4 w-4 mr-2" />
@@ -346,6 +417,9 @@ export default function MalaDiretaPage() {
                       value={whatsappForm.message}
                       onChange={(e) => setWhatsappForm(prev => ({ ...prev, message: e.target.value }))}
                     />
+                    <p className="mt-1 text-sm text-gray-500">
+                      {'Personalize com {{ nome }}, {{ cargo }} ou {{ area_atuacao }}'}
+                    </p>
                   </div>
                   
                   <div>
@@ -365,21 +439,14 @@ export default function MalaDiretaPage() {
                     </div>
                     {whatsappForm.image && (
                       <div className="mt-2 text-sm text-gray-600">
-                        Imagem anexada
+                        Imagem anexada: {whatsappForm.image.nome}
                       </div>
                     )}
                   </div>
                   
-                  <Alert className="border-yellow-500 bg-yellow-50">
-                    <AlertCircle className="h-4 w-4" />
-                    <AlertDescription>
-                      Esta é uma implementação de demonstração. Para uso em produção, configure uma API oficial do WhatsApp Business.
-                    </AlertDescription>
-                  </Alert>
-                  
                   <Button 
                     onClick={sendWhatsApp} 
-                    disabled={loading || selectedClients.length === 0}
+                    disabled={loading || semDestinatarios}
                     className="w-full"
                   >
                     <Send className="h-4 w-4 mr-2" />
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState } from 'react'
 import { Button } from '@/components/ui/button.jsx'
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card.jsx'
 import { Input } from '@/components/ui/input.jsx'
@@ -7,9 +7,11 @@ import { Textarea } from '@/components/ui/textarea.jsx'
 import { Dialog, DialogContent, DialogDescription, DialogHeader, DialogTitle, DialogTrigger } from '@/components/ui/dialog.jsx'
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '@/components/ui/table.jsx'
 import { Plus, Edit, Trash2, Package, DollarSign } from 'lucide-react'
+import { useColecaoSincronizada } from '@/lib/sincronizacao.js'
 
 function ProdutosPage() {
-  const [produtos, setProdutos] = useState([])
+  // Depois da carga inicial, salvar ou excluir baixa só as alterações
+  const { itens: produtos, sincronizar: fetchProdutos } = useColecaoSincronizada('/api/produtos', 'produto')
   const [isDialogOpen, setIsDialogOpen] = useState(false)
   const [editingProduto, setEditingProduto] = useState(null)
   const [formData, setFormData] = useState({
@@ -18,20 +20,6 @@ function ProdutosPage() {
     preco: ''
   })
 
-  useEffect(() => {
-    fetchProdutos()
-  }, [])
-
-  const fetchProdutos = async () => {
-    try {
-      const response = await fetch('/api/produtos')
-      const data = await response.json()
-      setProdutos(data)
-    } catch (error) {
-      console.error('Erro ao buscar produtos:', error)
-    }
-  }
-
   const formatCurrency = (value) => {
     return new Intl.NumberFormat('pt-BR', {
       style: 'currency',
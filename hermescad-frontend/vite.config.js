@@ -2,10 +2,44 @@ import { defineConfig } from 'vite'
 import react from '@vitejs/plugin-react'
 import tailwindcss from '@tailwindcss/vite'
 import path from 'path'
+import fs from 'fs'
+import zlib from 'zlib'
+
+// Gera variantes .gz e .br dos arquivos do build; o backend (utils/estaticos.py)
+// escolhe a variante conforme o Accept-Encoding, sem comprimir a cada requisição
+function precomprimir({ tamanhoMinimo = 1024 } = {}) {
+  const extensoes = /\.(js|mjs|css|html|svg|json|txt|ico)$/
+  let pastaSaida
+  return {
+    name: 'precomprimir',
+    apply: 'build',
+    configResolved(config) {
+      pastaSaida = path.resolve(config.root, config.build.outDir)
+    },
+    closeBundle() {
+      const percorrer = (pasta) => {
+        for (const entrada of fs.readdirSync(pasta, { withFileTypes: true })) {
+          const caminho = path.join(pasta, entrada.name)
+          if (entrada.isDirectory()) {
+            percorrer(caminho)
+          } else if (extensoes.test(entrada.name)) {
+            const conteudo = fs.readFileSync(caminho)
+            if (conteudo.length < tamanhoMinimo) continue
+            fs.writeFileSync(`${caminho}.gz`, zlib.gzipSync(conteudo, { level: 9 }))
+            fs.writeFileSync(`${caminho}.br`, zlib.brotliCompressSync(conteudo, {
+              params: { [zlib.constants.BROTLI_PARAM_QUALITY]: 11 }
+            }))
+          }
+        }
+      }
+      percorrer(pastaSaida)
+    }
+  }
+}
 
 // https://vite.dev/config/
 export default defineConfig({
-  plugins: [react(),tailwindcss()],
+  plugins: [react(),tailwindcss(),precomprimir()],
   resolve: {
     alias: {
       "@": path.resolve(__dirname, "./src"),
@@ -0,0 +1,106 @@
+"""
+Tempo de resposta de /api/atividades/agenda (visão de uma semana) com e
+sem os índices compostos de atividades, em um banco SQLite temporário:
+
+    python benchmarks/bench_agenda.py --atividades 1000000 --clientes 50000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import insert, text
+from src.models.user import db
+from src.models.cliente import Cliente  # noqa: F401 (tabela referenciada por atividades)
+from src.models.atividade import Atividade
+from src.routes.atividade import atividade_bp
+from src.utils.esquema import atualizar_esquema
+
+TIPOS = ['Ligação', 'Reunião', 'E-mail', 'Tarefa', 'Visita', 'Apresentação']
+STATUS = ['Pendente', 'Concluída', 'Cancelada']
+INICIO = datetime(2024, 1, 1)
+PERIODO_DIAS = 3 * 365
+
+
+def popular(total, clientes):
+    aleatorio = random.Random(42)
+    lote = 50000
+    for inicio in range(0, total, lote):
+        db.session.execute(insert(Atividade.__table__), [
+            {
+                'cliente_id': aleatorio.randint(1, clientes),
+                'tipo': aleatorio.choice(TIPOS),
+                'descricao': 'Atividade gerada para benchmark',
+                'data_hora': INICIO + timedelta(minutes=aleatorio.randrange(PERIODO_DIAS * 24 * 60)),
+                'status': aleatorio.choice(STATUS),
+            }
+            for _ in range(min(lote, total - inicio))
+        ])
+        db.session.commit()
+
+
+def medir(cliente_http, urls, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        for url in urls:
+            inicio = time.perf_counter()
+            resposta = cliente_http.get(url)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            assert resposta.status_code == 200, resposta.get_json()
+    tempos.sort()
+    return statistics.median(tempos), tempos[int(len(tempos) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--atividades', type=int, default=1000000)
+    parser.add_argument('--clientes', type=int, default=50000)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(pasta, 'bench.db')}"
+        db.init_app(app)
+        app.register_blueprint(atividade_bp, url_prefix='/api')
+        cliente_http = app.test_client()
+
+        with app.app_context():
+            atualizar_esquema(db)
+            inicio = time.perf_counter()
+            popular(args.atividades, args.clientes)
+            print(f'{args.atividades} atividades geradas em {time.perf_counter() - inicio:.1f} s')
+
+            aleatorio = random.Random(7)
+            semanas = [INICIO + timedelta(days=aleatorio.randrange(PERIODO_DIAS - 7)) for _ in range(10)]
+            consultas = {
+                'semana': [f'/api/atividades/agenda?from={s:%Y-%m-%d}&to={s + timedelta(days=6):%Y-%m-%d}&agrupar=dia'
+                           for s in semanas],
+                'semana + status': [f'/api/atividades/agenda?from={s:%Y-%m-%d}&to={s + timedelta(days=6):%Y-%m-%d}'
+                                    f'&status=Pendente' for s in semanas],
+                'ano do cliente': [f'/api/atividades/agenda?from=2025-01-01&to=2025-12-31'
+                                   f'&cliente_id={aleatorio.randint(1, args.clientes)}' for _ in semanas],
+                'atividades do cliente': [f'/api/atividades/cliente/{aleatorio.randint(1, args.clientes)}'
+                                          for _ in semanas],
+            }
+
+            print(f'{"consulta":>22} {"índices":>8} {"p50 ms":>8} {"p95 ms":>8}')
+            for com_indices in (True, False):
+                if not com_indices:
+                    for indice in Atividade.__table__.indexes:
+                        db.session.execute(text(f'DROP INDEX IF EXISTS {indice.name}'))
+                    db.session.commit()
+                for nome, urls in consultas.items():
+                    p50, p95 = medir(cliente_http, urls, args.repeticoes if com_indices else 1)
+                    print(f'{nome:>22} {"sim" if com_indices else "não":>8} {p50:>8.1f} {p95:>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Leituras e escritas concorrentes por segundo em cada perfil de banco
+(utils/banco.py): SQLite com as configurações padrão, SQLite com WAL e
+PRAGMAs e, se DATABASE_URL estiver definida, o banco indicado nela.
+
+Leitores repetem consultas do dashboard e da listagem paginada; escritores
+fazem commits pequenos, como o worker de campanhas e as rotas de cadastro.
+
+    python benchmarks/bench_banco.py --leitores 8 --escritores 2 --duracao 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import func, insert
+from sqlalchemy.exc import OperationalError
+from src.models.user import db
+from src.models.cliente import Cliente
+from src.models.atividade import Atividade
+from src.utils.banco import perfil_banco
+from src.utils.esquema import atualizar_esquema
+
+
+def criar_app(perfil):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = perfil.uri
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = perfil.opcoes_engine
+    db.init_app(app)
+    with app.app_context():
+        perfil.aplicar(db.engine)
+        db.drop_all()
+        atualizar_esquema(db)
+    return app
+
+
+def popular(app, clientes, atividades):
+    with app.app_context():
+        db.session.execute(insert(Cliente.__table__), [
+            {'nome': f'Cliente {i}', 'email': f'cliente{i}@example.com', 'area_atuacao': f'Área {i % 10}'}
+            for i in range(clientes)
+        ])
+        db.session.execute(insert(Atividade.__table__), [
+            {'cliente_id': i % clientes + 1, 'tipo': 'Ligação', 'status': 'Pendente'} for i in range(atividades)
+        ])
+        db.session.commit()
+
+
+def leitor(app, parar, contagem):
+    with app.app_context():
+        while not parar.is_set():
+            try:
+                db.session.query(Atividade.status, func.count()).group_by(Atividade.status).all()
+                db.session.query(Cliente.area_atuacao, func.count()).group_by(Cliente.area_atuacao).all()
+                Cliente.query.order_by(Cliente.nome).limit(50).all()
+                db.session.rollback()
+                contagem['leituras'] += 1
+            except OperationalError:
+                db.session.rollback()
+                contagem['erros'] += 1
+
+
+def escritor(app, parar, contagem):
+    with app.app_context():
+        while not parar.is_set():
+            try:
+                db.session.add(Atividade(cliente_id=1, tipo='Tarefa', status='Pendente'))
+                db.session.commit()
+                contagem['escritas'] += 1
+            except OperationalError:
+                db.session.rollback()
+                contagem['erros'] += 1
+
+
+def medir(perfil, leitores, escritores, duracao, clientes, atividades):
+    app = criar_app(perfil)
+    popular(app, clientes, atividades)
+
+    parar = threading.Event()
+    contagens = []
+    threads = []
+    for alvo, quantidade in ((leitor, leitores), (escritor, escritores)):
+        for _ in range(quantidade):
+            contagem = {'leituras': 0, 'escritas': 0, 'erros': 0}
+            contagens.append(contagem)
+            threads.append(threading.Thread(target=alvo, args=(app, parar, contagem)))
+    for thread in threads:
+        thread.start()
+    time.sleep(duracao)
+    parar.set()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        db.engine.dispose()
+    total = {chave: sum(c[chave] for c in contagens) for chave in ('leituras', 'escritas', 'erros')}
+    return total['leituras'] / duracao, total['escritas'] / duracao, total['erros']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--leitores', type=int, default=8)
+    parser.add_argument('--escritores', type=int, default=2)
+    parser.add_argument('--duracao', type=float, default=10)
+    parser.add_argument('--clientes', type=int, default=20000)
+    parser.add_argument('--atividades', type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        perfis = [
+            perfil_banco(f"sqlite:///{os.path.join(pasta, 'padrao.db')}", otimizado=False),
+            perfil_banco(f"sqlite:///{os.path.join(pasta, 'wal.db')}"),
+        ]
+        if os.getenv('DATABASE_URL'):
+            perfis.append(perfil_banco(os.getenv('DATABASE_URL')))
+
+        print(f'{args.leitores} leitores, {args.escritores} escritores, {args.duracao:.0f} s por perfil')
+        print(f'{"perfil":>14} {"leituras/s":>11} {"escritas/s":>11} {"erros":>6}')
+        for perfil in perfis:
+            leituras, escritas, erros = medir(perfil, args.leitores, args.escritores, args.duracao,
+                                              args.clientes, args.atividades)
+            print(f'{perfil.nome:>14} {leituras:>11.1f} {escritas:>11.1f} {erros:>6}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,366 @@
+"""
+Teste de carga da API com dados sintéticos.
+
+Popula um banco SQLite com o volume pedido (clientes, atividades e
+produtos), sobe o app real (src/main.py) num servidor HTTP local com
+threads e dispara clientes concorrentes contra listagem, detalhe, busca,
+agenda, dashboard, cadastros e mala direta. Os e-mails das campanhas vão
+para o tools/smtp_sink.py. Mostra p50/p95/p99 e requisições/s por
+cenário e o pico de memória residente do processo.
+
+    python benchmarks/bench_carga.py --clientes 100000 --atividades 1000000 --produtos 10000 \\
+        --banco /tmp/carga.db --duracao 60 --salvar-baseline benchmarks/baseline_carga.json
+
+    python benchmarks/bench_carga.py --banco /tmp/carga.db --comparar benchmarks/baseline_carga.json
+
+Com --comparar, termina com código 1 se o p95 de algum cenário, o pico de
+memória ou a vazão total piorarem mais que --limite (padrão 20%) em
+relação à baseline. O banco em --banco é reaproveitado se já tiver o
+volume pedido; sem --banco, um banco temporário é criado a cada execução.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, 'tools'))
+
+from smtp_sink import SmtpSink
+
+TIPOS = ['Ligação', 'Reunião', 'E-mail', 'Tarefa', 'Visita', 'Apresentação']
+STATUS = ['Pendente', 'Concluída', 'Cancelada']
+AREAS = ['Tecnologia', 'Saúde', 'Educação', 'Varejo', 'Indústria', 'Serviços', 'Agronegócio', 'Finanças']
+NOMES = ['Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Fábio', 'Gabriela', 'Heitor', 'Isabela', 'João']
+SOBRENOMES = ['Silva', 'Souza', 'Oliveira', 'Pereira', 'Lima', 'Costa', 'Ribeiro', 'Almeida', 'Gomes', 'Martins']
+INICIO = datetime(2024, 1, 1)
+PERIODO_DIAS = 3 * 365
+TAMANHO_LOTE = 50000
+
+
+def popular(db, clientes, atividades, produtos):
+    from sqlalchemy import func, insert
+    from src.models.cliente import Cliente
+    from src.models.atividade import Atividade
+    from src.models.produto import Produto
+
+    aleatorio = random.Random(42)
+    existentes = db.session.query(func.count(Cliente.id)).scalar()
+    if existentes >= clientes:
+        print(f'banco já populado ({existentes} clientes), reaproveitando')
+        return
+
+    inicio = time.perf_counter()
+    for tabela, total, gerar in (
+        (Cliente.__table__, clientes, lambda i: {
+            'nome': f'{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)} {i}',
+            'email': f'cliente{i}@example.com',
+            'numero_celular': f'119{i:08d}',
+            'possui_whatsapp': i % 3 == 0,
+            'area_atuacao': aleatorio.choice(AREAS),
+            'cpf_cnpj': f'{i:011d}',
+            'cargo': 'Gerente',
+            'data_cadastro': INICIO + timedelta(minutes=aleatorio.randrange(PERIODO_DIAS * 24 * 60)),
+        }),
+        (Atividade.__table__, atividades, lambda i: {
+            'cliente_id': aleatorio.randint(1, clientes),
+            'tipo': aleatorio.choice(TIPOS),
+            'descricao': 'Atividade gerada para benchmark',
+            'data_hora': INICIO + timedelta(minutes=aleatorio.randrange(PERIODO_DIAS * 24 * 60)),
+            'status': aleatorio.choice(STATUS),
+        }),
+        (Produto.__table__, produtos, lambda i: {
+            'nome': f'Produto {i}', 'descricao': 'Produto gerado para benchmark', 'preco': round(aleatorio.uniform(10, 5000), 2),
+        }),
+    ):
+        for base in range(0, total, TAMANHO_LOTE):
+            db.session.execute(insert(tabela), [gerar(i) for i in range(base, min(base + TAMANHO_LOTE, total))])
+            db.session.commit()
+    db.session.execute(db.text('ANALYZE'))
+    db.session.commit()
+    print(f'{clientes} clientes, {atividades} atividades e {produtos} produtos gerados '
+          f'em {time.perf_counter() - inicio:.1f} s')
+
+
+def configurar_email(db, sink):
+    from src.models.configuracoes_sistema import ConfiguracoesSistema
+    from src.services.configuracoes import configuracoes
+
+    configuracoes.salvar({
+        'email_server': sink.host,
+        'email_port': sink.porta,
+        'email_use_tls': False,
+        'email_remetente': 'benchmark@example.com',
+        'email_taxa_por_segundo': 0,
+    })
+    assert db.session.query(ConfiguracoesSistema).count() == 1
+
+
+class Cenarios:
+    """Requisições de cada cenário; PESOS define a proporção de cada um no tráfego"""
+
+    def __init__(self, clientes, produtos):
+        self.clientes = clientes
+        self.produtos = produtos
+        self._sequencia = 0
+        self._lock = threading.Lock()
+
+    def _proximo(self):
+        with self._lock:
+            self._sequencia += 1
+            return self._sequencia
+
+    def listar_clientes(self, aleatorio):
+        area = aleatorio.choice(AREAS)
+        return 'GET', f'/api/clientes?limit=50&area_atuacao={quote(area)}&sort=nome', None
+
+    def detalhe_cliente(self, aleatorio):
+        return 'GET', f'/api/clientes/{aleatorio.randint(1, self.clientes)}', None
+
+    def buscar_clientes(self, aleatorio):
+        return 'GET', f'/api/clientes/search?q={quote(aleatorio.choice(SOBRENOMES))}&limit=20', None
+
+    def atividades_cliente(self, aleatorio):
+        return 'GET', f'/api/atividades/cliente/{aleatorio.randint(1, self.clientes)}', None
+
+    def agenda_semana(self, aleatorio):
+        dia = INICIO + timedelta(days=aleatorio.randrange(PERIODO_DIAS - 7))
+        return 'GET', f'/api/atividades/agenda?from={dia:%Y-%m-%d}&to={dia + timedelta(days=6):%Y-%m-%d}', None
+
+    def detalhe_produto(self, aleatorio):
+        return 'GET', f'/api/produtos/{aleatorio.randint(1, self.produtos)}', None
+
+    def dashboard(self, aleatorio):
+        return 'GET', '/api/dashboard/stats', None
+
+    def criar_cliente(self, aleatorio):
+        numero = self._proximo()
+        return 'POST', '/api/clientes', {
+            'nome': f'Cliente carga {numero}', 'email': f'carga-{os.getpid()}-{numero}-{time.time_ns()}@example.com',
+            'area_atuacao': aleatorio.choice(AREAS),
+        }
+
+    def atualizar_cliente(self, aleatorio):
+        return 'PUT', f'/api/clientes/{aleatorio.randint(1, self.clientes)}', {'cargo': aleatorio.choice(['Diretor', 'Gerente'])}
+
+    def criar_atividade(self, aleatorio):
+        dia = INICIO + timedelta(days=aleatorio.randrange(PERIODO_DIAS))
+        return 'POST', '/api/atividades', {
+            'cliente_id': aleatorio.randint(1, self.clientes), 'tipo': aleatorio.choice(TIPOS),
+            'descricao': 'Criada no teste de carga', 'data_hora': dia.isoformat(),
+        }
+
+    def mala_direta(self, aleatorio):
+        return 'POST', '/api/mala_direta/send_email', {
+            'client_ids': aleatorio.sample(range(1, self.clientes + 1), 20),
+            'subject': 'Teste de carga', 'body': '<p>Olá! Mensagem gerada pelo teste de carga.</p>',
+        }
+
+    PESOS = {
+        'listar_clientes': 20, 'detalhe_cliente': 20, 'buscar_clientes': 15, 'atividades_cliente': 10,
+        'agenda_semana': 10, 'detalhe_produto': 5, 'dashboard': 5, 'criar_cliente': 4,
+        'atualizar_cliente': 5, 'criar_atividade': 5, 'mala_direta': 1,
+    }
+
+
+class MonitorMemoria:
+    """Amostra a memória residente do processo (servidor e clientes) durante a carga"""
+
+    def __init__(self, intervalo=0.1):
+        self.intervalo = intervalo
+        self.pico = 0
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, daemon=True)
+
+    @staticmethod
+    def residente():
+        with open('/proc/self/statm') as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            self.pico = max(self.pico, self.residente())
+
+    def iniciar(self):
+        self.pico = self.residente()
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+
+
+def cliente_carga(porta, cenarios, nomes, pesos, fim, resultados, semente):
+    aleatorio = random.Random(semente)
+    conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=60)
+    while time.perf_counter() < fim:
+        nome = aleatorio.choices(nomes, pesos)[0]
+        metodo, url, corpo = getattr(cenarios, nome)(aleatorio)
+        cabecalhos = {'Accept-Encoding': 'gzip'}
+        if corpo is not None:
+            corpo = json.dumps(corpo)
+            cabecalhos['Content-Type'] = 'application/json'
+        inicio = time.perf_counter()
+        try:
+            conexao.request(metodo, url, body=corpo, headers=cabecalhos)
+            resposta = conexao.getresponse()
+            resposta.read()
+            erro = resposta.status >= 400
+        except (OSError, http.client.HTTPException):
+            conexao.close()
+            erro = True
+        resultados.append((nome, time.perf_counter() - inicio, erro))
+    conexao.close()
+
+
+def percentil(valores, fracao):
+    return valores[min(len(valores) - 1, int(len(valores) * fracao))]
+
+
+def resumir(resultados, duracao):
+    por_cenario = {}
+    for nome, tempo, erro in resultados:
+        por_cenario.setdefault(nome, ([], [0]))
+        por_cenario[nome][0].append(tempo)
+        por_cenario[nome][1][0] += erro
+    resumo = {}
+    for nome, (tempos, (erros,)) in sorted(por_cenario.items()):
+        tempos.sort()
+        resumo[nome] = {
+            'requisicoes': len(tempos),
+            'erros': erros,
+            'rps': len(tempos) / duracao,
+            'p50_ms': percentil(tempos, 0.50) * 1000,
+            'p95_ms': percentil(tempos, 0.95) * 1000,
+            'p99_ms': percentil(tempos, 0.99) * 1000,
+        }
+    return resumo
+
+
+def comparar(resultado, baseline, limite):
+    """Lista as regressões acima do limite em relação à baseline"""
+    regressoes = []
+    for nome, atual in resultado['cenarios'].items():
+        anterior = baseline['cenarios'].get(nome)
+        if anterior and atual['p95_ms'] > anterior['p95_ms'] * (1 + limite):
+            regressoes.append(f'{nome}: p95 {anterior["p95_ms"]:.1f} -> {atual["p95_ms"]:.1f} ms')
+    if resultado['rps_total'] < baseline['rps_total'] * (1 - limite):
+        regressoes.append(f'vazão total: {baseline["rps_total"]:.1f} -> {resultado["rps_total"]:.1f} req/s')
+    if resultado['rss_pico_mb'] > baseline['rss_pico_mb'] * (1 + limite):
+        regressoes.append(f'memória: {baseline["rss_pico_mb"]:.0f} -> {resultado["rss_pico_mb"]:.0f} MB')
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clientes', type=int, default=100000)
+    parser.add_argument('--atividades', type=int, default=1000000)
+    parser.add_argument('--produtos', type=int, default=10000)
+    parser.add_argument('--banco', help='arquivo SQLite a popular/reaproveitar (padrão: temporário)')
+    parser.add_argument('--concorrencia', type=int, default=16, help='clientes simultâneos')
+    parser.add_argument('--duracao', type=float, default=30, help='segundos de carga')
+    parser.add_argument('--aquecimento', type=float, default=3, help='segundos de carga antes da medição')
+    parser.add_argument('--salvar-baseline', help='grava o resultado neste arquivo JSON')
+    parser.add_argument('--comparar', help='baseline JSON para detectar regressões')
+    parser.add_argument('--limite', type=float, default=0.20, help='piora tolerada (fração)')
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp(prefix='hermescad-carga-')
+    banco = os.path.abspath(args.banco or os.path.join(pasta, 'carga.db'))
+    # O app lê DATABASE_URL ao ser importado
+    os.environ['DATABASE_URL'] = f'sqlite:///{banco}'
+
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from src.main import create_app, init_db
+    from src.models.user import db
+
+    class ManterConexao(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    app = create_app()
+    init_db(app, forcar=False)
+    sink = SmtpSink(porta=0).iniciar()
+    with app.app_context():
+        popular(db, args.clientes, args.atividades, args.produtos)
+        configurar_email(db, sink)
+
+    servidor = make_server('127.0.0.1', 0, app, threaded=True, request_handler=ManterConexao)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+    cenarios = Cenarios(args.clientes, args.produtos)
+    nomes, pesos = zip(*Cenarios.PESOS.items())
+
+    def rodar(duracao, semente):
+        resultados = []
+        fim = time.perf_counter() + duracao
+        clientes = [
+            threading.Thread(target=cliente_carga, args=(servidor.port, cenarios, nomes, pesos, fim, resultados, semente + i))
+            for i in range(args.concorrencia)
+        ]
+        for cliente in clientes:
+            cliente.start()
+        for cliente in clientes:
+            cliente.join()
+        return resultados
+
+    try:
+        if args.aquecimento:
+            rodar(args.aquecimento, 1000)
+        monitor = MonitorMemoria().iniciar()
+        inicio = time.perf_counter()
+        resultados = rodar(args.duracao, 0)
+        duracao = time.perf_counter() - inicio
+        monitor.parar()
+    finally:
+        servidor.shutdown()
+        sink.parar()
+
+    resultado = {
+        'volume': {'clientes': args.clientes, 'atividades': args.atividades, 'produtos': args.produtos},
+        'concorrencia': args.concorrencia,
+        'cenarios': resumir(resultados, duracao),
+        'rps_total': len(resultados) / duracao,
+        'rss_pico_mb': monitor.pico / 1024 / 1024,
+    }
+
+    print(f'{args.concorrencia} clientes, {duracao:.0f} s, {len(resultados)} requisições, '
+          f'{sink.mensagens} e-mails entregues ao sink')
+    print(f'{"cenário":>20} {"req":>7} {"erros":>6} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8}')
+    for nome, item in resultado['cenarios'].items():
+        print(f'{nome:>20} {item["requisicoes"]:>7} {item["erros"]:>6} {item["rps"]:>8.1f} '
+              f'{item["p50_ms"]:>8.1f} {item["p95_ms"]:>8.1f} {item["p99_ms"]:>8.1f}')
+    print(f'vazão total {resultado["rps_total"]:.1f} req/s, pico de memória {resultado["rss_pico_mb"]:.0f} MB')
+
+    if args.salvar_baseline:
+        with open(args.salvar_baseline, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+        print(f'baseline gravada em {args.salvar_baseline}')
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            baseline = json.load(arquivo)
+        if baseline['volume'] != resultado['volume'] or baseline['concorrencia'] != resultado['concorrencia']:
+            print('aviso: volume ou concorrência diferentes dos da baseline')
+        regressoes = comparar(resultado, baseline, args.limite)
+        if regressoes:
+            print(f'regressões acima de {args.limite:.0%}:')
+            for regressao in regressoes:
+                print(f'  {regressao}')
+            sys.exit(1)
+        print(f'sem regressões acima de {args.limite:.0%}')
+
+
+if __name__ == '__main__':
+    main()
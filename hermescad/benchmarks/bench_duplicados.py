@@ -0,0 +1,96 @@
+"""
+Tempo da detecção de clientes duplicados em função do número de clientes
+(deve crescer de forma quase linear) e quantos dos duplicados gerados
+foram sugeridos. Parte dos clientes é repetida com variações: documento
+formatado, e-mail em maiúsculas, telefone sem o nono dígito, nome sem
+acentos.
+
+    python benchmarks/bench_duplicados.py --clientes 50000 100000 200000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import insert, select
+from src.models.user import db
+from src.models.cliente import Cliente
+from src.models.duplicidade import Duplicidade
+from src.services.duplicados import detectar
+from src.utils.esquema import atualizar_esquema
+
+NOMES = ['João', 'Maria', 'José', 'Ana', 'Antônio', 'Francisca', 'Carlos', 'Márcia', 'Paulo', 'Adriana',
+         'Pedro', 'Juliana', 'Lucas', 'Fernanda', 'Luiz', 'Patrícia', 'Marcos', 'Aline', 'Luís', 'Camila',
+         'Gabriel', 'Sônia', 'Rafael', 'Letícia', 'Daniel', 'Cláudia', 'Marcelo', 'Beatriz', 'Bruno', 'Vânia']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima',
+              'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes', 'Soares', 'Fernandes',
+              'Vieira', 'Barbosa', 'Rocha', 'Dias', 'Nascimento', 'Andrade', 'Moreira', 'Nunes', 'Marques',
+              'Machado', 'Mendes', 'Freitas', 'Cardoso', 'Ramos', 'Gonçalves', 'Santana', 'Teixeira']
+
+
+def gerar(total, fracao_duplicados, semente=7):
+    """Clientes e o conjunto de pares (original, cópia) gerados de propósito"""
+    aleatorio = random.Random(semente)
+    originais = int(total * (1 - fracao_duplicados))
+    clientes = []
+    for i in range(originais):
+        nome = ' '.join([aleatorio.choice(NOMES)] + aleatorio.sample(SOBRENOMES, aleatorio.choice((1, 2, 3))))
+        clientes.append({
+            'nome': nome,
+            'cpf_cnpj': f'{10000000000 + i * 7919:011d}',
+            'email': f'cliente{i}@example.com',
+            'numero_celular': f'(11) 9{70000000 + i:08d}',
+            'possui_whatsapp': True,
+        })
+    esperados = set()
+    for copia, i in enumerate(aleatorio.sample(range(originais), total - originais)):
+        original = clientes[i]
+        variacao = copia % 3
+        doc = original['cpf_cnpj']
+        clientes.append({
+            'nome': original['nome'].replace('ã', 'a').replace('ô', 'o').replace('é', 'e').upper(),
+            # Só uma das chaves fortes em comum, com formato diferente
+            'cpf_cnpj': f'{doc[:3]}.{doc[3:6]}.{doc[6:9]}-{doc[9:]}' if variacao == 0 else None,
+            'email': original['email'].upper() if variacao == 1 else f'copia{copia}@example.net',
+            'numero_celular': '+55 11 ' + original['numero_celular'][6:] if variacao == 2 else None,
+            'possui_whatsapp': False,
+        })
+        esperados.add((i + 1, len(clientes)))
+    return clientes, esperados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clientes', type=int, nargs='+', default=[25000, 50000, 100000])
+    parser.add_argument('--duplicados', type=float, default=0.02, help='fração de clientes que são cópias')
+    args = parser.parse_args()
+
+    print(f'{"clientes":>9} {"chaves":>9} {"pares":>9} {"sugestões":>10} {"achados":>8} {"segundos":>9} {"µs/cliente":>11}')
+    for total in args.clientes:
+        with tempfile.TemporaryDirectory() as pasta:
+            app = Flask(__name__)
+            app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(pasta, 'bench.db')}"
+            db.init_app(app)
+            with app.app_context():
+                atualizar_esquema(db)
+                clientes, esperados = gerar(total, args.duplicados)
+                for inicio in range(0, len(clientes), 5000):
+                    db.session.execute(insert(Cliente), clientes[inicio:inicio + 5000])
+                db.session.commit()
+
+                resultado = detectar()
+                sugeridos = set(db.session.execute(
+                    select(Duplicidade.cliente_id, Duplicidade.duplicado_id)
+                ).tuples())
+                achados = len(esperados & sugeridos)
+                print(f'{resultado["clientes"]:>9} {resultado["chaves"]:>9} {resultado["pares_candidatos"]:>9} '
+                      f'{resultado["sugestoes"]:>10} {achados:>4}/{len(esperados):<4}'
+                      f'{resultado["segundos"]:>8.2f} {resultado["segundos"] * 1e6 / total:>11.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Vazão (linhas/s) da importação em massa de clientes: primeira carga
+(somente INSERT) e reimportação do mesmo arquivo (upsert por cpf_cnpj e
+e-mail), em um banco SQLite temporário.
+
+    python benchmarks/bench_importacao.py --linhas 50000
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from src.models.user import db
+from src.models.cliente import Cliente
+from src.services.importacao import importar_clientes
+from src.utils.busca import garantir_indice_busca
+from src.utils.esquema import atualizar_esquema
+
+AREAS = ['Comércio', 'Indústria', 'Serviços', 'Agronegócio', 'Saúde']
+
+
+def gerar_csv(linhas, duplicadas):
+    """CSV com ';' como os exportados por planilhas; `duplicadas` linhas repetem clientes anteriores"""
+    saida = io.StringIO()
+    saida.write('Nome;E-mail;CPF/CNPJ;Telefone;WhatsApp;Área de atuação;Cargo\n')
+    for i in range(linhas):
+        n = i - duplicadas if i >= linhas - duplicadas else i
+        saida.write(
+            f'Cliente {n};cliente{n}@example.com;{n:011d};(11) 4000-{n % 10000:04d};'
+            f'{"sim" if n % 3 else "não"};{AREAS[n % len(AREAS)]};Gerente\n'
+        )
+    return saida.getvalue().encode('utf-8')
+
+
+def importar(app, dados):
+    with app.app_context():
+        for progresso in importar_clientes(io.BytesIO(dados), 'csv'):
+            pass
+    return progresso
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=20000)
+    parser.add_argument('--duplicadas', type=int, default=500, help='linhas que repetem clientes do próprio arquivo')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(pasta, 'bench.db')}"
+        db.init_app(app)
+        with app.app_context():
+            atualizar_esquema(db)
+            garantir_indice_busca(db)
+
+        dados = gerar_csv(args.linhas, args.duplicadas)
+        print(f'{args.linhas} linhas ({len(dados) / 1024 / 1024:.1f} MB), {args.duplicadas} repetidas')
+        print(f'{"etapa":>12} {"linhas/s":>10} {"inseridos":>10} {"atualizados":>12} {"erros":>6}')
+        for etapa in ('carga', 'reimportação'):
+            resultado = importar(app, dados)
+            print(f'{etapa:>12} {resultado["linhas_por_segundo"]:>10.1f} {resultado["inseridos"]:>10} '
+                  f'{resultado["atualizados"]:>12} {resultado["com_erro"]:>6}')
+        with app.app_context():
+            print(f'clientes no banco: {Cliente.query.count()}')
+
+
+if __name__ == '__main__':
+    main()
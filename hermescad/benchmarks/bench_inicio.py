@@ -0,0 +1,98 @@
+"""
+Relatório do tempo de inicialização de um worker (partida a frio).
+
+Cada rodada é um processo Python novo que mede, em sequência: a
+importação das dependências (Flask, SQLAlchemy), `import src.main`,
+`create_app()` e a primeira requisição (que abre a primeira conexão com o
+banco). Para comparação, mede também o custo da migração do esquema, que
+antes rodava em toda importação de src/main.py. Lista ainda os módulos do
+projeto mais caros de importar (python -X importtime).
+
+    python benchmarks/bench_inicio.py --rodadas 5
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEDICAO = r'''
+import json, sys, time
+sys.path.insert(0, sys.argv[1])
+tempos = {}
+inicio = time.perf_counter()
+import flask, flask_sqlalchemy, sqlalchemy
+tempos['dependências'] = time.perf_counter() - inicio
+
+marca = time.perf_counter()
+import src.main
+tempos['import src.main'] = time.perf_counter() - marca
+
+marca = time.perf_counter()
+app = src.main.create_app()
+tempos['create_app()'] = time.perf_counter() - marca
+
+marca = time.perf_counter()
+resposta = app.test_client().get('/api/produtos')
+assert resposta.status_code == 200, resposta.status_code
+tempos['1ª requisição'] = time.perf_counter() - marca
+tempos['total'] = time.perf_counter() - inicio
+
+marca = time.perf_counter()
+src.main.init_db(app, forcar=True)
+tempos['migração (antes: em todo import)'] = time.perf_counter() - marca
+print(json.dumps(tempos))
+'''
+
+
+def rodar(ambiente):
+    saida = subprocess.run([sys.executable, '-c', MEDICAO, RAIZ], env=ambiente,
+                           capture_output=True, text=True, check=True)
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+def modulos_mais_caros(ambiente, quantidade):
+    saida = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import src.main; src.main.create_app()'],
+                           env=ambiente, cwd=RAIZ, capture_output=True, text=True, check=True)
+    modulos = []
+    for linha in saida.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        partes = [parte.strip() for parte in linha.removeprefix('import time:').split('|')]
+        if len(partes) == 3 and partes[0].isdigit() and partes[2].startswith('src.'):
+            modulos.append((int(partes[1]), int(partes[0]), partes[2]))
+    return sorted(modulos, reverse=True)[:quantidade]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rodadas', type=int, default=5)
+    parser.add_argument('--modulos', type=int, default=10, help='quantos módulos listar')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        # Cópia do banco para não alterar o app.db do projeto
+        banco = os.path.join(pasta, 'app.db')
+        original = os.path.join(RAIZ, 'src', 'database', 'app.db')
+        if os.path.exists(original):
+            shutil.copy(original, banco)
+        ambiente = dict(os.environ, DATABASE_URL=f'sqlite:///{banco}', PYTHONPATH=RAIZ)
+        subprocess.run([sys.executable, os.path.join(RAIZ, 'src', 'main.py'), 'init_db'],
+                       env=ambiente, check=True, capture_output=True)
+
+        rodadas = [rodar(ambiente) for _ in range(args.rodadas)]
+        print(f'mediana de {args.rodadas} processos novos')
+        for etapa in rodadas[0]:
+            print(f'{etapa:>34} {statistics.median(r[etapa] for r in rodadas) * 1000:>8.1f} ms')
+
+        print(f'\nmódulos do projeto mais caros de importar (acumulado / próprio)')
+        for acumulado, proprio, nome in modulos_mais_caros(ambiente, args.modulos):
+            print(f'{nome:>34} {acumulado / 1000:>8.1f} ms {proprio / 1000:>8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
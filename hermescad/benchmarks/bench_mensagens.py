@@ -0,0 +1,72 @@
+"""
+Custo por destinatário da montagem de mensagens de campanha em função do
+tamanho do anexo: montagem completa a cada mensagem (como era feito antes)
+versus ConstrutorMensagem, que codifica anexos e corpo uma vez.
+
+    python benchmarks/bench_mensagens.py --destinatarios 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from email import encoders
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.mensagens import ConstrutorMensagem
+
+CORPO = '<p>Prezado cliente, confira as novidades deste mês.</p>'
+
+
+def montagem_completa(destino, caminho):
+    msg = MIMEMultipart()
+    msg['From'] = 'crm@example.com'
+    msg['To'] = destino
+    msg['Subject'] = 'Novidades'
+    msg.attach(MIMEText(CORPO, 'html'))
+    with open(caminho, 'rb') as anexo:
+        parte = MIMEBase('application', 'octet-stream')
+        parte.set_payload(anexo.read())
+    encoders.encode_base64(parte)
+    parte.add_header('Content-Disposition', f'attachment; filename= {os.path.basename(caminho)}')
+    msg.attach(parte)
+    return msg.as_string()
+
+
+def medir(montar, destinatarios):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    for i in range(destinatarios):
+        montar(f'cliente{i}@example.com')
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duracao / destinatarios * 1000, pico / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--destinatarios', type=int, default=100)
+    parser.add_argument('--tamanhos-kb', default='0,100,1024,5120')
+    args = parser.parse_args()
+
+    print(f'{"anexo":>8} {"completa ms/msg":>16} {"construtor ms/msg":>18} {"pico MB (compl./constr.)":>26}')
+    with tempfile.TemporaryDirectory() as pasta:
+        for tamanho_kb in [int(t) for t in args.tamanhos_kb.split(',')]:
+            caminho = os.path.join(pasta, f'anexo_{tamanho_kb}.pdf')
+            with open(caminho, 'wb') as arquivo:
+                arquivo.write(os.urandom(tamanho_kb * 1024))
+
+            antes, pico_antes = medir(lambda destino: montagem_completa(destino, caminho), args.destinatarios)
+            construtor = ConstrutorMensagem('crm@example.com', 'Novidades', CORPO, [caminho])
+            depois, pico_depois = medir(construtor.montar, args.destinatarios)
+            print(f'{tamanho_kb:>6}KB {antes:>16.3f} {depois:>18.3f} {pico_antes:>12.1f} / {pico_depois:<11.1f}')
+
+
+if __name__ == '__main__':
+    main()
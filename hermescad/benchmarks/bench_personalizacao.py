@@ -0,0 +1,76 @@
+"""
+Custo da personalização de campanhas ({{ nome }}, {{ cargo }} ...) por
+destinatário: modelo Jinja2 compilado a cada mensagem versus
+ModeloCampanha, compilado uma vez, com a montagem da mensagem incluída.
+
+    python benchmarks/bench_personalizacao.py --destinatarios 100000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jinja2.sandbox import ImmutableSandboxedEnvironment
+from src.services.mensagens import ConstrutorMensagem
+from src.services.personalizacao import ModeloCampanha
+
+ASSUNTO = 'Novidades para {{ area_atuacao }}, {{ nome }}'
+CORPO = '''<html><body>
+<p>Olá, {{ nome }}!</p>
+<p>{% if cargo %}Como {{ cargo }}, você{% else %}Você{% endif %} vai gostar das novidades
+para a área de {{ area_atuacao }} deste mês.</p>
+<ul><li>Condições especiais</li><li>Atendimento dedicado</li></ul>
+<p><a href="https://example.com/ofertas">Veja as ofertas</a></p>
+</body></html>'''
+
+
+def clientes(total):
+    cargos = ('Diretor', 'Gerente', None, 'Analista')
+    for i in range(total):
+        yield {'nome': f'Cliente {i} & Cia', 'cargo': cargos[i % 4], 'area_atuacao': 'Construção'}
+
+
+def compilando_sempre(total, construtor):
+    ambiente = ImmutableSandboxedEnvironment(autoescape=True)
+    for i, dados in enumerate(clientes(total)):
+        assunto = ambiente.from_string(ASSUNTO).render(dados)
+        corpo = ambiente.from_string(CORPO).render(dados)
+        construtor.montar(f'cliente{i}@example.com', assunto, corpo)
+
+
+def compilado_uma_vez(total, construtor):
+    modelo = ModeloCampanha(ASSUNTO, CORPO)
+    for i, dados in enumerate(clientes(total)):
+        construtor.montar(f'cliente{i}@example.com', *modelo.renderizar(dados))
+
+
+def so_renderizacao(total, _):
+    modelo = ModeloCampanha(ASSUNTO, CORPO)
+    for dados in clientes(total):
+        modelo.renderizar(dados)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--destinatarios', type=int, default=100000)
+    parser.add_argument('--amostra-compilando', type=int, default=2000,
+                        help='destinatários medidos no modo que compila a cada mensagem (extrapolado)')
+    args = parser.parse_args()
+
+    construtor = ConstrutorMensagem('crm@example.com', ASSUNTO, CORPO, [])
+    print(f'{"modo":<28} {"µs/destinatário":>16} {"total p/ " + str(args.destinatarios):>16}')
+    for nome, funcao, total in (
+        ('compilando a cada mensagem', compilando_sempre, args.amostra_compilando),
+        ('compilado uma vez', compilado_uma_vez, args.destinatarios),
+        ('  (só renderização)', so_renderizacao, args.destinatarios),
+    ):
+        inicio = time.perf_counter()
+        funcao(total, construtor)
+        por_destinatario = (time.perf_counter() - inicio) / total
+        print(f'{nome:<28} {por_destinatario * 1e6:>16.1f} {por_destinatario * args.destinatarios:>15.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Custo por linha da listagem de clientes: objetos do ORM + to_dict()
+(caminho anterior) contra tuplas projetadas (utils/campos.py), com todas
+as colunas e só com id/nome/email (?fields=). Os clientes têm endereço e
+informações financeiras com alguns KB de texto, como em bases reais.
+
+    python benchmarks/bench_serializacao.py --clientes 50000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from src.main import create_app, init_db
+from src.models.user import db
+from src.models.cliente import Cliente
+from src.utils.campos import ler_campos
+
+TEXTO_LONGO = 'Histórico de pagamentos e observações do cliente. ' * 40
+
+
+def popular(total):
+    lote = 10000
+    for inicio in range(0, total, lote):
+        db.session.execute(insert(Cliente.__table__), [
+            {
+                'nome': f'Cliente {i}', 'email': f'cliente{i}@example.com', 'cpf_cnpj': f'{i:011d}',
+                'endereco': f'Rua {i}, ' + TEXTO_LONGO[:300], 'informacoes_financeiras': TEXTO_LONGO,
+                'area_atuacao': 'Varejo', 'cargo': 'Gerente', 'numero_celular': f'119{i:08d}',
+            }
+            for i in range(inicio, min(inicio + lote, total))
+        ])
+    db.session.commit()
+
+
+def medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        db.session.expunge_all()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clientes', type=int, default=50000)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(pasta, 'bench.db')}"})
+        init_db(app)
+        cliente_http = app.test_client()
+
+        with app.app_context():
+            popular(args.clientes)
+            todas = ler_campos({}, Cliente)
+            parcial = ler_campos({'fields': 'id,nome,email'}, Cliente)
+
+            casos = {
+                'ORM + to_dict()': lambda: [c.to_dict() for c in Cliente.query.order_by(Cliente.id).all()],
+                'tuplas, todas as colunas': lambda: [
+                    todas.serializar(linha) for linha in todas.aplicar(Cliente.query).order_by(Cliente.id).all()],
+                'tuplas, id/nome/email': lambda: [
+                    parcial.serializar(linha) for linha in parcial.aplicar(Cliente.query).order_by(Cliente.id).all()],
+            }
+            print(f'{args.clientes} clientes, mediana de {args.repeticoes} execuções')
+            print(f'{"consulta + serialização":>26} {"total ms":>9} {"µs/linha":>9}')
+            for nome, funcao in casos.items():
+                duracao = medir(funcao, args.repeticoes)
+                print(f'{nome:>26} {duracao * 1000:>9.1f} {duracao / args.clientes * 1e6:>9.2f}')
+            db.session.remove()
+
+        print(f'\n{"GET /api/clientes":>26} {"total ms":>9} {"µs/linha":>9} {"KB":>9}')
+        for rotulo, url in (('todas as colunas', '/api/clientes'),
+                            ('?fields=id,nome,email', '/api/clientes?fields=id,nome,email')):
+            tempos = []
+            for _ in range(args.repeticoes):
+                inicio = time.perf_counter()
+                resposta = cliente_http.get(url)
+                tempos.append(time.perf_counter() - inicio)
+                assert resposta.status_code == 200
+            duracao = statistics.median(tempos)
+            print(f'{rotulo:>26} {duracao * 1000:>9.1f} {duracao / args.clientes * 1e6:>9.2f} '
+                  f'{len(resposta.data) / 1024:>9.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Vazão (mensagens/s) da entrega SMTP em função do número de conexões.
+
+Usa o servidor local tools/smtp_sink.py com uma latência por resposta para
+simular a ida e volta até o provedor:
+
+    python benchmarks/bench_smtp.py --mensagens 2000 --latencia 0.005
+"""
+import argparse
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, 'tools'))
+
+from smtp_sink import SmtpSink
+from src.services.smtp import ConfiguracaoSMTP, PoolSMTP
+
+
+def medir(sink, conexoes, mensagens, por_conexao, taxa):
+    config = ConfiguracaoSMTP(
+        servidor=sink.host,
+        porta=sink.porta,
+        remetente='benchmark@example.com',
+        max_conexoes=conexoes,
+        mensagens_por_conexao=por_conexao,
+        taxa_por_segundo=taxa
+    )
+    corpo = 'Subject: benchmark\r\n\r\n' + 'x' * 2000
+    itens = [(f'cliente{i}@example.com', corpo) for i in range(mensagens)]
+
+    inicio = time.perf_counter()
+    with PoolSMTP(config) as pool:
+        erros = pool.enviar_lote(itens)
+    duracao = time.perf_counter() - inicio
+    return mensagens / duracao, sum(1 for erro in erros if erro)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mensagens', type=int, default=1000)
+    parser.add_argument('--latencia', type=float, default=0.005, help='atraso (s) por resposta do servidor')
+    parser.add_argument('--conexoes', default='1,2,4,8,16')
+    parser.add_argument('--por-conexao', type=int, default=100)
+    parser.add_argument('--taxa', type=float, default=0, help='limite de mensagens/s (0 = sem limite)')
+    args = parser.parse_args()
+
+    sink = SmtpSink(porta=0, latencia=args.latencia).iniciar()
+    try:
+        print(f'{args.mensagens} mensagens, latência {args.latencia * 1000:.1f} ms por resposta')
+        print(f'{"conexões":>9} {"msg/s":>10} {"falhas":>7}')
+        for conexoes in [int(n) for n in args.conexoes.split(',')]:
+            vazao, falhas = medir(sink, conexoes, args.mensagens, args.por_conexao, args.taxa)
+            print(f'{conexoes:>9} {vazao:>10.1f} {falhas:>7}')
+    finally:
+        sink.parar()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Vazão (mensagens/s) do envio de WhatsApp em função do número de conexões.
+
+Usa o provedor local tools/whatsapp_mock.py com uma latência por resposta
+para simular a ida e volta até a API:
+
+    python benchmarks/bench_whatsapp.py --mensagens 2000 --latencia 0.02
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, 'tools'))
+
+from whatsapp_mock import WhatsAppMock
+from src.services.whatsapp import ConfiguracaoWhatsApp, DespachoWhatsApp
+
+
+def medir(mock, conexoes, mensagens, taxa, imagem):
+    config = ConfiguracaoWhatsApp(
+        url_api=mock.url,
+        token=mock.token,
+        numero_id='100',
+        max_conexoes=conexoes,
+        taxa_por_segundo=taxa
+    )
+    texto = 'Olá! Confira as novidades desta semana. ' * 5
+
+    inicio = time.perf_counter()
+    with DespachoWhatsApp(config) as despacho:
+        midia_id = despacho.enviar_midia(imagem) if imagem else None
+        resultados = despacho.enviar_lote([(f'+55119{i:08d}', texto, midia_id) for i in range(mensagens)])
+    duracao = time.perf_counter() - inicio
+    return mensagens / duracao, sum(1 for resultado in resultados if isinstance(resultado, Exception))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mensagens', type=int, default=1000)
+    parser.add_argument('--latencia', type=float, default=0.02, help='atraso (s) por resposta do provedor')
+    parser.add_argument('--conexoes', default='1,2,4,8,16')
+    parser.add_argument('--taxa', type=float, default=0, help='limite de mensagens/s (0 = sem limite)')
+    parser.add_argument('--limite-provedor', type=int, default=0,
+                        help='requisições/s aceitas pelo provedor; o excesso recebe 429 (0 = sem limite)')
+    parser.add_argument('--imagem-kb', type=int, default=200, help='tamanho da imagem da campanha (0 = sem imagem)')
+    args = parser.parse_args()
+
+    mock = WhatsAppMock(porta=0, latencia=args.latencia, limite_taxa=args.limite_provedor).iniciar()
+    imagem = None
+    if args.imagem_kb:
+        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as arquivo:
+            arquivo.write(os.urandom(args.imagem_kb * 1024))
+            imagem = arquivo.name
+    try:
+        print(f'{args.mensagens} mensagens, latência {args.latencia * 1000:.1f} ms por resposta')
+        print(f'{"conexões":>9} {"msg/s":>10} {"falhas":>7} {"429":>6}')
+        for conexoes in [int(n) for n in args.conexoes.split(',')]:
+            limitadas = mock.limitadas
+            vazao, falhas = medir(mock, conexoes, args.mensagens, args.taxa, imagem)
+            print(f'{conexoes:>9} {vazao:>10.1f} {falhas:>7} {mock.limitadas - limitadas:>6}')
+        print(f'mídias enviadas ao provedor: {mock.midias}')
+    finally:
+        mock.parar()
+        if imagem:
+            os.unlink(imagem)
+
+
+if __name__ == '__main__':
+    main()
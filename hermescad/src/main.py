@@ -3,56 +3,161 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
-from flask_cors import CORS
-from src.models.user import db
-from src.models.cliente import Cliente
-from src.models.atividade import Atividade
-from src.models.produto import Produto
-from src.models.configuracoes_sistema import ConfiguracoesSistema
-from src.routes.user import user_bp
-from src.routes.cliente import cliente_bp
-from src.routes.mala_direta import mala_direta_bp
-from src.routes.atividade import atividade_bp
-from src.routes.produto import produto_bp
-from src.routes.configuracoes_sistema import configuracoes_sistema_bp
-
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
-
-# Habilitar CORS para permitir requisições do frontend
-CORS(app)
-
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(cliente_bp, url_prefix='/api')
-app.register_blueprint(mala_direta_bp, url_prefix='/api')
-app.register_blueprint(atividade_bp, url_prefix='/api')
-app.register_blueprint(produto_bp, url_prefix='/api')
-app.register_blueprint(configuracoes_sistema_bp, url_prefix='/api')
-
-# uncomment if you need to use database
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-with app.app_context():
-    db.create_all()
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
+import click
+from flask import Flask
+
+PASTA_ESTATICOS = os.path.join(os.path.dirname(__file__), 'static')
+
+
+def _registrar_blueprints(app):
+    # Importados aqui: importar src.main não carrega rotas, serviços e modelos
+    from src.routes.user import user_bp
+    from src.routes.cliente import cliente_bp
+    from src.routes.mala_direta import mala_direta_bp
+    from src.routes.atividade import atividade_bp
+    from src.routes.produto import produto_bp
+    from src.routes.configuracoes_sistema import configuracoes_sistema_bp
+    from src.routes.dashboard import dashboard_bp
+    from src.routes.exportacao import exportacao_bp
+    from src.routes.metricas import metricas_bp
+    from src.routes.eventos import eventos_bp
+    from src.routes.segmento import segmento_bp
+
+    for blueprint in (user_bp, cliente_bp, mala_direta_bp, atividade_bp, produto_bp,
+                      configuracoes_sistema_bp, dashboard_bp, exportacao_bp, eventos_bp, segmento_bp):
+        app.register_blueprint(blueprint, url_prefix='/api')
+    # /metrics fica fora de /api, no caminho padrão do Prometheus
+    app.register_blueprint(metricas_bp)
+
+
+def _registrar_comandos(app, db):
+    from src.models.segmento import Segmento
+    from src.services import arquivos, duplicados, segmentos
+    from src.utils.busca import reconstruir_indice_busca
+    from src.utils.sincronizacao import RETENCAO_EXCLUSOES, limpar_exclusoes
+    from src.utils.esquema import VERSAO_ESQUEMA, migrar, versao_instalada
+
+    @app.cli.command('migrar')
+    @click.option('--forcar', is_flag=True, help='Aplica o esquema mesmo se a versão gravada for a atual')
+    def migrar_comando(forcar):
+        """Cria tabelas, colunas e índices que faltam e grava a versão do esquema"""
+        antes = versao_instalada(db)
+        alteracoes = migrar(db, forcar)
+        for alteracao in alteracoes:
+            print(f'criado: {alteracao}')
+        print(f'esquema: versão {antes} -> {VERSAO_ESQUEMA}, {len(alteracoes)} alteração(ões)')
+
+    @app.cli.command('reindexar-clientes')
+    def reindexar_clientes():
+        """Reconstrói o índice de busca textual dos clientes"""
+        total = reconstruir_indice_busca(db)
+        print(f'{total} clientes indexados')
+
+    @app.cli.command('limpar-exclusoes')
+    def limpar_exclusoes_comando():
+        """Apaga os registros de exclusão mais velhos que a retenção da sincronização"""
+        total = limpar_exclusoes(db)
+        print(f'{total} exclusões com mais de {RETENCAO_EXCLUSOES.days} dias apagadas')
+
+    @app.cli.command('limpar-uploads')
+    def limpar_uploads():
+        """Descarta uploads em partes abandonados"""
+        total = arquivos.limpar_parciais()
+        print(f'{total} uploads parciais com mais de {arquivos.VALIDADE_PARCIAIS.days} dia(s) sem atividade descartados')
+
+    @app.cli.command('atualizar-segmentos')
+    def atualizar_segmentos():
+        """Traz os membros dos segmentos materializados para o estado atual"""
+        for segmento in Segmento.query.filter_by(materializado=True).all():
+            segmentos.atualizar(segmento)
+            print(f'{segmento.nome}: {segmento.total} clientes')
+
+    @app.cli.command('detectar-duplicados')
+    def detectar_duplicados():
+        """Recalcula as sugestões de clientes duplicados"""
+        resultado = duplicados.detectar()
+        print(f"{resultado['clientes']} clientes, {resultado['pares_candidatos']} pares comparados, "
+              f"{resultado['sugestoes']} sugestões em {resultado['segundos']}s")
+
+
+def create_app(config=None):
+    """
+    Monta o app sem acessar o banco: o esquema é criado/atualizado pelo
+    comando `python src/main.py init_db` (ou `flask --app src.main migrar`).
+    `config` sobrepõe as configurações padrão (ex.: SQLALCHEMY_DATABASE_URI).
+    """
+    from flask_cors import CORS
+    from src.models.user import db
+    from src.services.eventos import registrar_eventos
+    from src.utils.banco import perfil_banco
+    from src.utils.compressao import comprimir_resposta
+    from src.utils.contadores import registrar_versionamento
+    from src.utils.estaticos import ArquivosEstaticos
+    from src.utils.instrumentacao import instrumentar
+
+    config = dict(config or {})
+    app = Flask(__name__, static_folder=PASTA_ESTATICOS)
+    app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+
+    # Banco: SQLite (WAL) em database/app.db ou DATABASE_URL (ver utils/banco.py)
+    perfil = perfil_banco(config.get('SQLALCHEMY_DATABASE_URI'))
+    app.config['SQLALCHEMY_DATABASE_URI'] = perfil.uri
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = perfil.opcoes_engine
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Limite do corpo das requisições (uploads e importações); as partes de
+    # um upload retomável têm limite menor (services/arquivos.py)
+    app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH_MB', '110')) * 1024 * 1024
+    app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_FOLDER') or None
+    app.config.update(config)
+
+    # Habilitar CORS para permitir requisições do frontend
+    CORS(app)
+
+    _registrar_blueprints(app)
+
+    db.init_app(app)
+    registrar_versionamento()
+    # Alterações de entidades vão para o feed /api/events
+    registrar_eventos()
+    with app.app_context():
+        # Cria o engine sem abrir conexões (cada fork do gunicorn abre as suas)
+        perfil.aplicar(db.engine)
+        # Latência, tamanho e SQL por requisição (utils/instrumentacao.py)
+        instrumentar(app, db.engine)
+
+    # Compressão gzip das respostas de texto/JSON; registrada depois da
+    # instrumentação para rodar antes dela (after_request roda em ordem inversa)
+    app.after_request(comprimir_resposta)
+
+    _registrar_comandos(app, db)
+
+    estaticos = ArquivosEstaticos(app.static_folder) if app.static_folder else None
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        if estaticos is None:
             return "Static folder not configured", 404
+        return estaticos.servir(path)
+
+    return app
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+
+def init_db(app, forcar=True):
+    """Cria ou atualiza o esquema do banco configurado no app"""
+    from src.models.user import db
+    from src.utils.esquema import migrar
+
+    with app.app_context():
+        return migrar(db, forcar)
 
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app = create_app()
+    if sys.argv[1:] == ['init_db']:
+        alteracoes = init_db(app)
+        print(f'Banco de dados pronto ({len(alteracoes)} alteração(ões) no esquema)')
+    else:
+        # Servidor de desenvolvimento: aplica o esquema se a versão gravada estiver desatualizada
+        init_db(app, forcar=False)
+        app.run(host='0.0.0.0', port=5000, debug=True)
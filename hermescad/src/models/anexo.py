@@ -0,0 +1,60 @@
+from datetime import datetime
+from src.models.user import db
+
+class Anexo(db.Model):
+    """
+    Arquivo enviado para campanhas (anexo de e-mail ou imagem do
+    WhatsApp). O conteúdo fica no disco sob o SHA-256 (uploads iguais
+    compartilham o mesmo arquivo); campanhas guardam só o id opaco.
+    """
+    __tablename__ = 'anexos'
+    __table_args__ = (
+        db.Index('ix_anexos_sha256_nome', 'sha256', 'nome'),
+    )
+
+    id = db.Column(db.String(32), primary_key=True)
+    sha256 = db.Column(db.String(64), nullable=False)
+    nome = db.Column(db.String(255), nullable=False)
+    tipo = db.Column(db.String(100), nullable=False)
+    tamanho = db.Column(db.BigInteger, nullable=False)
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Anexo {self.id} {self.nome}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'nome': self.nome,
+            'tipo': self.tipo,
+            'tamanho': self.tamanho,
+            'sha256': self.sha256,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None
+        }
+
+
+class UploadParcial(db.Model):
+    """Upload em partes ainda não concluído; os bytes recebidos ficam em uploads/parciais"""
+    __tablename__ = 'uploads_parciais'
+
+    id = db.Column(db.String(32), primary_key=True)
+    nome = db.Column(db.String(255), nullable=False)
+    tamanho = db.Column(db.BigInteger, nullable=False)
+    # Bytes gravados e confirmados; a próxima parte começa aqui
+    recebido = db.Column(db.BigInteger, nullable=False, default=0)
+    # SHA-256 esperado, informado ao iniciar (opcional)
+    sha256 = db.Column(db.String(64))
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<UploadParcial {self.id} {self.recebido}/{self.tamanho}>'
+
+    def to_dict(self):
+        return {
+            'upload_id': self.id,
+            'nome': self.nome,
+            'tamanho': self.tamanho,
+            'recebido': self.recebido,
+            'sha256': self.sha256
+        }
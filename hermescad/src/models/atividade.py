@@ -4,6 +4,14 @@ from src.models.user import db
 
 class Atividade(db.Model):
     __tablename__ = 'atividades'
+    __table_args__ = (
+        # Índices para filtros e ordenação da listagem paginada
+        db.Index('ix_atividades_data_hora', 'data_hora'),
+        db.Index('ix_atividades_cliente_id_data_hora', 'cliente_id', 'data_hora'),
+        db.Index('ix_atividades_status_data_hora', 'status', 'data_hora'),
+        db.Index('ix_atividades_tipo_data_hora', 'tipo', 'data_hora'),
+        db.Index('ix_atividades_atualizado_em', 'atualizado_em'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     cliente_id = db.Column(db.Integer, db.ForeignKey('clientes.id'))
@@ -11,6 +19,8 @@ class Atividade(db.Model):
     descricao = db.Column(db.Text)
     data_hora = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     status = db.Column(db.String(50), nullable=False, default='Pendente')
+    # Renovada a cada INSERT/UPDATE, inclusive em lote (sincronização incremental)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def __repr__(self):
         return f'<Atividade {self.tipo}>'
@@ -22,6 +32,7 @@ class Atividade(db.Model):
             'tipo': self.tipo,
             'descricao': self.descricao,
             'data_hora': self.data_hora.isoformat() if self.data_hora else None,
-            'status': self.status
+            'status': self.status,
+            'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None
         }
 
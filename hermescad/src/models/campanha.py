@@ -0,0 +1,95 @@
+from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
+import json
+from src.models.user import db
+
+class Campanha(db.Model):
+    __tablename__ = 'campanhas'
+
+    # Status possíveis de uma campanha
+    PENDENTE = 'Pendente'
+    ENVIANDO = 'Enviando'
+    CONCLUIDA = 'Concluída'
+    CANCELADA = 'Cancelada'
+    INTERROMPIDA = 'Interrompida'
+    FALHOU = 'Falhou'
+
+    id = db.Column(db.Integer, primary_key=True)
+    canal = db.Column(db.String(20), nullable=False, default='email')
+    assunto = db.Column(db.String(500))
+    corpo = db.Column(db.Text)
+    anexos = db.Column(db.Text)  # Lista JSON de anexos
+    # Segmento de origem dos destinatários (sem chave estrangeira: o segmento pode ser excluído depois)
+    segmento_id = db.Column(db.Integer)
+    status = db.Column(db.String(20), nullable=False, default=PENDENTE)
+    total_destinatarios = db.Column(db.Integer, nullable=False, default=0)
+    enviados = db.Column(db.Integer, nullable=False, default=0)
+    falhas = db.Column(db.Integer, nullable=False, default=0)
+    erro = db.Column(db.Text)
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    iniciado_em = db.Column(db.DateTime)
+    concluido_em = db.Column(db.DateTime)
+    # Renovado durante o envio (a cada lote e periodicamente); permite detectar envios interrompidos
+    heartbeat_em = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<Campanha {self.id} {self.status}>'
+
+    def lista_anexos(self):
+        return json.loads(self.anexos) if self.anexos else []
+
+    def to_dict(self):
+        processados = self.enviados + self.falhas
+        return {
+            'id': self.id,
+            'canal': self.canal,
+            'assunto': self.assunto,
+            'segmento_id': self.segmento_id,
+            'status': self.status,
+            'total_destinatarios': self.total_destinatarios,
+            'enviados': self.enviados,
+            'falhas': self.falhas,
+            'pendentes': max(self.total_destinatarios - processados, 0),
+            'progresso': round(100.0 * processados / self.total_destinatarios, 1) if self.total_destinatarios else 100.0,
+            'erro': self.erro,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
+            'iniciado_em': self.iniciado_em.isoformat() if self.iniciado_em else None,
+            'concluido_em': self.concluido_em.isoformat() if self.concluido_em else None
+        }
+
+
+class CampanhaDestinatario(db.Model):
+    __tablename__ = 'campanha_destinatarios'
+    __table_args__ = (
+        # Busca dos próximos pendentes de cada campanha
+        db.Index('ix_campanha_destinatarios_campanha_status', 'campanha_id', 'status'),
+    )
+
+    PENDENTE = 'Pendente'
+    ENVIADO = 'Enviado'
+    FALHOU = 'Falhou'
+
+    id = db.Column(db.Integer, primary_key=True)
+    campanha_id = db.Column(db.Integer, db.ForeignKey('campanhas.id'), nullable=False)
+    cliente_id = db.Column(db.Integer, db.ForeignKey('clientes.id'))
+    destino = db.Column(db.String(120))
+    status = db.Column(db.String(20), nullable=False, default=PENDENTE)
+    erro = db.Column(db.Text)
+    enviado_em = db.Column(db.DateTime)
+    # Id da mensagem no provedor (WhatsApp), para conferir a entrega
+    id_externo = db.Column(db.String(120))
+
+    def __repr__(self):
+        return f'<CampanhaDestinatario {self.campanha_id}:{self.destino}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'campanha_id': self.campanha_id,
+            'cliente_id': self.cliente_id,
+            'destino': self.destino,
+            'status': self.status,
+            'erro': self.erro,
+            'enviado_em': self.enviado_em.isoformat() if self.enviado_em else None,
+            'id_externo': self.id_externo
+        }
@@ -1,9 +1,18 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy import func
 from src.models.user import db
 
 class Cliente(db.Model):
     __tablename__ = 'clientes'
+    __table_args__ = (
+        # Índices para filtros e ordenação da listagem paginada
+        db.Index('ix_clientes_nome', 'nome'),
+        db.Index('ix_clientes_area_atuacao_nome', 'area_atuacao', 'nome'),
+        db.Index('ix_clientes_possui_whatsapp_nome', 'possui_whatsapp', 'nome'),
+        db.Index('ix_clientes_data_cadastro', 'data_cadastro'),
+        db.Index('ix_clientes_atualizado_em', 'atualizado_em'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(200), nullable=False)
@@ -18,6 +27,8 @@ class Cliente(db.Model):
     cargo = db.Column(db.String(100))
     site = db.Column(db.String(200))
     data_cadastro = db.Column(db.DateTime, default=datetime.utcnow)
+    # Renovada a cada INSERT/UPDATE, inclusive em lote (sincronização incremental)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __repr__(self):
         return f'<Cliente {self.nome}>'
@@ -36,5 +47,10 @@ class Cliente(db.Model):
             'email': self.email,
             'cargo': self.cargo,
             'site': self.site,
-            'data_cadastro': self.data_cadastro.isoformat() if self.data_cadastro else None
-        }
\ No newline at end of file
+            'data_cadastro': self.data_cadastro.isoformat() if self.data_cadastro else None,
+            'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None
+        }
+
+
+# Busca por e-mail sem diferenciar maiúsculas (upsert da importação)
+db.Index('ix_clientes_email_minusculo', func.lower(Cliente.email))
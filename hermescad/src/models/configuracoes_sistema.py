@@ -12,6 +12,12 @@ class ConfiguracoesSistema(db.Model):
     email_user = db.Column(db.String(120))
     email_password = db.Column(db.String(200))
     email_use_tls = db.Column(db.Boolean, default=True)
+    email_remetente = db.Column(db.String(120))
+    
+    # Limites de envio (entrega em paralelo com reaproveitamento de conexão)
+    email_max_conexoes = db.Column(db.Integer, default=4)
+    email_mensagens_por_conexao = db.Column(db.Integer, default=100)
+    email_taxa_por_segundo = db.Column(db.Float, default=10.0)
     
     # Configurações de Personalização
     cor_primaria = db.Column(db.String(7), default='#007bff')  # Hex color
@@ -31,6 +37,10 @@ class ConfiguracoesSistema(db.Model):
             'email_user': self.email_user,
             'email_password': self.email_password,  # Em produção, não retornar a senha
             'email_use_tls': self.email_use_tls,
+            'email_remetente': self.email_remetente,
+            'email_max_conexoes': self.email_max_conexoes,
+            'email_mensagens_por_conexao': self.email_mensagens_por_conexao,
+            'email_taxa_por_segundo': self.email_taxa_por_segundo,
             'cor_primaria': self.cor_primaria,
             'cor_secundaria': self.cor_secundaria,
             'logo_url': self.logo_url,
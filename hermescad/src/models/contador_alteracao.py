@@ -0,0 +1,15 @@
+from src.models.user import db
+
+class ContadorAlteracao(db.Model):
+    """
+    Versão de um conjunto de dados (ex.: 'configuracoes'), incrementada na
+    mesma transação que o altera. Processos diferentes comparam a versão
+    para saber se o que têm em memória ainda vale.
+    """
+    __tablename__ = 'contadores_alteracao'
+
+    nome = db.Column(db.String(50), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ContadorAlteracao {self.nome}={self.versao}>'
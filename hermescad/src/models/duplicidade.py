@@ -0,0 +1,61 @@
+from datetime import datetime
+import json
+from src.models.user import db
+
+class ChaveCliente(db.Model):
+    """
+    Chave de bloqueio de um cliente (documento só com dígitos, e-mail em
+    minúsculas, telefone em E.164, chave fonética do nome). Só clientes
+    que compartilham uma chave são comparados (services/duplicados.py).
+    """
+    __tablename__ = 'cliente_chaves'
+    __table_args__ = (
+        db.Index('ix_cliente_chaves_cliente_id', 'cliente_id'),
+    )
+
+    # A chave primária (chave, cliente_id) é o índice de bloqueio
+    chave = db.Column(db.String(200), primary_key=True)
+    # Sem chave estrangeira: as chaves são reconstruídas a cada detecção
+    cliente_id = db.Column(db.Integer, primary_key=True)
+
+    def __repr__(self):
+        return f'<ChaveCliente {self.chave}:{self.cliente_id}>'
+
+
+class Duplicidade(db.Model):
+    """Par de clientes provavelmente duplicados, com a pontuação e os motivos"""
+    __tablename__ = 'duplicidades'
+    __table_args__ = (
+        db.UniqueConstraint('cliente_id', 'duplicado_id', name='uq_duplicidades_par'),
+        db.Index('ix_duplicidades_status_pontuacao', 'status', 'pontuacao'),
+        db.Index('ix_duplicidades_duplicado_id', 'duplicado_id'),
+    )
+
+    PENDENTE = 'Pendente'
+    IGNORADA = 'Ignorada'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Sugestão: manter cliente_id (o mais antigo) e mesclar duplicado_id nele
+    cliente_id = db.Column(db.Integer, nullable=False)
+    duplicado_id = db.Column(db.Integer, nullable=False)
+    pontuacao = db.Column(db.Float, nullable=False)
+    motivos = db.Column(db.Text)  # Lista JSON: documento, email, telefone, nome
+    status = db.Column(db.String(20), nullable=False, default=PENDENTE)
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Duplicidade {self.cliente_id}~{self.duplicado_id} {self.pontuacao:.2f}>'
+
+    def lista_motivos(self):
+        return json.loads(self.motivos) if self.motivos else []
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'cliente_id': self.cliente_id,
+            'duplicado_id': self.duplicado_id,
+            'pontuacao': round(self.pontuacao, 3),
+            'motivos': self.lista_motivos(),
+            'status': self.status,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None
+        }
@@ -0,0 +1,21 @@
+from datetime import datetime
+from src.models.user import db
+
+class Exclusao(db.Model):
+    """
+    Registro (tombstone) de uma linha excluída, gravado por gatilho no
+    banco na mesma transação do DELETE. Permite que ?updated_since= informe
+    as exclusões a quem sincroniza só as alterações.
+    """
+    __tablename__ = 'exclusoes'
+    __table_args__ = (
+        db.Index('ix_exclusoes_tabela_excluido_em', 'tabela', 'excluido_em'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    tabela = db.Column(db.String(50), nullable=False)
+    registro_id = db.Column(db.Integer, nullable=False)
+    excluido_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Exclusao {self.tabela}:{self.registro_id}>'
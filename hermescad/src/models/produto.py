@@ -1,13 +1,19 @@
 from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime
 from src.models.user import db
 
 class Produto(db.Model):
     __tablename__ = 'produtos'
+    __table_args__ = (
+        db.Index('ix_produtos_atualizado_em', 'atualizado_em'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(200), nullable=False, unique=True)
     descricao = db.Column(db.Text)
     preco = db.Column(db.Float, nullable=False)
+    # Renovada a cada INSERT/UPDATE, inclusive em lote (sincronização incremental)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def __repr__(self):
         return f'<Produto {self.nome}>'
@@ -17,6 +23,7 @@ class Produto(db.Model):
             'id': self.id,
             'nome': self.nome,
             'descricao': self.descricao,
-            'preco': self.preco
+            'preco': self.preco,
+            'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None
         }
 
@@ -0,0 +1,49 @@
+from datetime import datetime
+import json
+from src.models.user import db
+
+class Segmento(db.Model):
+    """
+    Público salvo para campanhas: um conjunto de filtros sobre os clientes
+    (ver services/segmentos.py), avaliado no banco. Um segmento
+    materializado guarda os membros em segmento_membros, atualizados de
+    forma incremental a partir de calculado_em.
+    """
+    __tablename__ = 'segmentos'
+
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(200), nullable=False, unique=True)
+    filtros = db.Column(db.Text, nullable=False, default='{}')  # Objeto JSON
+    materializado = db.Column(db.Boolean, nullable=False, default=False)
+    # Membros na última avaliação e o momento em que ela começou
+    total = db.Column(db.Integer)
+    calculado_em = db.Column(db.DateTime)
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Segmento {self.nome}>'
+
+    def dicionario_filtros(self):
+        return json.loads(self.filtros) if self.filtros else {}
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'nome': self.nome,
+            'filtros': self.dicionario_filtros(),
+            'materializado': self.materializado,
+            'total': self.total,
+            'calculado_em': self.calculado_em.isoformat() if self.calculado_em else None,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None
+        }
+
+
+class SegmentoMembro(db.Model):
+    __tablename__ = 'segmento_membros'
+
+    segmento_id = db.Column(db.Integer, db.ForeignKey('segmentos.id'), primary_key=True)
+    # Sem chave estrangeira: clientes excluídos saem na próxima atualização
+    cliente_id = db.Column(db.Integer, primary_key=True)
+
+    def __repr__(self):
+        return f'<SegmentoMembro {self.segmento_id}:{self.cliente_id}>'
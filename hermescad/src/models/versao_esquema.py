@@ -0,0 +1,17 @@
+from datetime import datetime
+from src.models.user import db
+
+class VersaoEsquema(db.Model):
+    """
+    Versão do esquema aplicada ao banco (uma única linha). Comparada com
+    VERSAO_ESQUEMA em utils/esquema.py para decidir se a migração precisa
+    rodar.
+    """
+    __tablename__ = 'versao_esquema'
+
+    id = db.Column(db.Integer, primary_key=True)
+    versao = db.Column(db.Integer, nullable=False)
+    atualizado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<VersaoEsquema {self.versao}>'
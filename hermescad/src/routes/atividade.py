@@ -1,29 +1,159 @@
 from flask import Blueprint, request, jsonify
-from datetime import datetime
+from datetime import datetime, timedelta
 from src.models.user import db
 from src.models.atividade import Atividade
+from src.utils.sinais import avisar_alteracao
+from src.utils.lote import executar_lote
+from src.utils.cache_http import com_etag
+from src.utils.campos import Projecao, ler_campos
+from src.utils.sincronizacao import com_token_sincronizacao, responder_alteracoes
+from src.utils.streaming import formato_stream, iterar_em_lotes, resposta_stream
+from src.utils.paginacao import (
+    ParametroInvalido, ler_data, ler_inteiro, ler_ordenacao, ordenar, paginar, pagina_solicitada
+)
 
 atividade_bp = Blueprint('atividade', __name__)
 
+# Chaves de ordenação aceitas em ?sort= (prefixo '-' para decrescente)
+ORDENACOES_ATIVIDADE = {
+    'id': Atividade.id,
+    'data_hora': Atividade.data_hora,
+}
+
+# Limites da agenda: intervalo máximo consultado e atividades por resposta
+MAXIMO_DIAS_AGENDA = 366
+LIMITE_AGENDA = 5000
+
+# Campos que podem ser gravados pelo endpoint de lote
+CAMPOS_ATIVIDADE = ('cliente_id', 'tipo', 'descricao', 'data_hora', 'status')
+
+def filtrar_atividades(query, args):
+    """Aplica os filtros de listagem de atividades informados na query string"""
+    if args.get('status'):
+        query = query.filter(Atividade.status == args['status'])
+    if args.get('tipo'):
+        query = query.filter(Atividade.tipo == args['tipo'])
+    if args.get('cliente_id'):
+        query = query.filter(Atividade.cliente_id == ler_inteiro(args['cliente_id'], 'cliente_id'))
+    if args.get('data_hora_inicio'):
+        query = query.filter(Atividade.data_hora >= ler_data(args['data_hora_inicio'], 'data_hora_inicio'))
+    if args.get('data_hora_fim'):
+        query = query.filter(Atividade.data_hora < ler_data(args['data_hora_fim'], 'data_hora_fim'))
+    return query
+
 @atividade_bp.route('/atividades', methods=['GET'])
+@com_etag('atividades')
+@com_token_sincronizacao
 def get_atividades():
-    atividades = Atividade.query.all()
-    return jsonify([atividade.to_dict() for atividade in atividades])
+    """
+    Lista atividades. Com ?limit= e/ou ?cursor= responde uma página
+    ({'items', 'next_cursor'}); sem eles mantém a lista completa.
+    Com Accept: application/x-ndjson ou ?stream=1 a lista é enviada em
+    streaming. ?fields= limita as colunas lidas e devolvidas.
+    ?updated_since=<token> devolve só as alterações (utils/sincronizacao.py).
+    """
+    try:
+        projecao = ler_campos(request.args, Atividade)
+        query = filtrar_atividades(Atividade.query, request.args)
+        if 'updated_since' in request.args:
+            return responder_alteracoes(projecao.aplicar(query), Atividade, projecao, request.args['updated_since'])
+
+        chave, coluna, descendente = ler_ordenacao(request.args, ORDENACOES_ATIVIDADE, 'id')
+        query = projecao.aplicar(query, coluna, Atividade.id)
+
+        formato = formato_stream(request)
+        if formato:
+            query = ordenar(query, coluna, descendente, Atividade.id)
+            return resposta_stream(iterar_em_lotes(query), projecao.serializar, formato)
+
+        if not pagina_solicitada(request.args):
+            linhas = ordenar(query, coluna, descendente, Atividade.id).all()
+            return jsonify([projecao.serializar(linha) for linha in linhas])
+
+        linhas, proximo_cursor = paginar(query, request.args, chave, coluna, descendente, Atividade.id)
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'items': [projecao.serializar(linha) for linha in linhas],
+        'next_cursor': proximo_cursor
+    })
 
 @atividade_bp.route('/atividades/<int:id>', methods=['GET'])
+@com_etag('atividades')
 def get_atividade(id):
     atividade = Atividade.query.get_or_404(id)
     return jsonify(atividade.to_dict())
 
 @atividade_bp.route('/atividades/cliente/<int:cliente_id>', methods=['GET'])
+@com_etag('atividades')
 def get_atividades_by_cliente(cliente_id):
-    atividades = Atividade.query.filter_by(cliente_id=cliente_id).all()
-    return jsonify([atividade.to_dict() for atividade in atividades])
+    try:
+        projecao = ler_campos(request.args, Atividade)
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    # Percorre o índice (cliente_id, data_hora) em vez de varrer a tabela
+    linhas = (projecao.aplicar(Atividade.query).filter_by(cliente_id=cliente_id)
+              .order_by(Atividade.data_hora, Atividade.id).all())
+    return jsonify([projecao.serializar(linha) for linha in linhas])
+
+def _ler_limite_agenda(valor, nome):
+    data = ler_data(valor, nome)
+    # Data sem hora em ?to= inclui o dia inteiro
+    if nome == 'to' and len(valor) == 10:
+        data += timedelta(days=1)
+    return data
+
+@atividade_bp.route('/atividades/agenda', methods=['GET'])
+@com_etag('atividades')
+def get_agenda():
+    """
+    Atividades de um intervalo (?from= e ?to=, ISO 8601; ?to= é exclusivo,
+    a não ser que seja só a data) em ordem cronológica, com os filtros
+    opcionais ?status=, ?tipo= e ?cliente_id=. Com ?agrupar=dia a resposta
+    traz um item por dia do intervalo, inclusive os dias sem atividades.
+    As consultas usam os índices (status|tipo|cliente_id, data_hora).
+    """
+    try:
+        if not request.args.get('from') or not request.args.get('to'):
+            raise ParametroInvalido('Informe from e to')
+        inicio = _ler_limite_agenda(request.args['from'], 'from')
+        fim = _ler_limite_agenda(request.args['to'], 'to')
+        if fim <= inicio:
+            raise ParametroInvalido('to deve ser posterior a from')
+        if fim - inicio > timedelta(days=MAXIMO_DIAS_AGENDA):
+            raise ParametroInvalido(f'O intervalo máximo é de {MAXIMO_DIAS_AGENDA} dias')
+        agrupar = request.args.get('agrupar')
+        if agrupar not in (None, 'dia'):
+            raise ParametroInvalido('agrupar aceita apenas: dia')
+
+        args = {chave: request.args[chave] for chave in ('status', 'tipo', 'cliente_id') if chave in request.args}
+        query = filtrar_atividades(Atividade.query, args)
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Somente leitura: tuplas das colunas, sem montar objetos ORM
+    projecao = Projecao(Atividade, [coluna.name for coluna in Atividade.__table__.columns])
+    linhas = (projecao.aplicar(query.filter(Atividade.data_hora >= inicio, Atividade.data_hora < fim))
+              .order_by(Atividade.data_hora, Atividade.id)
+              .limit(LIMITE_AGENDA + 1).all())
+    truncado = len(linhas) > LIMITE_AGENDA
+    itens = [projecao.serializar(linha) for linha in linhas[:LIMITE_AGENDA]]
+
+    resposta = {'from': inicio.isoformat(), 'to': fim.isoformat(), 'truncado': truncado}
+    if agrupar == 'dia':
+        dias = {}
+        dia = inicio.date()
+        while datetime.combine(dia, datetime.min.time()) < fim:
+            dias[dia.isoformat()] = []
+            dia += timedelta(days=1)
+        for item in itens:
+            dias[item['data_hora'][:10]].append(item)
+        resposta['dias'] = [{'data': data, 'atividades': lista} for data, lista in dias.items()]
+    else:
+        resposta['items'] = itens
+    return jsonify(resposta)
 
-@atividade_bp.route('/atividades/oportunidade/<int:oportunidade_id>', methods=['GET'])
-def get_atividades_by_oportunidade(oportunidade_id):
-    atividades = Atividade.query.filter_by(oportunidade_id=oportunidade_id).all()
-    return jsonify([atividade.to_dict() for atividade in atividades])
 
 @atividade_bp.route('/atividades', methods=['POST'])
 def create_atividade():
@@ -39,7 +169,6 @@ def create_atividade():
     
     atividade = Atividade(
         cliente_id=data.get('cliente_id'),
-        oportunidade_id=data.get('oportunidade_id'),
         tipo=data.get('tipo'),
         descricao=data.get('descricao'),
         data_hora=data_hora,
@@ -49,10 +178,11 @@ def create_atividade():
     try:
         db.session.add(atividade)
         db.session.commit()
-        return jsonify(atividade.to_dict()), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
+    avisar_alteracao('atividade', acao='create', ids=[atividade.id])
+    return jsonify(atividade.to_dict()), 201
 
 @atividade_bp.route('/atividades/<int:id>', methods=['PUT'])
 def update_atividade(id):
@@ -72,10 +202,11 @@ def update_atividade(id):
     
     try:
         db.session.commit()
-        return jsonify(atividade.to_dict())
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
+    avisar_alteracao('atividade', acao='update', ids=[atividade.id])
+    return jsonify(atividade.to_dict())
 
 @atividade_bp.route('/atividades/<int:id>', methods=['DELETE'])
 def delete_atividade(id):
@@ -84,8 +215,14 @@ def delete_atividade(id):
     try:
         db.session.delete(atividade)
         db.session.commit()
-        return jsonify({'message': 'Atividade deletada com sucesso'}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
+    avisar_alteracao('atividade', acao='delete', ids=[id])
+    return jsonify({'message': 'Atividade deletada com sucesso'}), 200
 
+@atividade_bp.route('/atividades/batch', methods=['POST'])
+def batch_atividades():
+    """Cria, altera e exclui atividades em uma única transação (ver utils/lote.py)"""
+    resposta, status = executar_lote(Atividade, 'atividade', request.get_json(silent=True), CAMPOS_ATIVIDADE)
+    return jsonify(resposta), status
@@ -1,15 +1,179 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+import json
+from sqlalchemy import select
 from src.models.user import db
 from src.models.cliente import Cliente
+from src.models.duplicidade import Duplicidade
+from src.utils.sinais import avisar_alteracao
+from src.utils.lote import executar_lote
+from src.utils.cache_http import com_etag
+from src.utils.campos import ler_campos
+from src.utils.sincronizacao import com_token_sincronizacao, responder_alteracoes
+from src.utils.streaming import MIMETYPE_NDJSON, formato_stream, iterar_em_lotes, resposta_stream
+from src.utils.paginacao import (
+    ParametroInvalido, ler_bool, ler_data, ler_inteiro, ler_ordenacao, ordenar, paginar, pagina_solicitada
+)
+from src.services import duplicados
+from src.services.importacao import ArquivoInvalido, importar_clientes
+from src.utils.busca import LIMITE_BUSCA_MAXIMO, LIMITE_BUSCA_PADRAO, busca_disponivel, buscar_ids_clientes
 
 cliente_bp = Blueprint('cliente', __name__)
 
+# Chaves de ordenação aceitas em ?sort= (prefixo '-' para decrescente)
+ORDENACOES_CLIENTE = {
+    'id': Cliente.id,
+    'nome': Cliente.nome,
+}
+
+# Campos que podem ser gravados pelo endpoint de lote
+CAMPOS_CLIENTE = (
+    'nome', 'endereco', 'numero_telefone', 'numero_celular', 'possui_whatsapp', 'area_atuacao',
+    'cpf_cnpj', 'informacoes_financeiras', 'email', 'cargo', 'site'
+)
+
+def filtrar_clientes(query, args):
+    """Aplica os filtros de listagem de clientes informados na query string"""
+    if args.get('area_atuacao'):
+        query = query.filter(Cliente.area_atuacao == args['area_atuacao'])
+    if args.get('possui_whatsapp'):
+        query = query.filter(Cliente.possui_whatsapp == ler_bool(args['possui_whatsapp'], 'possui_whatsapp'))
+    if args.get('data_cadastro_inicio'):
+        query = query.filter(Cliente.data_cadastro >= ler_data(args['data_cadastro_inicio'], 'data_cadastro_inicio'))
+    if args.get('data_cadastro_fim'):
+        query = query.filter(Cliente.data_cadastro < ler_data(args['data_cadastro_fim'], 'data_cadastro_fim'))
+    return query
+
 @cliente_bp.route('/clientes', methods=['GET'])
+@com_etag('clientes')
+@com_token_sincronizacao
 def get_clientes():
-    clientes = Cliente.query.all()
-    return jsonify([cliente.to_dict() for cliente in clientes])
+    """
+    Lista clientes. Com ?limit= e/ou ?cursor= responde uma página
+    ({'items', 'next_cursor'}); sem eles mantém a lista completa.
+    Com Accept: application/x-ndjson ou ?stream=1 a lista é enviada em
+    streaming. ?fields=id,nome,email limita as colunas lidas e devolvidas.
+    ?updated_since=<token> devolve só as alterações (utils/sincronizacao.py).
+    """
+    try:
+        projecao = ler_campos(request.args, Cliente)
+        query = filtrar_clientes(Cliente.query, request.args)
+        if 'updated_since' in request.args:
+            return responder_alteracoes(projecao.aplicar(query), Cliente, projecao, request.args['updated_since'])
+
+        chave, coluna, descendente = ler_ordenacao(request.args, ORDENACOES_CLIENTE, 'id')
+        query = projecao.aplicar(query, coluna, Cliente.id)
+
+        formato = formato_stream(request)
+        if formato:
+            query = ordenar(query, coluna, descendente, Cliente.id)
+            return resposta_stream(iterar_em_lotes(query), projecao.serializar, formato)
+
+        if not pagina_solicitada(request.args):
+            linhas = ordenar(query, coluna, descendente, Cliente.id).all()
+            return jsonify([projecao.serializar(linha) for linha in linhas])
+
+        linhas, proximo_cursor = paginar(query, request.args, chave, coluna, descendente, Cliente.id)
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'items': [projecao.serializar(linha) for linha in linhas],
+        'next_cursor': proximo_cursor
+    })
+
+@cliente_bp.route('/clientes/search', methods=['GET'])
+@com_etag('clientes')
+def search_clientes():
+    """
+    Busca textual nos clientes (nome, e-mail, área, cargo, CPF/CNPJ,
+    endereço e telefones), por prefixo e sem diferenciar acentos,
+    ordenada por relevância
+    """
+    termo = request.args.get('q', '').strip()
+    if not termo:
+        return jsonify({'error': 'Parâmetro q é obrigatório'}), 400
+
+    try:
+        limite = ler_inteiro(request.args.get('limit', str(LIMITE_BUSCA_PADRAO)), 'limit')
+        projecao = ler_campos(request.args, Cliente)
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    limite = max(1, min(limite, LIMITE_BUSCA_MAXIMO))
+
+    if not busca_disponivel(db.engine):
+        padrao = f'%{termo}%'
+        linhas = (
+            projecao.aplicar(Cliente.query)
+            .filter(db.or_(Cliente.nome.ilike(padrao), Cliente.email.ilike(padrao), Cliente.cpf_cnpj.ilike(padrao)))
+            .order_by(Cliente.nome)
+            .limit(limite)
+            .all()
+        )
+        return jsonify([projecao.serializar(linha) for linha in linhas])
+
+    ids = buscar_ids_clientes(db, termo, limite)
+    if not ids:
+        return jsonify([])
+    # O id (sempre lido) reordena as linhas pela relevância da busca
+    linhas = {linha.id: linha for linha in
+              projecao.aplicar(Cliente.query, Cliente.id).filter(Cliente.id.in_(ids)).all()}
+    return jsonify([projecao.serializar(linhas[id]) for id in ids if id in linhas])
+
+@cliente_bp.route('/clientes/import', methods=['POST'])
+def import_clientes():
+    """
+    Importa clientes de um arquivo CSV ou XLSX (campo 'file' do formulário
+    ou o próprio corpo com Content-Type text/csv). Clientes com o mesmo
+    cpf_cnpj ou e-mail são atualizados. Com Accept: application/x-ndjson
+    o progresso de cada lote é enviado em streaming.
+    """
+    if 'file' in request.files:
+        arquivo = request.files['file']
+        stream = arquivo.stream
+        nome = (arquivo.filename or '').lower()
+    elif request.mimetype in ('text/csv', 'application/octet-stream'):
+        stream = request.stream
+        nome = ''
+    else:
+        return jsonify({'error': 'Nenhum arquivo enviado'}), 400
+
+    formato = request.args.get('formato') or ('xlsx' if nome.endswith('.xlsx') else 'csv')
+    progresso = importar_clientes(stream, formato)
+
+    # O cabeçalho é lido na primeira etapa: arquivo inválido ainda vira 400
+    # antes de o streaming começar
+    try:
+        etapa = next(progresso)
+    except ArquivoInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('Falha na importação de clientes')
+        return jsonify({'error': 'Erro interno na importação'}), 500
+
+    if formato_stream(request) == 'ndjson':
+        def gerar():
+            yield json.dumps(etapa, ensure_ascii=False) + '\n'
+            try:
+                for proxima in progresso:
+                    yield json.dumps(proxima, ensure_ascii=False) + '\n'
+            except Exception:
+                db.session.rollback()
+                current_app.logger.exception('Falha na importação de clientes')
+                yield json.dumps({'error': 'Erro interno na importação'}, ensure_ascii=False) + '\n'
+        return Response(stream_with_context(gerar()), mimetype=MIMETYPE_NDJSON)
+
+    try:
+        for etapa in progresso:
+            pass
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('Falha na importação de clientes')
+        return jsonify({'error': 'Erro interno na importação'}), 500
+    return jsonify(etapa), 200
 
 @cliente_bp.route('/clientes/<int:id>', methods=['GET'])
+@com_etag('clientes')
 def get_cliente(id):
     cliente = Cliente.query.get_or_404(id)
     return jsonify(cliente.to_dict())
@@ -35,10 +199,11 @@ def create_cliente():
     try:
         db.session.add(cliente)
         db.session.commit()
-        return jsonify(cliente.to_dict()), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
+    avisar_alteracao('cliente', acao='create', ids=[cliente.id])
+    return jsonify(cliente.to_dict()), 201
 
 @cliente_bp.route('/clientes/<int:id>', methods=['PUT'])
 def update_cliente(id):
@@ -61,10 +226,11 @@ def update_cliente(id):
     
     try:
         db.session.commit()
-        return jsonify(cliente.to_dict())
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
+    avisar_alteracao('cliente', acao='update', ids=[cliente.id])
+    return jsonify(cliente.to_dict())
 
 @cliente_bp.route('/clientes/<int:id>', methods=['DELETE'])
 def delete_cliente(id):
@@ -73,8 +239,98 @@ def delete_cliente(id):
     try:
         db.session.delete(cliente)
         db.session.commit()
-        return jsonify({'message': 'Cliente deletado com sucesso'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    avisar_alteracao('cliente', acao='delete', ids=[id])
+    return jsonify({'message': 'Cliente deletado com sucesso'}), 200
+
+@cliente_bp.route('/clientes/batch', methods=['POST'])
+def batch_clientes():
+    """Cria, altera e exclui clientes em uma única transação (ver utils/lote.py)"""
+    resposta, status = executar_lote(Cliente, 'cliente', request.get_json(silent=True), CAMPOS_CLIENTE)
+    return jsonify(resposta), status
+
+# Dados dos clientes mostrados em cada sugestão de duplicidade
+CAMPOS_RESUMO_DUPLICIDADE = ('id', 'nome', 'email', 'cpf_cnpj', 'numero_telefone', 'numero_celular', 'data_cadastro')
+
+@cliente_bp.route('/clientes/duplicados', methods=['GET'])
+def get_duplicados():
+    """
+    Sugestões de clientes duplicados, da maior para a menor pontuação,
+    paginadas por cursor (?limit=, ?cursor=). Geradas por
+    POST /clientes/duplicados/detectar.
+    """
+    ativos = select(Cliente.id)
+    query = Duplicidade.query.filter(
+        Duplicidade.status == Duplicidade.PENDENTE,
+        Duplicidade.cliente_id.in_(ativos),
+        Duplicidade.duplicado_id.in_(ativos)
+    )
+    try:
+        sugestoes, proximo_cursor = paginar(
+            query, request.args, 'pontuacao', Duplicidade.pontuacao, True, Duplicidade.id
+        )
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+
+    ids = {id for sugestao in sugestoes for id in (sugestao.cliente_id, sugestao.duplicado_id)}
+    colunas = [getattr(Cliente, campo) for campo in CAMPOS_RESUMO_DUPLICIDADE]
+    clientes = {linha.id: linha for linha in db.session.execute(select(*colunas).where(Cliente.id.in_(ids)))}
+
+    def resumo(id):
+        linha = clientes[id]
+        return {campo: (valor.isoformat() if hasattr(valor, 'isoformat') else valor)
+                for campo, valor in zip(CAMPOS_RESUMO_DUPLICIDADE, linha)}
+
+    return jsonify({
+        'items': [dict(sugestao.to_dict(), cliente=resumo(sugestao.cliente_id), duplicado=resumo(sugestao.duplicado_id))
+                  for sugestao in sugestoes],
+        'next_cursor': proximo_cursor
+    })
+
+@cliente_bp.route('/clientes/duplicados/detectar', methods=['POST'])
+def detectar_duplicados():
+    """Recalcula as sugestões de duplicidade (ver services/duplicados.py)"""
+    try:
+        return jsonify(duplicados.detectar()), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@cliente_bp.route('/clientes/duplicados/<int:id>/ignorar', methods=['POST'])
+def ignorar_duplicidade(id):
+    """Marca o par como não duplicado; ele não volta a ser sugerido"""
+    sugestao = Duplicidade.query.get_or_404(id)
+    sugestao.status = Duplicidade.IGNORADA
+    db.session.commit()
+    return jsonify(sugestao.to_dict())
+
+@cliente_bp.route('/clientes/<int:id>/mesclar', methods=['POST'])
+def mesclar_cliente(id):
+    """
+    Mescla o cliente {"duplicado_id": n} neste: campos vazios são
+    completados, as atividades do duplicado passam para este cliente e o
+    duplicado é excluído.
+    """
+    cliente = Cliente.query.get_or_404(id)
+    data = request.get_json(silent=True) or {}
+    try:
+        duplicado_id = ler_inteiro(str(data.get('duplicado_id', '')), 'duplicado_id')
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    duplicado = db.get_or_404(Cliente, duplicado_id)
+
+    try:
+        atividades = duplicados.mesclar(cliente, duplicado)
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
+    avisar_alteracao('cliente', acao='delete', ids=[duplicado_id])
+    avisar_alteracao('cliente', acao='update', ids=[cliente.id])
+    if atividades:
+        avisar_alteracao('atividade', acao='update', ids=atividades)
+    return jsonify({'cliente': cliente.to_dict(), 'atividades_transferidas': len(atividades)})
@@ -1,90 +1,71 @@
 from flask import Blueprint, request, jsonify
+from email.mime.text import MIMEText
 from src.models.user import db
-from src.models.configuracoes_sistema import ConfiguracoesSistema
+from src.services.configuracoes import configuracoes
+from src.services.smtp import ConfiguracaoSMTP, PoolSMTP
+from src.utils.cache_http import com_etag
+from src.utils.paginacao import ParametroInvalido
 
 configuracoes_sistema_bp = Blueprint('configuracoes_sistema', __name__)
 
-@configuracoes_sistema_bp.route('/api/configuracoes_sistema', methods=['GET'])
+@configuracoes_sistema_bp.route('/configuracoes_sistema', methods=['GET'])
+@com_etag('configuracoes')
 def get_configuracoes():
     """Obter configurações do sistema"""
     try:
-        # Sempre retorna a primeira configuração ou cria uma nova se não existir
-        config = ConfiguracoesSistema.query.first()
-        if not config:
-            # Criar configuração padrão
-            config = ConfiguracoesSistema()
-            db.session.add(config)
-            db.session.commit()
-        
+        config = configuracoes.obter()
+
         # Não retornar a senha por segurança
         config_dict = config.to_dict()
         config_dict['email_password'] = '***' if config.email_password else ''
-        
+
         return jsonify(config_dict), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@configuracoes_sistema_bp.route('/api/configuracoes_sistema', methods=['POST'])
+@configuracoes_sistema_bp.route('/configuracoes_sistema/personalizacao', methods=['GET'])
+@com_etag('configuracoes')
+def get_personalizacao():
+    """Cores, logo, slogan e nome da empresa (sem dados de e-mail)"""
+    return jsonify(configuracoes.obter().personalizacao()), 200
+
+@configuracoes_sistema_bp.route('/configuracoes_sistema', methods=['POST'])
 def save_configuracoes():
     """Salvar configurações do sistema"""
     try:
-        data = request.get_json()
-        
-        # Obter ou criar configuração
-        config = ConfiguracoesSistema.query.first()
-        if not config:
-            config = ConfiguracoesSistema()
-        
-        # Atualizar campos de e-mail
-        if 'email_server' in data:
-            config.email_server = data['email_server']
-        if 'email_port' in data:
-            config.email_port = data['email_port']
-        if 'email_user' in data:
-            config.email_user = data['email_user']
-        if 'email_password' in data and data['email_password'] != '***':
-            config.email_password = data['email_password']
-        if 'email_use_tls' in data:
-            config.email_use_tls = data['email_use_tls']
-        
-        # Atualizar campos de personalização
-        if 'cor_primaria' in data:
-            config.cor_primaria = data['cor_primaria']
-        if 'cor_secundaria' in data:
-            config.cor_secundaria = data['cor_secundaria']
-        if 'logo_url' in data:
-            config.logo_url = data['logo_url']
-        if 'slogan' in data:
-            config.slogan = data['slogan']
-        if 'nome_empresa' in data:
-            config.nome_empresa = data['nome_empresa']
-        
-        db.session.add(config)
-        db.session.commit()
-        
+        data = request.get_json(silent=True)
+        configuracoes.salvar(data)
         return jsonify({'message': 'Configurações salvas com sucesso!'}), 200
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-@configuracoes_sistema_bp.route('/api/configuracoes_sistema/email/test', methods=['POST'])
+@configuracoes_sistema_bp.route('/configuracoes_sistema/email/test', methods=['POST'])
 def test_email():
     """Testar configurações de e-mail"""
     try:
         data = request.get_json()
         email_destino = data.get('email_destino')
-        
+
         if not email_destino:
             return jsonify({'error': 'E-mail de destino é obrigatório'}), 400
-        
+
         # Obter configurações
-        config = ConfiguracoesSistema.query.first()
-        if not config or not config.email_server:
+        config = configuracoes.obter()
+        if not config.email_server:
             return jsonify({'error': 'Configurações de e-mail não encontradas'}), 400
-        
-        # Aqui você implementaria o teste real de envio de e-mail
-        # Por enquanto, retornamos sucesso simulado
+
+        smtp_config = ConfiguracaoSMTP.de_configuracoes(config)
+        msg = MIMEText('Este é um e-mail de teste do HermesCad CRM.', 'plain')
+        msg['From'] = smtp_config.remetente
+        msg['To'] = email_destino
+        msg['Subject'] = 'HermesCad - E-mail de teste'
+
+        with PoolSMTP(smtp_config) as pool:
+            pool.enviar(email_destino, msg.as_string())
+
         return jsonify({'message': f'E-mail de teste enviado para {email_destino} com sucesso!'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-
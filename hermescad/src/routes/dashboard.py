@@ -0,0 +1,80 @@
+from flask import Blueprint, jsonify
+from datetime import datetime, timedelta
+import os
+from sqlalchemy import func
+from src.models.user import db
+from src.models.cliente import Cliente
+from src.models.atividade import Atividade
+from src.models.campanha import Campanha
+from src.utils.cache import CacheTemporario
+from src.utils.sinais import entidade_alterada
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+# Validade (segundos) das estatísticas em cache
+DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', '30'))
+MESES_NOVOS_CLIENTES = 12
+
+cache_estatisticas = CacheTemporario(DASHBOARD_CACHE_TTL)
+
+@entidade_alterada.connect
+def _invalidar_estatisticas(sender, **kwargs):
+    if sender in ('cliente', 'atividade', 'campanha'):
+        cache_estatisticas.invalidar()
+
+def _contagem_por(coluna):
+    linhas = db.session.query(coluna, func.count()).group_by(coluna).all()
+    return {(valor if valor is not None else 'Não informado'): total for valor, total in linhas}
+
+def _mes(coluna):
+    """Expressão SQL que trunca uma data para o mês (AAAA-MM)"""
+    if db.engine.dialect.name == 'postgresql':
+        return func.to_char(coluna, 'YYYY-MM')
+    return func.strftime('%Y-%m', coluna)
+
+def calcular_estatisticas():
+    agora = datetime.utcnow()
+    meses = agora.year * 12 + agora.month - MESES_NOVOS_CLIENTES
+    inicio_periodo = datetime(meses // 12, meses % 12 + 1, 1)
+
+    def novos_desde(data):
+        return db.session.query(func.count(Cliente.id)).filter(Cliente.data_cadastro >= data).scalar()
+
+    mes = _mes(Cliente.data_cadastro)
+    novos_por_mes = (
+        db.session.query(mes, func.count(Cliente.id))
+        .filter(Cliente.data_cadastro >= inicio_periodo)
+        .group_by(mes)
+        .order_by(mes)
+        .all()
+    )
+
+    return {
+        'total_clientes': db.session.query(func.count(Cliente.id)).scalar(),
+        'total_atividades': db.session.query(func.count(Atividade.id)).scalar(),
+        'atividades_por_status': _contagem_por(Atividade.status),
+        'atividades_por_tipo': _contagem_por(Atividade.tipo),
+        'clientes_por_area': _contagem_por(Cliente.area_atuacao),
+        'novos_clientes': {
+            'ultimos_7_dias': novos_desde(agora - timedelta(days=7)),
+            'ultimos_30_dias': novos_desde(agora - timedelta(days=30)),
+            'por_mes': [{'mes': m, 'total': total} for m, total in novos_por_mes],
+        },
+        'total_campanhas': db.session.query(func.count(Campanha.id)).scalar(),
+        'campanhas_enviadas': (
+            db.session.query(func.count(Campanha.id)).filter(Campanha.status == Campanha.CONCLUIDA).scalar()
+        ),
+        'campanhas_por_status': _contagem_por(Campanha.status),
+        'gerado_em': agora.isoformat(),
+    }
+
+@dashboard_bp.route('/dashboard/stats', methods=['GET'])
+def get_estatisticas():
+    """
+    Totais e distribuições para o Dashboard, calculados com COUNT/GROUP BY
+    e servidos a partir de um cache curto invalidado pelas escritas
+    """
+    try:
+        return jsonify(cache_estatisticas.obter('estatisticas', calcular_estatisticas))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
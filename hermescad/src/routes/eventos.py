@@ -0,0 +1,36 @@
+from flask import Blueprint, Response, jsonify, request
+from src.services import eventos
+
+eventos_bp = Blueprint('eventos', __name__)
+
+@eventos_bp.route('/events', methods=['GET'])
+def get_eventos():
+    """
+    Feed de alterações em Server-Sent Events, retomado a partir do
+    cabeçalho Last-Event-ID (enviado pelo EventSource ao reconectar) ou de
+    ?last_event_id=. Cada conexão aberta ocupa uma thread do worker: em
+    produção o feed é servido pelo servidor_eventos.py (ver services/eventos.py).
+    """
+    if eventos.EVENTOS_SOCKET:
+        return jsonify({'error': 'Feed servido pelo servidor de eventos (EVENTOS_SOCKET)'}), 503
+
+    ultimo_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or eventos.central.ultimo_id()
+
+    def gerar():
+        nonlocal ultimo_id
+        yield f'retry: {eventos.ESPERA_RECONEXAO_MS}\n\n'.encode('ascii')
+        while True:
+            novos = eventos.central.aguardar(ultimo_id)
+            if not novos:
+                # Mantém a conexão viva em proxies com timeout de inatividade
+                yield b': ping\n\n'
+                continue
+            for evento in novos:
+                yield evento.formatar()
+            ultimo_id = novos[-1].id
+
+    resposta = Response(gerar(), mimetype='text/event-stream')
+    resposta.headers['Cache-Control'] = 'no-cache'
+    # Desliga o buffer do nginx para esta resposta
+    resposta.headers['X-Accel-Buffering'] = 'no'
+    return resposta
@@ -0,0 +1,128 @@
+import csv
+import io
+import tempfile
+from datetime import date, datetime
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from src.models.cliente import Cliente
+from src.models.atividade import Atividade
+from src.models.produto import Produto
+from src.routes.cliente import ORDENACOES_CLIENTE, filtrar_clientes
+from src.routes.atividade import ORDENACOES_ATIVIDADE, filtrar_atividades
+from src.services.importacao import INICIOS_DE_FORMULA
+from src.utils.paginacao import ParametroInvalido, ler_ordenacao, ordenar
+from src.utils.streaming import TAMANHO_BLOCO
+
+exportacao_bp = Blueprint('exportacao', __name__)
+
+# Linhas buscadas do banco por vez durante a exportação
+TAMANHO_LOTE_EXPORTACAO = 1000
+MIMETYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# entidade -> (modelo, ordenações aceitas, função de filtro)
+EXPORTACOES = {
+    'clientes': (Cliente, ORDENACOES_CLIENTE, filtrar_clientes),
+    'atividades': (Atividade, ORDENACOES_ATIVIDADE, filtrar_atividades),
+    'produtos': (Produto, {'id': Produto.id, 'nome': Produto.nome}, lambda query, args: query),
+}
+
+
+def _valor_celula(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return 'sim' if valor else 'não'
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, str) and valor.startswith(INICIOS_DE_FORMULA):
+        # Texto digitado pelo usuário não vira fórmula no Excel (=HYPERLINK(...),
+        # +cmd|...); a importação tira o ' de volta
+        return "'" + valor
+    return valor
+
+
+def _gerar_csv(colunas, linhas):
+    """
+    CSV separado por ';' com BOM UTF-8 (abre direto no Excel em pt-BR e é
+    aceito de volta por /clientes/import), enviado em blocos de ~64 KB.
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=';', lineterminator='\r\n')
+    buffer.write('\ufeff')
+    escritor.writerow(colunas)
+    for linha in linhas:
+        escritor.writerow([_valor_celula(valor) for valor in linha])
+        if buffer.tell() >= TAMANHO_BLOCO:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def _gerar_xlsx(entidade, colunas, linhas):
+    """
+    O XLSX é um zip e só fica completo no fim: as linhas vão para um
+    arquivo temporário (modo write_only do openpyxl, memória constante)
+    que depois é enviado em blocos e apagado.
+    """
+    from openpyxl import Workbook
+
+    livro = Workbook(write_only=True)
+    planilha = livro.create_sheet(entidade)
+    planilha.append(colunas)
+    for linha in linhas:
+        planilha.append([_valor_celula(valor) for valor in linha])
+
+    with tempfile.TemporaryFile() as arquivo:
+        livro.save(arquivo)
+        arquivo.seek(0)
+        while True:
+            bloco = arquivo.read(TAMANHO_BLOCO)
+            if not bloco:
+                break
+            yield bloco
+
+
+@exportacao_bp.route('/export/<entidade>', methods=['GET'])
+def exportar(entidade):
+    """
+    Exporta clientes, atividades ou produtos como CSV (padrão) ou XLSX
+    (?formato=xlsx, requer openpyxl), com os mesmos filtros e ?sort= das
+    listagens. As linhas são lidas do banco em lotes e enviadas à medida
+    que são geradas.
+    """
+    if entidade not in EXPORTACOES:
+        return jsonify({'error': f'Entidade inválida: {entidade}'}), 404
+    modelo, ordenacoes, filtrar = EXPORTACOES[entidade]
+
+    formato = request.args.get('formato', 'csv').lower()
+    if formato not in ('csv', 'xlsx'):
+        return jsonify({'error': 'formato deve ser csv ou xlsx'}), 400
+    if formato == 'xlsx':
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            return jsonify({'error': 'Exportação em XLSX requer o pacote openpyxl'}), 400
+
+    try:
+        query = filtrar(modelo.query, request.args)
+        _, coluna, descendente = ler_ordenacao(request.args, ordenacoes, 'id')
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Tuplas das colunas em vez de objetos ORM: menos memória e CPU por linha
+    colunas = [c.name for c in modelo.__table__.columns]
+    query = ordenar(query, coluna, descendente, modelo.id).with_entities(*modelo.__table__.columns)
+    linhas = query.yield_per(TAMANHO_LOTE_EXPORTACAO)
+
+    nome_arquivo = f'{entidade}-{datetime.now():%Y%m%d-%H%M%S}.{formato}'
+    cabecalhos = {'Content-Disposition': f'attachment; filename="{nome_arquivo}"'}
+
+    if formato == 'xlsx':
+        return Response(
+            stream_with_context(_gerar_xlsx(entidade, colunas, linhas)),
+            mimetype=MIMETYPE_XLSX,
+            headers=cabecalhos
+        )
+
+    # A compressão gzip fica com o after_request (utils/compressao.py)
+    return Response(stream_with_context(_gerar_csv(colunas, linhas)), mimetype='text/csv', headers=cabecalhos)
@@ -1,25 +1,33 @@
-from flask import Blueprint, request, jsonify
-import smtplib
-import os
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
-from src.models.cliente import Cliente
+from flask import Blueprint, request, jsonify, current_app, send_file
+import re
+from werkzeug.exceptions import RequestEntityTooLarge
+from src.models.anexo import Anexo, UploadParcial
+from src.models.campanha import Campanha, CampanhaDestinatario
+from src.models.segmento import Segmento
 from src.models.user import db
+from src.services import arquivos, campanhas
+from src.services.personalizacao import ModeloInvalido
+from src.utils.paginacao import ParametroInvalido, paginar
 
 mala_direta_bp = Blueprint('mala_direta', __name__)
 
-# Configurações de e-mail (devem ser configuradas via variáveis de ambiente)
-SMTP_SERVER = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
-SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
-EMAIL_USER = os.getenv('EMAIL_USER', '')
-EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD', '')
+def _segmento_solicitado(segmento_id):
+    """Segmento indicado em segmento_id (None se não informado ou inexistente)"""
+    if segmento_id in (None, ''):
+        return None
+    try:
+        return db.session.get(Segmento, int(segmento_id))
+    except (TypeError, ValueError):
+        raise ParametroInvalido('segmento_id deve ser um número inteiro')
 
 @mala_direta_bp.route('/mala_direta/send_email', methods=['POST'])
 def send_email():
     """
-    Envia e-mails para clientes selecionados
+    Cria uma campanha de e-mail para os clientes selecionados (client_ids)
+    ou para os membros de um segmento (segmento_id) e a coloca na fila de
+    envio. Responde imediatamente com o id da campanha.
+    Assunto e corpo aceitam variáveis do cliente, como {{ nome }} (ver
+    services/personalizacao.py).
     """
     try:
         data = request.get_json()
@@ -32,86 +40,102 @@ def send_email():
         subject = data.get('subject', '')
         body = data.get('body', '')
         attachments = data.get('attachments', [])
+        segmento = _segmento_solicitado(data.get('segmento_id'))
+        
+        if data.get('segmento_id') not in (None, '') and segmento is None:
+            return jsonify({'error': 'Segmento não encontrado'}), 404
         
-        if not client_ids:
+        if not client_ids and segmento is None:
             return jsonify({'error': 'Nenhum cliente selecionado'}), 400
         
         if not subject or not body:
             return jsonify({'error': 'Assunto e corpo do e-mail são obrigatórios'}), 400
         
+        # Ids retornados pelo upload (não caminhos do servidor)
+        attachments = arquivos.validar_ids(attachments)
+        
         # Verificar configurações de e-mail
-        if not EMAIL_USER or not EMAIL_PASSWORD:
+        if not campanhas.email_configurado():
             return jsonify({'error': 'Configurações de e-mail não definidas'}), 500
         
-        # Buscar clientes no banco de dados
-        clientes = Cliente.query.filter(Cliente.id.in_(client_ids)).all()
+        campanha = campanhas.criar_campanha_email(subject, body, attachments, client_ids, segmento)
         
-        if not clientes:
+        if not campanha.total_destinatarios:
             return jsonify({'error': 'Nenhum cliente encontrado'}), 404
         
-        # Configurar servidor SMTP
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
-        server.login(EMAIL_USER, EMAIL_PASSWORD)
-        
-        sent_count = 0
-        failed_emails = []
-        
-        for cliente in clientes:
-            if not cliente.email:
-                failed_emails.append(f"Cliente {cliente.nome} não possui e-mail")
-                continue
-            
-            try:
-                # Criar mensagem
-                msg = MIMEMultipart()
-                msg['From'] = EMAIL_USER
-                msg['To'] = cliente.email
-                msg['Subject'] = subject
-                
-                # Adicionar corpo do e-mail
-                msg.attach(MIMEText(body, 'html' if '<' in body else 'plain'))
-                
-                # Adicionar anexos (se houver)
-                for attachment_path in attachments:
-                    if os.path.isfile(attachment_path):
-                        with open(attachment_path, "rb") as attachment:
-                            part = MIMEBase('application', 'octet-stream')
-                            part.set_payload(attachment.read())
-                        
-                        encoders.encode_base64(part)
-                        part.add_header(
-                            'Content-Disposition',
-                            f'attachment; filename= {os.path.basename(attachment_path)}'
-                        )
-                        msg.attach(part)
-                
-                # Enviar e-mail
-                text = msg.as_string()
-                server.sendmail(EMAIL_USER, cliente.email, text)
-                sent_count += 1
-                
-            except Exception as e:
-                failed_emails.append(f"Erro ao enviar para {cliente.email}: {str(e)}")
-        
-        server.quit()
+        campanhas.enfileirar(current_app._get_current_object(), campanha.id)
         
         return jsonify({
             'success': True,
-            'sent_count': sent_count,
-            'total_clients': len(clientes),
-            'failed_emails': failed_emails
-        }), 200
+            'campanha_id': campanha.id,
+            'status': campanha.status,
+            'total_clients': campanha.total_destinatarios
+        }), 202
         
+    except (ModeloInvalido, ParametroInvalido) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+@mala_direta_bp.route('/mala_direta/campanhas', methods=['GET'])
+def get_campanhas():
+    """Lista as campanhas mais recentes"""
+    lista = Campanha.query.order_by(Campanha.id.desc()).limit(50).all()
+    return jsonify([campanhas.verificar_interrupcao(campanha).to_dict() for campanha in lista])
+
+@mala_direta_bp.route('/mala_direta/campanhas/<int:id>', methods=['GET'])
+def get_campanha(id):
+    """Progresso de uma campanha"""
+    campanha = Campanha.query.get_or_404(id)
+    return jsonify(campanhas.verificar_interrupcao(campanha).to_dict())
+
+@mala_direta_bp.route('/mala_direta/campanhas/<int:id>/destinatarios', methods=['GET'])
+def get_campanha_destinatarios(id):
+    """Resultado por destinatário, paginado por cursor (?status=, ?limit=, ?cursor=)"""
+    Campanha.query.get_or_404(id)
+    query = CampanhaDestinatario.query.filter_by(campanha_id=id)
+    if request.args.get('status'):
+        query = query.filter(CampanhaDestinatario.status == request.args['status'])
+    try:
+        destinatarios, proximo_cursor = paginar(
+            query, request.args, 'id', CampanhaDestinatario.id, False, CampanhaDestinatario.id
+        )
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'items': [destinatario.to_dict() for destinatario in destinatarios],
+        'next_cursor': proximo_cursor
+    })
+
+@mala_direta_bp.route('/mala_direta/campanhas/<int:id>/retomar', methods=['POST'])
+def retomar_campanha(id):
+    """Recoloca na fila uma campanha interrompida ou que falhou"""
+    campanha = Campanha.query.get_or_404(id)
+    try:
+        campanhas.retomar(current_app._get_current_object(), campanha)
+    except campanhas.CampanhaInvalida as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify(campanha.to_dict()), 202
+
+@mala_direta_bp.route('/mala_direta/campanhas/<int:id>/cancelar', methods=['POST'])
+def cancelar_campanha(id):
+    """Cancela a campanha; o worker para ao terminar o lote atual"""
+    campanha = Campanha.query.get_or_404(id)
+    try:
+        campanhas.cancelar(campanha)
+    except campanhas.CampanhaInvalida as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify(campanha.to_dict()), 200
+
 @mala_direta_bp.route('/mala_direta/send_whatsapp', methods=['POST'])
 def send_whatsapp():
     """
-    Envia mensagens WhatsApp para clientes selecionados
-    Nota: Esta implementação é uma demonstração. Para uso em produção,
-    considere usar a API oficial do WhatsApp Business.
+    Cria uma campanha de WhatsApp para os clientes selecionados
+    (client_ids) ou para os membros de um segmento (segmento_id) e a
+    coloca na fila de envio. Responde imediatamente com o id da campanha. A
+    mensagem aceita variáveis do cliente, como {{ nome }}.
     """
     try:
         data = request.get_json()
@@ -122,62 +146,57 @@ def send_whatsapp():
         
         client_ids = data.get('client_ids', [])
         message = data.get('message', '')
-        image_path = data.get('image_path', '')
+        image_id = data.get('image_id') or None
+        segmento = _segmento_solicitado(data.get('segmento_id'))
         
-        if not client_ids:
+        if data.get('segmento_id') not in (None, '') and segmento is None:
+            return jsonify({'error': 'Segmento não encontrado'}), 404
+        
+        if not client_ids and segmento is None:
             return jsonify({'error': 'Nenhum cliente selecionado'}), 400
         
         if not message:
             return jsonify({'error': 'Mensagem é obrigatória'}), 400
         
-        # Buscar clientes no banco de dados
-        clientes = Cliente.query.filter(Cliente.id.in_(client_ids)).all()
+        if image_id:
+            arquivos.validar_ids([image_id])
+        
+        # Verificar configurações do provedor de WhatsApp
+        if not campanhas.whatsapp_configurado():
+            return jsonify({'error': 'Configurações de WhatsApp não definidas'}), 500
+        
+        campanha = campanhas.criar_campanha_whatsapp(message, image_id, client_ids, segmento)
         
-        if not clientes:
+        if not campanha.total_destinatarios:
             return jsonify({'error': 'Nenhum cliente encontrado'}), 404
         
-        sent_count = 0
-        failed_messages = []
-        
-        for cliente in clientes:
-            if not cliente.telefone:
-                failed_messages.append(f"Cliente {cliente.nome} não possui telefone")
-                continue
-            
-            try:
-                # Aqui seria a implementação do envio via WhatsApp
-                # Por questões de segurança e limitações, esta é uma simulação
-                
-                # Para implementação real, considere:
-                # 1. API oficial do WhatsApp Business
-                # 2. Twilio WhatsApp API
-                # 3. Outras soluções empresariais
-                
-                # Simulação de envio bem-sucedido
-                print(f"Simulando envio de WhatsApp para {cliente.telefone}: {message}")
-                if image_path and os.path.isfile(image_path):
-                    print(f"Com imagem: {image_path}")
-                
-                sent_count += 1
-                
-            except Exception as e:
-                failed_messages.append(f"Erro ao enviar para {cliente.telefone}: {str(e)}")
+        campanhas.enfileirar(current_app._get_current_object(), campanha.id)
         
         return jsonify({
             'success': True,
-            'sent_count': sent_count,
-            'total_clients': len(clientes),
-            'failed_messages': failed_messages,
-            'note': 'Esta é uma implementação de demonstração. Para uso em produção, configure uma API oficial do WhatsApp.'
-        }), 200
+            'campanha_id': campanha.id,
+            'status': campanha.status,
+            'total_clients': campanha.total_destinatarios,
+            'failed_count': campanha.falhas
+        }), 202
         
+    except (ModeloInvalido, ParametroInvalido) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+@mala_direta_bp.errorhandler(RequestEntityTooLarge)
+def arquivo_grande_demais(e):
+    return jsonify({'error': 'Arquivo ou parte maior que o limite permitido'}), 413
+
 @mala_direta_bp.route('/mala_direta/upload', methods=['POST'])
 def upload_file():
     """
-    Endpoint para upload de arquivos (anexos e imagens)
+    Upload de um arquivo de uma vez (anexos e imagens), gravado sob o
+    SHA-256 do conteúdo. Responde o id a usar em attachments/image_id.
+    Para arquivos grandes use /mala_direta/uploads (retomável).
     """
     try:
         if 'file' not in request.files:
@@ -188,21 +207,82 @@ def upload_file():
         if file.filename == '':
             return jsonify({'error': 'Nenhum arquivo selecionado'}), 400
         
-        # Criar diretório de uploads se não existir
-        upload_dir = os.path.join(os.path.dirname(__file__), '..', 'uploads')
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # Salvar arquivo
-        filename = file.filename
-        file_path = os.path.join(upload_dir, filename)
-        file.save(file_path)
+        anexo = arquivos.armazenar(file.stream, file.filename)
         
-        return jsonify({
-            'success': True,
-            'filename': filename,
-            'file_path': file_path
-        }), 200
+        return jsonify(dict(anexo.to_dict(), success=True, anexo_id=anexo.id, filename=anexo.nome)), 201
         
+    except arquivos.ArquivoMuitoGrande as e:
+        return jsonify({'error': str(e)}), 413
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': f'Erro no upload: {str(e)}'}), 500
 
+@mala_direta_bp.route('/mala_direta/uploads', methods=['POST'])
+def iniciar_upload():
+    """
+    Abre um upload retomável: {"nome": "catalogo.pdf", "tamanho": 52428800,
+    "sha256": "..."} (sha256 opcional, conferido ao final)
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        upload = arquivos.iniciar_upload(data.get('nome'), data.get('tamanho'), data.get('sha256'))
+    except arquivos.ArquivoMuitoGrande as e:
+        return jsonify({'error': str(e)}), 413
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(upload.to_dict()), 201
+
+@mala_direta_bp.route('/mala_direta/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """Bytes já recebidos: o envio continua a partir de `recebido`"""
+    return jsonify(db.get_or_404(UploadParcial, upload_id).to_dict())
+
+def _ler_content_range(valor):
+    """'bytes 0-1048575/5000000' -> (inicio, fim, total)"""
+    combinacao = re.fullmatch(r'bytes (\d+)-(\d+)/(\d+|\*)', (valor or '').strip())
+    if not combinacao or int(combinacao.group(2)) < int(combinacao.group(1)):
+        raise ParametroInvalido('Content-Range inválido; use "bytes inicio-fim/total"')
+    total = None if combinacao.group(3) == '*' else int(combinacao.group(3))
+    return int(combinacao.group(1)), int(combinacao.group(2)), total
+
+@mala_direta_bp.route('/mala_direta/uploads/<upload_id>', methods=['PUT'])
+def enviar_parte(upload_id):
+    """
+    Recebe uma parte do arquivo no corpo da requisição (Content-Range
+    indica a posição). Responde 200 com o progresso, 201 com o anexo
+    quando o arquivo termina ou 409 com o byte de onde continuar.
+    """
+    upload = db.get_or_404(UploadParcial, upload_id)
+    request.max_content_length = arquivos.TAMANHO_MAXIMO_PARTE
+    try:
+        inicio, fim, total = _ler_content_range(request.headers.get('Content-Range'))
+        if request.content_length is not None and request.content_length != fim - inicio + 1:
+            raise ParametroInvalido('Content-Range não corresponde ao tamanho do corpo')
+        anexo = arquivos.gravar_parte(upload, inicio, request.stream, total)
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e), 'recebido': upload.recebido}), 400
+    except arquivos.UploadConflito as e:
+        return jsonify({'error': str(e), 'recebido': e.recebido}), 409
+    if anexo is None:
+        return jsonify(upload.to_dict()), 200
+    return jsonify(dict(anexo.to_dict(), anexo_id=anexo.id)), 201
+
+@mala_direta_bp.route('/mala_direta/anexos/<id>', methods=['GET'])
+def get_anexo(id):
+    """Conteúdo do anexo, com suporte a Range e a requisições condicionais (ETag = SHA-256)"""
+    anexo = db.get_or_404(Anexo, id)
+    resposta = send_file(
+        arquivos.caminho_anexo(anexo),
+        mimetype=anexo.tipo,
+        as_attachment=True,
+        download_name=anexo.nome,
+        conditional=True,
+        etag=anexo.sha256,
+        max_age=86400
+    )
+    resposta.headers['Accept-Ranges'] = 'bytes'
+    return resposta
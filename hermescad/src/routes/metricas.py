@@ -0,0 +1,9 @@
+from flask import Blueprint, Response
+from src.utils.metricas import registro
+
+metricas_bp = Blueprint('metricas', __name__)
+
+@metricas_bp.route('/metrics', methods=['GET'])
+def get_metricas():
+    """Métricas do worker no formato texto do Prometheus"""
+    return Response(registro.exportar(), mimetype='text/plain; version=0.0.4')
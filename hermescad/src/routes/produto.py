@@ -1,15 +1,39 @@
 from flask import Blueprint, request, jsonify
 from src.models.user import db
 from src.models.produto import Produto
+from src.utils.sinais import avisar_alteracao
+from src.utils.lote import executar_lote
+from src.utils.cache_http import com_etag
+from src.utils.campos import ler_campos
+from src.utils.paginacao import ParametroInvalido
+from src.utils.sincronizacao import com_token_sincronizacao, responder_alteracoes
+from src.utils.streaming import formato_stream, iterar_em_lotes, resposta_stream
 
 produto_bp = Blueprint('produto', __name__)
 
+# Campos que podem ser gravados pelo endpoint de lote
+CAMPOS_PRODUTO = ('nome', 'descricao', 'preco')
+
 @produto_bp.route('/produtos', methods=['GET'])
+@com_etag('produtos')
+@com_token_sincronizacao
 def get_produtos():
-    produtos = Produto.query.all()
-    return jsonify([produto.to_dict() for produto in produtos])
+    try:
+        projecao = ler_campos(request.args, Produto)
+        if 'updated_since' in request.args:
+            return responder_alteracoes(projecao.aplicar(Produto.query), Produto, projecao, request.args['updated_since'])
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    query = projecao.aplicar(Produto.query).order_by(Produto.id)
+
+    formato = formato_stream(request)
+    if formato:
+        return resposta_stream(iterar_em_lotes(query), projecao.serializar, formato)
+
+    return jsonify([projecao.serializar(linha) for linha in query.all()])
 
 @produto_bp.route('/produtos/<int:id>', methods=['GET'])
+@com_etag('produtos')
 def get_produto(id):
     produto = Produto.query.get_or_404(id)
     return jsonify(produto.to_dict())
@@ -27,10 +51,11 @@ def create_produto():
     try:
         db.session.add(produto)
         db.session.commit()
-        return jsonify(produto.to_dict()), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
+    avisar_alteracao('produto', acao='create', ids=[produto.id])
+    return jsonify(produto.to_dict()), 201
 
 @produto_bp.route('/produtos/<int:id>', methods=['PUT'])
 def update_produto(id):
@@ -43,10 +68,11 @@ def update_produto(id):
     
     try:
         db.session.commit()
-        return jsonify(produto.to_dict())
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
+    avisar_alteracao('produto', acao='update', ids=[produto.id])
+    return jsonify(produto.to_dict())
 
 @produto_bp.route('/produtos/<int:id>', methods=['DELETE'])
 def delete_produto(id):
@@ -55,8 +81,14 @@ def delete_produto(id):
     try:
         db.session.delete(produto)
         db.session.commit()
-        return jsonify({'message': 'Produto deletado com sucesso'}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
+    avisar_alteracao('produto', acao='delete', ids=[id])
+    return jsonify({'message': 'Produto deletado com sucesso'}), 200
 
+@produto_bp.route('/produtos/batch', methods=['POST'])
+def batch_produtos():
+    """Cria, altera e exclui produtos em uma única transação (ver utils/lote.py)"""
+    resposta, status = executar_lote(Produto, 'produto', request.get_json(silent=True), CAMPOS_PRODUTO)
+    return jsonify(resposta), status
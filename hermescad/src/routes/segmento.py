@@ -0,0 +1,95 @@
+from flask import Blueprint, request, jsonify
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.cliente import Cliente
+from src.models.segmento import Segmento
+from src.services import segmentos
+from src.utils.campos import ler_campos
+from src.utils.paginacao import ParametroInvalido, paginar
+
+segmento_bp = Blueprint('segmento', __name__)
+
+@segmento_bp.route('/segmentos', methods=['GET'])
+def get_segmentos():
+    """Lista os segmentos com o total da última avaliação"""
+    return jsonify([segmento.to_dict() for segmento in Segmento.query.order_by(Segmento.nome).all()])
+
+@segmento_bp.route('/segmentos/<int:id>', methods=['GET'])
+def get_segmento(id):
+    """Segmento com o total da última avaliação (ver calculado_em)"""
+    segmento = Segmento.query.get_or_404(id)
+    return jsonify(segmento.to_dict())
+
+@segmento_bp.route('/segmentos/<int:id>/atualizar', methods=['POST'])
+def atualizar_segmento(id):
+    """Traz os membros (materializados) e o total para o estado atual"""
+    segmento = Segmento.query.get_or_404(id)
+    return jsonify(segmentos.atualizar(segmento).to_dict())
+
+@segmento_bp.route('/segmentos/preview', methods=['POST'])
+def preview_segmento():
+    """Quantos clientes atendem aos filtros, sem salvar o segmento"""
+    data = request.get_json() or {}
+    try:
+        filtros = segmentos.ler_filtros(data.get('filtros', {}))
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'filtros': filtros, 'total': segmentos.contar(filtros)})
+
+@segmento_bp.route('/segmentos', methods=['POST'])
+def create_segmento():
+    """Cria um segmento: {"nome", "filtros": {...}, "materializado": false}"""
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'Dados não fornecidos'}), 400
+    try:
+        segmento = segmentos.salvar(Segmento(filtros='{}', materializado=False), data)
+    except ParametroInvalido as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Já existe um segmento com esse nome'}), 409
+    return jsonify(segmento.to_dict()), 201
+
+@segmento_bp.route('/segmentos/<int:id>', methods=['PUT'])
+def update_segmento(id):
+    segmento = Segmento.query.get_or_404(id)
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'Dados não fornecidos'}), 400
+    try:
+        segmento = segmentos.salvar(segmento, data)
+    except ParametroInvalido as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Já existe um segmento com esse nome'}), 409
+    return jsonify(segmento.to_dict())
+
+@segmento_bp.route('/segmentos/<int:id>', methods=['DELETE'])
+def delete_segmento(id):
+    segmento = Segmento.query.get_or_404(id)
+    segmentos.excluir(segmento)
+    return '', 204
+
+@segmento_bp.route('/segmentos/<int:id>/clientes', methods=['GET'])
+def get_segmento_clientes(id):
+    """
+    Membros do segmento, paginados por cursor (?limit=, ?cursor=, ?fields=).
+    Os de um segmento materializado são os da última atualização.
+    """
+    segmento = Segmento.query.get_or_404(id)
+    try:
+        projecao = ler_campos(request.args, Cliente)
+        query = projecao.aplicar(
+            Cliente.query.filter(Cliente.id.in_(segmentos.consulta_ids(segmento))), Cliente.id
+        )
+        linhas, proximo_cursor = paginar(query, request.args, 'id', Cliente.id, False, Cliente.id)
+    except ParametroInvalido as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'items': [projecao.serializar(linha) for linha in linhas],
+        'next_cursor': proximo_cursor
+    })
@@ -0,0 +1,275 @@
+"""
+Armazenamento dos arquivos enviados para campanhas.
+
+O conteúdo é gravado em uploads/objetos/<sha256[:2]>/<sha256>: o mesmo
+arquivo enviado várias vezes ocupa o disco uma vez só, e nomes iguais não
+se sobrescrevem. Nome, tipo e tamanho ficam na tabela anexos, e
+campanhas guardam o id opaco do Anexo em vez de caminhos do servidor.
+
+Os bytes são copiados em blocos, sem montar o arquivo em memória.
+Arquivos grandes podem ser enviados em partes (upload retomável):
+
+    POST /api/mala_direta/uploads {"nome", "tamanho", "sha256"}   -> upload_id
+    PUT  /api/mala_direta/uploads/<upload_id>           Content-Range: bytes 0-1048575/5000000
+    GET  /api/mala_direta/uploads/<upload_id>           -> bytes já recebidos
+
+Cada parte chega primeiro num arquivo próprio e só é copiada para o
+arquivo parcial depois de reservar a faixa (UPDATE ... WHERE recebido =
+inicio), com a reserva ainda aberta: duas requisições para o mesmo trecho
+não se sobrescrevem. Uma parte interrompida conta os bytes que chegaram;
+o envio continua de `recebido`. Ao receber o último byte o conteúdo é
+conferido com o SHA-256 informado ao iniciar (se houver) e vira um Anexo.
+"""
+import glob
+import hashlib
+import mimetypes
+import os
+import re
+import shutil
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, update
+from src.models.user import db
+from src.models.anexo import Anexo, UploadParcial
+from src.utils.paginacao import ParametroInvalido
+
+TAMANHO_BLOCO = 1024 * 1024
+# Tamanho máximo de um arquivo e de cada parte de um upload retomável
+TAMANHO_MAXIMO = int(os.getenv('UPLOAD_MAX_MB', '100')) * 1024 * 1024
+TAMANHO_MAXIMO_PARTE = int(os.getenv('UPLOAD_PARTE_MAX_MB', '16')) * 1024 * 1024
+# Uploads parciais sem atividade por mais tempo que isso são descartados
+VALIDADE_PARCIAIS = timedelta(days=1)
+
+PASTA_PADRAO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uploads')
+
+
+_SHA256 = re.compile(r'^[0-9a-f]{64}$')
+
+
+class ArquivoMuitoGrande(ParametroInvalido):
+    """Arquivo acima de TAMANHO_MAXIMO (ou parte acima do limite)"""
+
+
+class UploadConflito(Exception):
+    """Parte que não começa no próximo byte esperado; o cliente deve continuar de `recebido`"""
+
+    def __init__(self, recebido):
+        super().__init__(f'O upload deve continuar do byte {recebido}')
+        self.recebido = recebido
+
+
+def pasta_uploads():
+    return current_app.config.get('UPLOAD_FOLDER') or PASTA_PADRAO
+
+
+def _caminho_objeto(sha256):
+    return os.path.join(pasta_uploads(), 'objetos', sha256[:2], sha256)
+
+
+def _caminho_parcial(upload_id):
+    return os.path.join(pasta_uploads(), 'parciais', upload_id)
+
+
+def nome_seguro(nome):
+    """Só o nome do arquivo, sem diretórios nem aspas"""
+    nome = os.path.basename((nome or '').replace('\\', '/')).replace('"', '').strip()
+    return nome[:255] or 'arquivo'
+
+
+def _copiar(stream, arquivo, limite, sha=None):
+    """Copia `stream` em blocos; levanta ArquivoMuitoGrande além de `limite` bytes"""
+    copiados = 0
+    for bloco in iter(lambda: stream.read(TAMANHO_BLOCO), b''):
+        if copiados + len(bloco) > limite:
+            raise ArquivoMuitoGrande(f'Arquivo maior que o limite de {limite} bytes')
+        arquivo.write(bloco)
+        if sha is not None:
+            sha.update(bloco)
+        copiados += len(bloco)
+    return copiados
+
+
+def _registrar(temporario, sha256, tamanho, nome):
+    """Move o conteúdo para objetos/ (ou o descarta, se já existe) e cria o Anexo. Faz o commit."""
+    destino = _caminho_objeto(sha256)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    if os.path.exists(destino):
+        os.remove(temporario)
+    else:
+        os.replace(temporario, destino)
+
+    anexo = Anexo.query.filter_by(sha256=sha256, nome=nome).first()
+    if anexo is None:
+        anexo = Anexo(
+            id=uuid.uuid4().hex,
+            sha256=sha256,
+            nome=nome,
+            tipo=mimetypes.guess_type(nome)[0] or 'application/octet-stream',
+            tamanho=tamanho
+        )
+        db.session.add(anexo)
+    db.session.commit()
+    return anexo
+
+
+def armazenar(stream, nome):
+    """Grava um arquivo enviado de uma vez e retorna o Anexo"""
+    temporario = _caminho_parcial(uuid.uuid4().hex)
+    os.makedirs(os.path.dirname(temporario), exist_ok=True)
+    sha = hashlib.sha256()
+    try:
+        with open(temporario, 'wb') as arquivo:
+            tamanho = _copiar(stream, arquivo, TAMANHO_MAXIMO, sha)
+    except BaseException:
+        os.remove(temporario)
+        raise
+    return _registrar(temporario, sha.hexdigest(), tamanho, nome_seguro(nome))
+
+
+def iniciar_upload(nome, tamanho, sha256=None):
+    """
+    Abre um upload retomável de `tamanho` bytes. Com `sha256` (hex) o
+    arquivo só vira Anexo se o conteúdo recebido tiver esse hash. Faz o
+    commit.
+    """
+    if not isinstance(tamanho, int) or isinstance(tamanho, bool) or tamanho <= 0:
+        raise ParametroInvalido('tamanho deve ser um número inteiro de bytes maior que zero')
+    if tamanho > TAMANHO_MAXIMO:
+        raise ArquivoMuitoGrande(f'Arquivo maior que o limite de {TAMANHO_MAXIMO} bytes')
+    if sha256 is not None:
+        sha256 = sha256.lower() if isinstance(sha256, str) else sha256
+        if not isinstance(sha256, str) or not _SHA256.match(sha256):
+            raise ParametroInvalido('sha256 deve ter 64 dígitos hexadecimais')
+    upload = UploadParcial(id=uuid.uuid4().hex, nome=nome_seguro(nome), tamanho=tamanho, recebido=0, sha256=sha256)
+    caminho = _caminho_parcial(upload.id)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    open(caminho, 'wb').close()
+    db.session.add(upload)
+    db.session.commit()
+    return upload
+
+
+def gravar_parte(upload, inicio, stream, total=None):
+    """
+    Grava a parte que começa no byte `inicio`. Retorna o Anexo quando o
+    último byte chega, senão None. Os bytes recebidos antes de uma
+    desconexão são confirmados mesmo assim. Faz o commit.
+    """
+    if total is not None and total != upload.tamanho:
+        raise ParametroInvalido(f'Tamanho total diferente do informado ao iniciar o upload ({upload.tamanho})')
+    if inicio != upload.recebido:
+        raise UploadConflito(upload.recebido)
+
+    parte = f'{_caminho_parcial(upload.id)}.{uuid.uuid4().hex}.parte'
+    copiados = 0
+    try:
+        try:
+            with open(parte, 'wb') as arquivo:
+                for bloco in iter(lambda: stream.read(TAMANHO_BLOCO), b''):
+                    if inicio + copiados + len(bloco) > upload.tamanho:
+                        raise ParametroInvalido('A parte ultrapassa o tamanho informado ao iniciar o upload')
+                    arquivo.write(bloco)
+                    copiados += len(bloco)
+        finally:
+            if copiados:
+                _anexar_parte(upload, inicio, parte, copiados)
+    finally:
+        os.remove(parte)
+
+    if not copiados or upload.recebido < upload.tamanho:
+        return None
+    return _concluir(upload)
+
+
+def _anexar_parte(upload, inicio, parte, copiados):
+    """
+    Reserva a faixa e copia a parte para o arquivo parcial antes do commit:
+    quem tentar a mesma faixa espera a reserva e depois vê `recebido` novo
+    """
+    confirmado = db.session.execute(
+        update(UploadParcial)
+        .where(UploadParcial.id == upload.id, UploadParcial.recebido == inicio)
+        .values(recebido=inicio + copiados, atualizado_em=datetime.utcnow())
+    ).rowcount
+    if not confirmado:
+        db.session.rollback()
+        db.session.refresh(upload)
+        raise UploadConflito(upload.recebido)
+    try:
+        with open(parte, 'rb') as origem, open(_caminho_parcial(upload.id), 'r+b') as destino:
+            destino.seek(inicio)
+            shutil.copyfileobj(origem, destino, TAMANHO_BLOCO)
+    except BaseException:
+        db.session.rollback()
+        raise
+    db.session.commit()
+    db.session.refresh(upload)
+
+
+def _concluir(upload):
+    caminho = _caminho_parcial(upload.id)
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO), b''):
+            sha.update(bloco)
+    if upload.sha256 and sha.hexdigest() != upload.sha256:
+        # Não há como saber qual trecho veio errado: o envio recomeça do zero
+        open(caminho, 'wb').close()
+        upload.recebido = 0
+        db.session.commit()
+        raise ParametroInvalido('O conteúdo recebido não confere com o sha256 informado; envie o arquivo de novo')
+    db.session.delete(upload)
+    return _registrar(caminho, sha.hexdigest(), upload.tamanho, upload.nome)
+
+
+def caminho_anexo(anexo):
+    return _caminho_objeto(anexo.sha256)
+
+
+def validar_ids(ids):
+    """Confere que todos os ids de anexo existem; levanta ParametroInvalido"""
+    ids = list(ids or [])
+    if not all(isinstance(id, str) for id in ids):
+        raise ParametroInvalido('Anexos devem ser informados pelos ids retornados no upload')
+    encontrados = set(db.session.execute(select(Anexo.id).where(Anexo.id.in_(ids))).scalars())
+    faltando = [id for id in ids if id not in encontrados]
+    if faltando:
+        raise ParametroInvalido(f'Anexo não encontrado: {", ".join(faltando)}')
+    return ids
+
+
+def resolver(ids):
+    """
+    [(caminho, nome)] dos anexos, na ordem dos ids. Campanhas criadas
+    antes dos ids guardam caminhos dentro da pasta de uploads, aceitos
+    aqui enquanto o arquivo existir.
+    """
+    if not ids:
+        return []
+    anexos = {anexo.id: anexo for anexo in Anexo.query.filter(Anexo.id.in_(ids)).all()}
+    pasta = os.path.realpath(pasta_uploads())
+    arquivos = []
+    for id in ids:
+        if id in anexos:
+            arquivos.append((caminho_anexo(anexos[id]), anexos[id].nome))
+        elif os.path.realpath(id).startswith(pasta + os.sep) and os.path.isfile(id):
+            arquivos.append((id, os.path.basename(id)))
+    return arquivos
+
+
+def limpar_parciais():
+    """Descarta uploads parciais abandonados. Retorna quantos foram removidos."""
+    abandonados = UploadParcial.query.filter(
+        UploadParcial.atualizado_em < datetime.utcnow() - VALIDADE_PARCIAIS
+    ).all()
+    for upload in abandonados:
+        # O arquivo parcial e partes que ficaram para trás numa queda do processo
+        for caminho in glob.glob(glob.escape(_caminho_parcial(upload.id)) + '*'):
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+        db.session.delete(upload)
+    db.session.commit()
+    return len(abandonados)
@@ -0,0 +1,458 @@
+"""
+Motor de campanhas de mala direta.
+
+A rota apenas registra a campanha e seus destinatários e a coloca na fila;
+o envio acontece em um pool de threads do próprio processo. O progresso
+fica gravado no banco (status de cada destinatário e contadores da
+campanha), então um envio interrompido pode ser retomado de onde parou e
+qualquer worker pode consultar ou cancelar a campanha. E-mail e WhatsApp
+usam o mesmo fluxo; só muda o envio de cada lote (_EnvioEmail e
+_EnvioWhatsApp).
+"""
+import json
+import logging
+import os
+import smtplib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import and_, case, func, insert, literal, or_, select, update
+from src.models.user import db
+from src.models.cliente import Cliente
+from src.models.campanha import Campanha, CampanhaDestinatario
+from src.services import arquivos, eventos, segmentos
+from src.services.mensagens import ConstrutorMensagem
+from src.services.personalizacao import ModeloCampanha
+from src.services.smtp import ConfiguracaoSMTP, PoolSMTP
+from src.services import whatsapp
+from src.services.whatsapp import ConfiguracaoWhatsApp, DespachoWhatsApp, normalizar_e164
+from src.utils.sinais import avisar_alteracao
+from src.utils import metricas
+
+logger = logging.getLogger(__name__)
+
+# Campanhas enviadas em paralelo por processo e destinatários por commit
+CAMPANHA_WORKERS = int(os.getenv('CAMPANHA_WORKERS', '2'))
+TAMANHO_LOTE = 100
+# Campanha "Enviando" sem heartbeat por mais tempo que isso foi interrompida
+TEMPO_SEM_HEARTBEAT = timedelta(seconds=int(os.getenv('CAMPANHA_HEARTBEAT_TIMEOUT', '120')))
+# Intervalo da renovação do heartbeat enquanto a campanha é enviada
+INTERVALO_HEARTBEAT = TEMPO_SEM_HEARTBEAT / 4
+# Máximo de ids por cláusula IN (limite de variáveis do SQLite)
+TAMANHO_BLOCO_IDS = 500
+
+STATUS_ATIVOS = (Campanha.PENDENTE, Campanha.ENVIANDO, Campanha.INTERROMPIDA, Campanha.FALHOU)
+STATUS_RETOMAVEIS = (Campanha.PENDENTE, Campanha.INTERROMPIDA, Campanha.FALHOU)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class CampanhaInvalida(Exception):
+    """Operação não permitida no estado atual da campanha"""
+
+
+def _obter_executor():
+    # Criado sob demanda para que cada processo (fork do gunicorn) tenha o seu
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=CAMPANHA_WORKERS, thread_name_prefix='campanha')
+        return _executor
+
+
+def email_configurado():
+    return ConfiguracaoSMTP.carregar().configurado
+
+
+def whatsapp_configurado():
+    return ConfiguracaoWhatsApp.carregar().configurado
+
+
+def _blocos_de_ids(client_ids, segmento):
+    """Ids dos clientes em blocos ordenados: da lista recebida ou do segmento"""
+    if segmento is not None:
+        yield from segmentos.iterar_membros(segmento, TAMANHO_BLOCO_IDS)
+        return
+    ids = sorted({int(id) for id in client_ids or []})
+    for inicio in range(0, len(ids), TAMANHO_BLOCO_IDS):
+        yield ids[inicio:inicio + TAMANHO_BLOCO_IDS]
+
+
+def criar_campanha_email(assunto, corpo, anexos, client_ids=None, segmento=None):
+    """
+    Registra a campanha e um destinatário por cliente selecionado (ou por
+    membro do segmento). Clientes sem e-mail já entram como falha. Retorna
+    a Campanha criada. Levanta ModeloInvalido se assunto ou corpo não
+    compilarem.
+    """
+    ModeloCampanha(assunto, corpo)
+    if segmento is not None:
+        segmentos.atualizar(segmento)
+    campanha = Campanha(
+        canal='email',
+        assunto=assunto,
+        corpo=corpo,
+        anexos=json.dumps(anexos or []),
+        segmento_id=segmento.id if segmento is not None else None,
+        status=Campanha.PENDENTE
+    )
+    db.session.add(campanha)
+    db.session.flush()
+
+    sem_email = or_(Cliente.email.is_(None), Cliente.email == '')
+    colunas = ['campanha_id', 'cliente_id', 'destino', 'status', 'erro']
+    for bloco in _blocos_de_ids(client_ids, segmento):
+        selecao = select(
+            literal(campanha.id),
+            Cliente.id,
+            Cliente.email,
+            case((sem_email, CampanhaDestinatario.FALHOU), else_=CampanhaDestinatario.PENDENTE),
+            case((sem_email, func.coalesce(Cliente.nome, '') + ' não possui e-mail'), else_=None)
+        ).where(Cliente.id.in_(bloco))
+        db.session.execute(insert(CampanhaDestinatario).from_select(colunas, selecao))
+
+    return _totalizar(campanha)
+
+
+def criar_campanha_whatsapp(mensagem, imagem, client_ids=None, segmento=None):
+    """
+    Registra a campanha de WhatsApp, com o celular de cada cliente em E.164
+    como destino. Clientes sem WhatsApp ou com número inválido já entram
+    como falha. Retorna a Campanha criada. Levanta ModeloInvalido se a
+    mensagem não compilar.
+    """
+    ModeloCampanha(None, mensagem, html=False)
+    if segmento is not None:
+        segmentos.atualizar(segmento)
+    campanha = Campanha(
+        canal='whatsapp',
+        corpo=mensagem,
+        anexos=json.dumps([imagem] if imagem else []),
+        segmento_id=segmento.id if segmento is not None else None,
+        status=Campanha.PENDENTE
+    )
+    db.session.add(campanha)
+    db.session.flush()
+
+    for bloco in _blocos_de_ids(client_ids, segmento):
+        clientes = db.session.execute(
+            select(Cliente.id, Cliente.nome, Cliente.numero_celular, Cliente.possui_whatsapp)
+            .where(Cliente.id.in_(bloco))
+        ).all()
+        destinatarios = []
+        for cliente in clientes:
+            destino = normalizar_e164(cliente.numero_celular)
+            if not cliente.possui_whatsapp:
+                erro = f'{cliente.nome or ""} não possui WhatsApp'
+            elif destino is None:
+                erro = f'{cliente.nome or ""} não possui celular válido ({cliente.numero_celular or "vazio"})'
+            else:
+                erro = None
+            destinatarios.append({
+                'campanha_id': campanha.id,
+                'cliente_id': cliente.id,
+                'destino': destino or cliente.numero_celular,
+                'status': CampanhaDestinatario.FALHOU if erro else CampanhaDestinatario.PENDENTE,
+                'erro': erro
+            })
+        if destinatarios:
+            db.session.execute(insert(CampanhaDestinatario), destinatarios)
+
+    return _totalizar(campanha)
+
+
+def _totalizar(campanha):
+    """Grava os totais da campanha recém-criada, faz o commit e avisa a criação"""
+    contagem = dict(
+        db.session.query(CampanhaDestinatario.status, func.count())
+        .filter(CampanhaDestinatario.campanha_id == campanha.id)
+        .group_by(CampanhaDestinatario.status)
+        .all()
+    )
+    campanha.total_destinatarios = sum(contagem.values())
+    campanha.falhas = contagem.get(CampanhaDestinatario.FALHOU, 0)
+    db.session.commit()
+    avisar_alteracao('campanha', acao='create', ids=[campanha.id])
+    return campanha
+
+
+def enfileirar(app, campanha_id):
+    """Agenda o envio da campanha no pool de threads deste processo"""
+    _obter_executor().submit(_processar, app, campanha_id)
+
+
+def verificar_interrupcao(campanha):
+    """Marca como Interrompida a campanha cujo worker parou de dar sinal de vida"""
+    if campanha.status != Campanha.ENVIANDO:
+        return campanha
+    limite = datetime.utcnow() - TEMPO_SEM_HEARTBEAT
+    resultado = db.session.execute(
+        update(Campanha)
+        .where(Campanha.id == campanha.id, Campanha.status == Campanha.ENVIANDO, Campanha.heartbeat_em < limite)
+        .values(status=Campanha.INTERROMPIDA)
+    )
+    db.session.commit()
+    if resultado.rowcount:
+        db.session.refresh(campanha)
+    return campanha
+
+
+def retomar(app, campanha):
+    verificar_interrupcao(campanha)
+    if campanha.status not in STATUS_RETOMAVEIS:
+        raise CampanhaInvalida(f'Campanha com status {campanha.status} não pode ser retomada')
+    enfileirar(app, campanha.id)
+
+
+def cancelar(campanha):
+    resultado = db.session.execute(
+        update(Campanha)
+        .where(Campanha.id == campanha.id, Campanha.status.in_(STATUS_ATIVOS))
+        .values(status=Campanha.CANCELADA, concluido_em=datetime.utcnow())
+    )
+    db.session.commit()
+    if not resultado.rowcount:
+        raise CampanhaInvalida(f'Campanha com status {campanha.status} não pode ser cancelada')
+    db.session.refresh(campanha)
+    avisar_alteracao('campanha', acao='update', ids=[campanha.id])
+
+
+def _reivindicar(campanha_id):
+    """
+    Passa a campanha para Enviando de forma atômica. Só um worker (deste ou
+    de outro processo) consegue reivindicar a mesma campanha.
+    """
+    agora = datetime.utcnow()
+    resultado = db.session.execute(
+        update(Campanha)
+        .where(
+            Campanha.id == campanha_id,
+            or_(
+                Campanha.status.in_(STATUS_RETOMAVEIS),
+                and_(Campanha.status == Campanha.ENVIANDO, Campanha.heartbeat_em < agora - TEMPO_SEM_HEARTBEAT)
+            )
+        )
+        .values(
+            status=Campanha.ENVIANDO,
+            heartbeat_em=agora,
+            iniciado_em=func.coalesce(Campanha.iniciado_em, agora),
+            erro=None
+        )
+    )
+    db.session.commit()
+    return resultado.rowcount == 1
+
+
+def _processar(app, campanha_id):
+    with app.app_context():
+        try:
+            if not _reivindicar(campanha_id):
+                return
+            _enviar_pendentes(campanha_id)
+        except Exception as e:
+            logger.exception('Falha no envio da campanha %s', campanha_id)
+            db.session.rollback()
+            db.session.execute(
+                update(Campanha)
+                .where(Campanha.id == campanha_id, Campanha.status == Campanha.ENVIANDO)
+                .values(status=Campanha.FALHOU, erro=str(e))
+            )
+            db.session.commit()
+        finally:
+            db.session.remove()
+        avisar_alteracao('campanha', acao='update', ids=[campanha_id])
+
+
+def _personalizar(modelo, lote, montar):
+    """
+    Uma mensagem por destinatário do lote, renderizada com os dados do
+    cliente (uma consulta para o lote todo). Erros de renderização ficam no
+    lugar da mensagem e viram falha só daquele destinatário.
+    """
+    dados = modelo.dados_clientes([destinatario.cliente_id for destinatario in lote])
+    mensagens = []
+    for destinatario in lote:
+        try:
+            mensagens.append(montar(destinatario.destino, *modelo.renderizar(dados.get(destinatario.cliente_id, {}))))
+        except Exception as e:
+            mensagens.append(e)
+    return mensagens
+
+
+def _enviar_renderizadas(enviar_lote, itens):
+    """Envia só os itens renderizados e devolve os resultados na ordem do lote"""
+    validos = [item for item in itens if not isinstance(item[1], Exception)]
+    resultados = iter(enviar_lote(validos))
+    return [item[1] if isinstance(item[1], Exception) else next(resultados) for item in itens]
+
+
+class _EnvioEmail:
+    """Envio dos lotes de uma campanha de e-mail pelo pool SMTP"""
+
+    def __init__(self, campanha):
+        config = ConfiguracaoSMTP.carregar()
+        # Modelos compilados, anexos e corpo codificados aqui, uma vez para toda a campanha
+        self.modelo = ModeloCampanha(campanha.assunto, campanha.corpo)
+        assunto, corpo, _ = self.modelo.renderizar({})
+        self.construtor = ConstrutorMensagem(config.remetente, assunto, corpo,
+                                             arquivos.resolver(campanha.lista_anexos()), html=self.modelo.html)
+        self.pool = PoolSMTP(config)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.pool.fechar()
+
+    def enviar_lote(self, lote):
+        """None para cada envio bem-sucedido ou a exceção do que falhou"""
+        if not self.modelo.personalizado:
+            return self.pool.enviar_lote([(d.destino, self.construtor.montar(d.destino)) for d in lote])
+        mensagens = _personalizar(self.modelo, lote, self.construtor.montar)
+        itens = [(destinatario.destino, mensagem) for destinatario, mensagem in zip(lote, mensagens)]
+        return _enviar_renderizadas(self.pool.enviar_lote, itens)
+
+    @staticmethod
+    def falha_de_conexao(erro):
+        """Erros que impedem o envio a qualquer destinatário (servidor fora do ar etc.)"""
+        return isinstance(erro, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError,
+                                 smtplib.SMTPAuthenticationError, OSError))
+
+
+class _EnvioWhatsApp:
+    """Envio dos lotes de uma campanha de WhatsApp pelo provedor configurado"""
+
+    falha_de_conexao = staticmethod(whatsapp.falha_de_conexao)
+
+    def __init__(self, campanha):
+        self.modelo = ModeloCampanha(None, campanha.corpo, html=False)
+        self.imagens = arquivos.resolver(campanha.lista_anexos())
+        self.midia_id = None
+        self.despacho = DespachoWhatsApp(ConfiguracaoWhatsApp.carregar())
+
+    def __enter__(self):
+        if self.imagens:
+            # A imagem vai ao provedor uma vez; todas as mensagens usam o mesmo id
+            try:
+                self.midia_id = self.despacho.enviar_midia(*self.imagens[0])
+            except Exception:
+                self.despacho.fechar()
+                raise
+        return self
+
+    def __exit__(self, *exc):
+        self.despacho.fechar()
+
+    def enviar_lote(self, lote):
+        """Id da mensagem no provedor para cada envio bem-sucedido ou a exceção do que falhou"""
+        def montar(destino, assunto, corpo, texto):
+            return corpo
+        textos = _personalizar(self.modelo, lote, montar)
+        itens = [(destinatario.destino, texto, self.midia_id) for destinatario, texto in zip(lote, textos)]
+        return _enviar_renderizadas(self.despacho.enviar_lote, itens)
+
+
+ENVIOS = {'email': _EnvioEmail, 'whatsapp': _EnvioWhatsApp}
+
+
+class _Heartbeat:
+    """
+    Renova heartbeat_em em uma thread própria enquanto a campanha é enviada.
+    Um lote não tem duração limitada (taxa baixa, backoff entre tentativas),
+    e sem isso a campanha seria dada como interrompida e reivindicada por
+    outro worker no meio do lote, enviando duas vezes aos mesmos destinatários.
+    """
+
+    def __init__(self, engine, campanha_id):
+        self.engine = engine
+        self.campanha_id = campanha_id
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._renovar, name=f'heartbeat-{campanha_id}', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._thread.join()
+
+    def _renovar(self):
+        while not self._parar.wait(INTERVALO_HEARTBEAT.total_seconds()):
+            try:
+                with self.engine.begin() as conexao:
+                    conexao.execute(
+                        update(Campanha.__table__)
+                        .where(Campanha.id == self.campanha_id, Campanha.status == Campanha.ENVIANDO)
+                        .values(heartbeat_em=datetime.utcnow())
+                    )
+            except Exception:
+                logger.exception('Falha ao renovar o heartbeat da campanha %s', self.campanha_id)
+
+
+def _enviar_pendentes(campanha_id):
+    campanha = db.session.get(Campanha, campanha_id)
+    canal = campanha.canal
+
+    with _Heartbeat(db.engine, campanha_id), ENVIOS[canal](campanha) as envio:
+        while True:
+            # Cancelamento feito por qualquer worker é visto entre os lotes
+            status = db.session.query(Campanha.status).filter(Campanha.id == campanha_id).scalar()
+            if status != Campanha.ENVIANDO:
+                return
+
+            lote = (
+                CampanhaDestinatario.query
+                .filter_by(campanha_id=campanha_id, status=CampanhaDestinatario.PENDENTE)
+                .order_by(CampanhaDestinatario.id)
+                .limit(TAMANHO_LOTE)
+                .all()
+            )
+            if not lote:
+                break
+
+            resultados = envio.enviar_lote(lote)
+
+            enviados = falhas = 0
+            falha_conexao = None
+            agora = datetime.utcnow()
+            for destinatario, resultado in zip(lote, resultados):
+                erro = resultado if isinstance(resultado, Exception) else None
+                if erro is None:
+                    destinatario.status = CampanhaDestinatario.ENVIADO
+                    destinatario.enviado_em = agora
+                    destinatario.id_externo = resultado
+                    enviados += 1
+                elif envio.falha_de_conexao(erro):
+                    # Continua pendente para ser enviado quando a campanha for retomada
+                    falha_conexao = erro
+                else:
+                    destinatario.status = CampanhaDestinatario.FALHOU
+                    destinatario.erro = f'Erro ao enviar para {destinatario.destino}: {str(erro)}'
+                    falhas += 1
+
+            db.session.execute(
+                update(Campanha)
+                .where(Campanha.id == campanha_id)
+                .values(
+                    enviados=Campanha.enviados + enviados,
+                    falhas=Campanha.falhas + falhas,
+                    heartbeat_em=datetime.utcnow()
+                )
+            )
+            db.session.commit()
+            metricas.mensagens_campanha.inc(enviados, canal=canal, resultado='enviado')
+            metricas.mensagens_campanha.inc(falhas, canal=canal, resultado='falhou')
+            # Totais relidos após o commit (a campanha pode ter sido retomada por outro worker)
+            eventos.progresso_campanha(campanha_id, Campanha.ENVIANDO, campanha.enviados,
+                                       campanha.falhas, campanha.total_destinatarios)
+            if falha_conexao:
+                raise falha_conexao
+
+    db.session.execute(
+        update(Campanha)
+        .where(Campanha.id == campanha_id, Campanha.status == Campanha.ENVIANDO)
+        .values(status=Campanha.CONCLUIDA, concluido_em=datetime.utcnow())
+    )
+    db.session.commit()
@@ -0,0 +1,171 @@
+"""
+Configurações do sistema (linha única de ConfiguracoesSistema) servidas
+da memória do processo.
+
+A linha é lida uma vez e guardada como um objeto imutável. Cada gravação
+incrementa o contador 'configuracoes' (tabela contadores_alteracao) na
+mesma transação; os demais processos comparam esse número, uma vez por
+requisição, e só releem a tabela quando ele muda.
+"""
+import threading
+from dataclasses import asdict, dataclass, fields
+from typing import Optional
+from flask import g, has_app_context
+from src.models.user import db
+from src.models.configuracoes_sistema import ConfiguracoesSistema
+from src.utils.contadores import incrementar_versao, ler_versao
+from src.utils.paginacao import ParametroInvalido
+
+CONTADOR = 'configuracoes'
+
+CAMPOS_PERSONALIZACAO = ('cor_primaria', 'cor_secundaria', 'logo_url', 'slogan', 'nome_empresa')
+
+
+@dataclass(frozen=True)
+class Configuracoes:
+    id: Optional[int] = None
+    email_server: Optional[str] = None
+    email_port: Optional[int] = None
+    email_user: Optional[str] = None
+    email_password: Optional[str] = None
+    email_use_tls: bool = True
+    email_remetente: Optional[str] = None
+    email_max_conexoes: int = 4
+    email_mensagens_por_conexao: int = 100
+    email_taxa_por_segundo: float = 10.0
+    cor_primaria: str = '#007bff'
+    cor_secundaria: str = '#6c757d'
+    logo_url: Optional[str] = None
+    slogan: Optional[str] = None
+    nome_empresa: Optional[str] = None
+
+    @classmethod
+    def de_modelo(cls, modelo):
+        if modelo is None:
+            return cls()
+        valores = {}
+        for campo in fields(cls):
+            # Colunas nulas em linhas antigas ficam com o valor padrão
+            valor = getattr(modelo, campo.name)
+            valores[campo.name] = valor if valor is not None else campo.default
+        return cls(**valores)
+
+    def to_dict(self):
+        return asdict(self)
+
+    def personalizacao(self):
+        return {campo: getattr(self, campo) for campo in CAMPOS_PERSONALIZACAO}
+
+
+# Campos gravados por salvar() (id não é editável)
+CAMPOS_EDITAVEIS = tuple(campo.name for campo in fields(Configuracoes) if campo.name != 'id')
+
+# Faixas aceitas nos campos numéricos: (tipo, mínimo, máximo)
+FAIXAS_NUMERICAS = {
+    'email_port': (int, 1, 65535),
+    'email_max_conexoes': (int, 1, 50),
+    'email_mensagens_por_conexao': (int, 1, 100000),
+    'email_taxa_por_segundo': (float, 0.1, 1000.0),
+}
+
+
+def _validar_campo(campo, valor):
+    if campo in FAIXAS_NUMERICAS:
+        tipo, minimo, maximo = FAIXAS_NUMERICAS[campo]
+        # Campos type="number" do formulário chegam como texto; vazio volta ao padrão
+        if valor is None or valor == '':
+            return None
+        if isinstance(valor, bool):
+            raise ParametroInvalido(f'{campo} deve ser um número')
+        try:
+            numero = tipo(valor)
+        except (TypeError, ValueError):
+            raise ParametroInvalido(f'{campo} deve ser um número{" inteiro" if tipo is int else ""}')
+        if tipo is int and numero != float(valor):
+            raise ParametroInvalido(f'{campo} deve ser um número inteiro')
+        if not minimo <= numero <= maximo:
+            raise ParametroInvalido(f'{campo} deve estar entre {minimo} e {maximo}')
+        return numero
+    if campo == 'email_use_tls':
+        if not isinstance(valor, bool):
+            raise ParametroInvalido('email_use_tls deve ser true ou false')
+        return valor
+    if valor is not None and not isinstance(valor, str):
+        raise ParametroInvalido(f'{campo} deve ser texto')
+    tamanho = ConfiguracoesSistema.__table__.c[campo].type.length
+    if valor and tamanho and len(valor) > tamanho:
+        raise ParametroInvalido(f'{campo} excede {tamanho} caracteres')
+    return valor
+
+
+def validar(dados):
+    """
+    Converte e confere os campos editáveis informados em `dados`, antes de
+    gravar: limites de envio fora da faixa só apareceriam no próximo envio
+    de campanha. Levanta ParametroInvalido.
+    """
+    if not isinstance(dados, dict):
+        raise ParametroInvalido('Envie as configurações como um objeto JSON')
+    return {campo: _validar_campo(campo, dados[campo]) for campo in CAMPOS_EDITAVEIS if campo in dados}
+
+
+class ServicoConfiguracoes:
+
+    def __init__(self):
+        self._atual = None
+        self._versao = None
+        self._lock = threading.Lock()
+
+    def _versao_do_banco(self):
+        # Uma consulta ao contador por requisição (ou por contexto da aplicação)
+        if has_app_context():
+            if '_versao_configuracoes' not in g:
+                g._versao_configuracoes = ler_versao(CONTADOR)
+            return g._versao_configuracoes
+        return ler_versao(CONTADOR)
+
+    def obter(self):
+        """Configurações atuais; relê a tabela só quando a versão no banco mudou"""
+        versao = self._versao_do_banco()
+        with self._lock:
+            if self._atual is not None and self._versao == versao:
+                return self._atual
+        atual = Configuracoes.de_modelo(ConfiguracoesSistema.query.first())
+        with self._lock:
+            self._atual, self._versao = atual, versao
+        return atual
+
+    def salvar(self, dados):
+        """
+        Valida e grava os campos informados (senha '***' mantém a atual),
+        incrementa a versão e faz o commit. Retorna as novas Configuracoes.
+        Levanta ParametroInvalido sem gravar nada se algum campo for inválido.
+        """
+        dados = validar(dados)
+        config = ConfiguracoesSistema.query.first()
+        if not config:
+            config = ConfiguracoesSistema()
+            db.session.add(config)
+        for campo in CAMPOS_EDITAVEIS:
+            if campo not in dados:
+                continue
+            if campo == 'email_password' and dados[campo] == '***':
+                continue
+            setattr(config, campo, dados[campo])
+        incrementar_versao(CONTADOR)
+        versao = ler_versao(CONTADOR)
+        db.session.commit()
+
+        atual = Configuracoes.de_modelo(config)
+        with self._lock:
+            self._atual, self._versao = atual, versao
+        if has_app_context():
+            g._versao_configuracoes = versao
+        return atual
+
+    def invalidar(self):
+        with self._lock:
+            self._atual = self._versao = None
+
+
+configuracoes = ServicoConfiguracoes()
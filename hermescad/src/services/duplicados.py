@@ -0,0 +1,301 @@
+"""
+Detecção de clientes duplicados e mesclagem.
+
+As restrições únicas de cpf_cnpj e e-mail não pegam variações como
+"123.456.789-09" x "12345678909", "(11) 98765-4321" x "+55 11 8765-4321"
+ou "João da Silva" x "Joao Silva". Comparar todos os pares é inviável,
+então cada cliente recebe chaves de bloqueio normalizadas:
+
+    documento:12345678909         só dígitos (CPF ou CNPJ)
+    email:joao@example.com        minúsculas
+    telefone:+5511987654321       E.164, e também sem o nono dígito
+    nome:jn sl                    chave fonética do nome completo
+
+As chaves ficam em cliente_chaves, cuja chave primária (chave,
+cliente_id) é o índice de bloqueio: só clientes que compartilham uma
+chave são comparados, e chaves comuns demais (mais de LIMITE_BLOCO
+clientes, como um telefone genérico) são descartadas. O custo cresce com
+o número de clientes, não com o número de pares. Cada par candidato
+recebe uma pontuação (documento, e-mail, telefone e similaridade de
+trigramas do nome) e os pares acima de LIMIAR_SUGESTAO viram sugestões em
+duplicidades.
+"""
+import json
+import re
+import time
+import unicodedata
+from functools import lru_cache
+from itertools import groupby
+from sqlalchemy import delete, func, insert, or_, select, update
+from src.models.user import db
+from src.models.atividade import Atividade
+from src.models.cliente import Cliente
+from src.models.duplicidade import ChaveCliente, Duplicidade
+from src.services.whatsapp import normalizar_e164
+from src.utils.paginacao import ParametroInvalido
+
+TAMANHO_LOTE = 2000
+TAMANHO_BLOCO_IDS = 500
+# Chaves compartilhadas por mais clientes que isso não discriminam nada
+LIMITE_BLOCO = 25
+LIMIAR_SUGESTAO = 0.5
+
+# Peso de cada chave compartilhada; o nome entra com PESO_NOME x similaridade
+PESOS = {'documento': 0.6, 'email': 0.5, 'telefone': 0.3}
+PESO_NOME = 0.5
+SIMILARIDADE_MINIMA_NOME = 0.5
+# Documentos válidos e diferentes indicam pessoas (ou empresas) diferentes
+PENALIDADE_DOCUMENTO = 0.5
+
+# Completados no cliente mantido quando estão vazios nele
+CAMPOS_MESCLADOS = (
+    'endereco', 'numero_telefone', 'numero_celular', 'area_atuacao', 'cpf_cnpj',
+    'informacoes_financeiras', 'email', 'cargo', 'site'
+)
+
+_IGNORADAS_NO_NOME = frozenset({
+    'a', 'e', 'o', 'da', 'de', 'di', 'do', 'du', 'das', 'dos', 'cia', 'com',
+    'ltda', 'me', 'epp', 'eireli', 'sa',
+})
+
+# Chave fonética simplificada para o português (aplicadas em ordem)
+_REGRAS_FONETICAS = tuple((re.compile(padrao), troca) for padrao, troca in (
+    (r'ph', 'f'),
+    (r'th', 't'),
+    (r'[cs]h', 'x'),
+    (r'lh', 'l'),
+    (r'nh', 'n'),
+    (r'sc(?=[ei])', 's'),
+    (r'qu(?=[ei])', 'k'),
+    (r'gu(?=[ei])', 'g'),
+    (r'c(?=[ei])', 's'),
+    (r'g(?=[ei])', 'j'),
+    (r'[cq]', 'k'),
+    (r'w', 'v'),
+    (r'y', 'i'),
+    (r'z', 's'),
+    (r'h', ''),
+    (r'm$', 'n'),
+    (r'(?<=.)[aeiou]', ''),
+    (r'(.)\1+', r'\1'),
+))
+
+
+def palavras_nome(nome):
+    """'João da Silva & Cia.' -> ['joao', 'silva']"""
+    texto = unicodedata.normalize('NFKD', (nome or '').replace('ç', 's').replace('Ç', 's'))
+    texto = texto.encode('ascii', 'ignore').decode('ascii').lower()
+    return [palavra for palavra in re.split(r'[^a-z0-9]+', texto) if palavra and palavra not in _IGNORADAS_NO_NOME]
+
+
+@lru_cache(maxsize=65536)
+def fonetica(palavra):
+    for padrao, troca in _REGRAS_FONETICAS:
+        palavra = padrao.sub(troca, palavra)
+    return palavra
+
+
+def trigramas(palavras):
+    texto = f"  {' '.join(palavras)} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def similaridade(trigramas_a, trigramas_b):
+    """Jaccard de dois conjuntos de trigramas (0 a 1)"""
+    if not trigramas_a or not trigramas_b:
+        return 0.0
+    return len(trigramas_a & trigramas_b) / len(trigramas_a | trigramas_b)
+
+
+# Nomes se repetem muito entre os pares candidatos
+@lru_cache(maxsize=65536)
+def trigramas_nome(nome):
+    return frozenset(trigramas(palavras_nome(nome)))
+
+
+def similaridade_nome(a, b):
+    return similaridade(trigramas_nome(a), trigramas_nome(b))
+
+
+def documento_normalizado(valor):
+    """CPF ou CNPJ só com dígitos, ou None se não tiver 11 ou 14 dígitos"""
+    digitos = re.sub(r'\D', '', valor or '')
+    if len(digitos) not in (11, 14) or len(set(digitos)) == 1:
+        return None
+    return digitos
+
+
+def chaves_cliente(nome, cpf_cnpj, email, numero_telefone, numero_celular):
+    """Conjunto de chaves de bloqueio de um cliente"""
+    chaves = set()
+    documento = documento_normalizado(cpf_cnpj)
+    if documento:
+        chaves.add(f'documento:{documento}')
+    email = (email or '').strip().lower()
+    if '@' in email:
+        chaves.add(f'email:{email}')
+    for numero in (numero_telefone, numero_celular):
+        telefone = normalizar_e164(numero)
+        if telefone:
+            chaves.add(f'telefone:{telefone}')
+            # Celular brasileiro com e sem o nono dígito
+            if telefone.startswith('+55') and len(telefone) == 14 and telefone[5] == '9':
+                chaves.add(f'telefone:{telefone[:5]}{telefone[6:]}')
+    palavras = palavras_nome(nome)
+    if palavras:
+        chaves.add('nome:' + ' '.join(fonetica(palavra) for palavra in palavras))
+    return chaves
+
+
+def _reconstruir_chaves():
+    """Recalcula as chaves de todos os clientes, percorrendo-os por id. Retorna (clientes, chaves)."""
+    db.session.execute(delete(ChaveCliente))
+    clientes = total_chaves = 0
+    ultimo = 0
+    while True:
+        linhas = db.session.execute(
+            select(Cliente.id, Cliente.nome, Cliente.cpf_cnpj, Cliente.email,
+                   Cliente.numero_telefone, Cliente.numero_celular)
+            .where(Cliente.id > ultimo).order_by(Cliente.id).limit(TAMANHO_LOTE)
+        ).all()
+        if not linhas:
+            return clientes, total_chaves
+        registros = [{'chave': chave, 'cliente_id': linha.id}
+                     for linha in linhas for chave in chaves_cliente(*linha[1:])]
+        if registros:
+            # insert() da tabela, sem o ORM: milhões de linhas por executemany
+            db.session.execute(insert(ChaveCliente.__table__), registros)
+        clientes += len(linhas)
+        total_chaves += len(registros)
+        ultimo = linhas[-1].id
+
+
+def _pares_candidatos():
+    """{(menor_id, maior_id): {tipos de chave em comum}} a partir dos blocos"""
+    compartilhadas = (
+        select(ChaveCliente.chave)
+        .group_by(ChaveCliente.chave)
+        .having(func.count().between(2, LIMITE_BLOCO))
+    )
+    linhas = db.session.execute(
+        select(ChaveCliente.chave, ChaveCliente.cliente_id)
+        .where(ChaveCliente.chave.in_(compartilhadas))
+        .order_by(ChaveCliente.chave, ChaveCliente.cliente_id)
+    )
+    pares = {}
+    for chave, bloco in groupby(linhas, key=lambda linha: linha.chave):
+        tipo = chave.split(':', 1)[0]
+        ids = [linha.cliente_id for linha in bloco]
+        for i, menor in enumerate(ids):
+            for maior in ids[i + 1:]:
+                pares.setdefault((menor, maior), set()).add(tipo)
+    return pares
+
+
+def _dados_clientes(ids):
+    dados = {}
+    ids = sorted(ids)
+    for inicio in range(0, len(ids), TAMANHO_BLOCO_IDS):
+        bloco = ids[inicio:inicio + TAMANHO_BLOCO_IDS]
+        for linha in db.session.execute(
+            select(Cliente.id, Cliente.nome, Cliente.cpf_cnpj).where(Cliente.id.in_(bloco))
+        ):
+            dados[linha.id] = (trigramas_nome(linha.nome), documento_normalizado(linha.cpf_cnpj))
+    return dados
+
+
+def pontuar(tipos, cliente, duplicado):
+    """(pontuação, motivos) de um par; cliente e duplicado são (trigramas do nome, documento)"""
+    motivos = [tipo for tipo in ('documento', 'email', 'telefone') if tipo in tipos]
+    pontuacao = sum(PESOS[tipo] for tipo in motivos)
+    nome = similaridade(cliente[0], duplicado[0])
+    if nome >= SIMILARIDADE_MINIMA_NOME:
+        pontuacao += PESO_NOME * nome
+        motivos.append(f'nome {nome:.2f}')
+    if cliente[1] and duplicado[1] and cliente[1] != duplicado[1]:
+        pontuacao -= PENALIDADE_DOCUMENTO
+    return min(pontuacao, 1.0), motivos
+
+
+def detectar():
+    """
+    Reconstrói as chaves, pontua os pares candidatos e substitui as
+    sugestões pendentes (pares marcados como ignorados são mantidos e não
+    voltam a ser sugeridos). Faz o commit. Retorna as estatísticas.
+    """
+    inicio = time.perf_counter()
+    clientes, chaves = _reconstruir_chaves()
+    pares = _pares_candidatos()
+
+    ignorados = set(db.session.execute(
+        select(Duplicidade.cliente_id, Duplicidade.duplicado_id).where(Duplicidade.status == Duplicidade.IGNORADA)
+    ).tuples())
+    db.session.execute(delete(Duplicidade).where(Duplicidade.status == Duplicidade.PENDENTE))
+
+    candidatos = sorted(par for par in pares if par not in ignorados)
+    sugestoes = 0
+    for posicao in range(0, len(candidatos), TAMANHO_LOTE):
+        lote = candidatos[posicao:posicao + TAMANHO_LOTE]
+        dados = _dados_clientes({id for par in lote for id in par})
+        registros = []
+        for cliente_id, duplicado_id in lote:
+            if cliente_id not in dados or duplicado_id not in dados:
+                continue
+            pontuacao, motivos = pontuar(pares[cliente_id, duplicado_id], dados[cliente_id], dados[duplicado_id])
+            if pontuacao >= LIMIAR_SUGESTAO:
+                registros.append({
+                    'cliente_id': cliente_id,
+                    'duplicado_id': duplicado_id,
+                    'pontuacao': pontuacao,
+                    'motivos': json.dumps(motivos),
+                    'status': Duplicidade.PENDENTE
+                })
+        if registros:
+            db.session.execute(insert(Duplicidade.__table__), registros)
+            sugestoes += len(registros)
+
+    db.session.commit()
+    return {
+        'clientes': clientes,
+        'chaves': chaves,
+        'pares_candidatos': len(pares),
+        'sugestoes': sugestoes,
+        'segundos': round(time.perf_counter() - inicio, 2)
+    }
+
+
+def mesclar(cliente, duplicado):
+    """
+    Mescla `duplicado` em `cliente`: campos vazios do cliente são
+    completados, as atividades passam para ele e o duplicado é excluído.
+    Faz o commit. Retorna os ids das atividades transferidas.
+    """
+    if cliente.id == duplicado.id:
+        raise ParametroInvalido('Um cliente não pode ser mesclado com ele mesmo')
+
+    valores = {
+        campo: getattr(duplicado, campo) for campo in CAMPOS_MESCLADOS
+        if getattr(cliente, campo) in (None, '') and getattr(duplicado, campo) not in (None, '')
+    }
+    if duplicado.possui_whatsapp and not cliente.possui_whatsapp:
+        valores['possui_whatsapp'] = True
+    if duplicado.data_cadastro and (cliente.data_cadastro is None or duplicado.data_cadastro < cliente.data_cadastro):
+        valores['data_cadastro'] = duplicado.data_cadastro
+
+    atividades = db.session.execute(
+        select(Atividade.id).where(Atividade.cliente_id == duplicado.id)
+    ).scalars().all()
+    db.session.execute(
+        update(Atividade).where(Atividade.cliente_id == duplicado.id).values(cliente_id=cliente.id)
+    )
+    db.session.execute(delete(Duplicidade).where(
+        or_(Duplicidade.cliente_id == duplicado.id, Duplicidade.duplicado_id == duplicado.id)
+    ))
+    db.session.execute(delete(ChaveCliente).where(ChaveCliente.cliente_id == duplicado.id))
+    # O duplicado sai antes: e-mail e cpf_cnpj herdados são únicos
+    db.session.delete(duplicado)
+    db.session.flush()
+    for campo, valor in valores.items():
+        setattr(cliente, campo, valor)
+    db.session.commit()
+    return atividades
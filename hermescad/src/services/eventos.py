@@ -0,0 +1,158 @@
+"""
+Feed de eventos para os navegadores (Server-Sent Events em /api/events).
+
+Tipos publicados:
+- 'entidade': {'entidade', 'acao', 'ids'} a cada cliente, atividade,
+  produto ou campanha criado, alterado ou excluído (sinal entidade_alterada);
+- 'campanha': {'id', 'status', 'enviados', 'falhas', 'total'} a cada lote
+  enviado de uma campanha;
+- 'reset': o Last-Event-ID informado não está mais no histórico (ou o
+  servidor reiniciou); o navegador deve sincronizar as listas de novo.
+
+Com um único processo (servidor de desenvolvimento), os eventos ficam na
+CentralLocal deste processo e a própria rota /api/events os entrega. Com
+vários workers, defina EVENTOS_SOCKET: cada worker envia os eventos em
+datagramas para esse socket Unix, onde o servidor_eventos.py (asyncio,
+uma thread para todas as conexões) numera, guarda o histórico e entrega
+a todos os navegadores.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from src.utils.sinais import entidade_alterada
+
+EVENTOS_SOCKET = os.getenv('EVENTOS_SOCKET', '')
+# Eventos guardados para retomar conexões com Last-Event-ID
+TAMANHO_HISTORICO = int(os.getenv('EVENTOS_HISTORICO', '1000'))
+INTERVALO_HEARTBEAT = 15
+# Acima disso os ids não vão no evento (o navegador sincroniza a lista inteira)
+MAXIMO_IDS_EVENTO = 500
+# Sugestão de espera (ms) para o EventSource reconectar
+ESPERA_RECONEXAO_MS = 3000
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Evento:
+    id: str
+    tipo: str
+    dados: dict
+
+    def formatar(self):
+        """Evento no formato text/event-stream"""
+        dados = json.dumps(self.dados, ensure_ascii=False, separators=(',', ':'))
+        return f'id: {self.id}\nevent: {self.tipo}\ndata: {dados}\n\n'.encode('utf-8')
+
+
+def evento_reset(geracao, sequencia):
+    return Evento(f'{geracao}-{sequencia}', 'reset', {})
+
+
+class HistoricoEventos:
+    """
+    Numera os eventos e guarda os últimos TAMANHO_HISTORICO. O id é
+    '<geração>-<sequência>': a geração muda a cada início do processo, de
+    modo que um Last-Event-ID de antes de um reinício é reconhecido.
+    """
+
+    def __init__(self, tamanho=TAMANHO_HISTORICO):
+        self.geracao = format(int(time.time() * 1000), 'x')
+        self.sequencia = 0
+        self._eventos = deque(maxlen=tamanho)
+
+    def adicionar(self, tipo, dados):
+        self.sequencia += 1
+        evento = Evento(f'{self.geracao}-{self.sequencia}', tipo, dados)
+        self._eventos.append((self.sequencia, evento))
+        return evento
+
+    def desde(self, ultimo_id):
+        """
+        Eventos posteriores a `ultimo_id`. Se ele for de outra geração ou já
+        tiver saído do histórico, devolve só um evento 'reset'.
+        """
+        if not ultimo_id:
+            return []
+        geracao, _, sequencia = ultimo_id.partition('-')
+        try:
+            sequencia = int(sequencia)
+        except ValueError:
+            sequencia = -1
+        primeiro = self._eventos[0][0] if self._eventos else self.sequencia + 1
+        if geracao != self.geracao or sequencia > self.sequencia or sequencia < primeiro - 1:
+            return [evento_reset(self.geracao, self.sequencia)]
+        return [evento for numero, evento in self._eventos if numero > sequencia]
+
+
+class CentralLocal(HistoricoEventos):
+    """Histórico do processo, com espera por eventos novos para as conexões SSE"""
+
+    def __init__(self, tamanho=TAMANHO_HISTORICO):
+        super().__init__(tamanho)
+        self._condicao = threading.Condition()
+
+    def publicar(self, tipo, dados):
+        with self._condicao:
+            evento = self.adicionar(tipo, dados)
+            self._condicao.notify_all()
+        return evento
+
+    def aguardar(self, ultimo_id, timeout=INTERVALO_HEARTBEAT):
+        """Eventos após `ultimo_id`; espera até `timeout` segundos se ainda não houver"""
+        with self._condicao:
+            eventos = self.desde(ultimo_id)
+            if not eventos:
+                self._condicao.wait(timeout)
+                eventos = self.desde(ultimo_id)
+            return eventos
+
+    def ultimo_id(self):
+        with self._condicao:
+            return f'{self.geracao}-{self.sequencia}'
+
+
+central = CentralLocal()
+_socket_publicacao = None
+
+
+def _enviar_ao_servidor(tipo, dados):
+    global _socket_publicacao
+    if _socket_publicacao is None:
+        _socket_publicacao = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        _socket_publicacao.setblocking(False)
+    try:
+        _socket_publicacao.sendto(json.dumps({'tipo': tipo, 'dados': dados}).encode('utf-8'), EVENTOS_SOCKET)
+    except OSError as e:
+        # Servidor de eventos fora do ar ou fila cheia: o evento se perde, os dados não
+        logger.debug('Evento %s não publicado: %s', tipo, e)
+
+
+def publicar(tipo, dados):
+    if EVENTOS_SOCKET:
+        _enviar_ao_servidor(tipo, dados)
+    else:
+        central.publicar(tipo, dados)
+
+
+def progresso_campanha(campanha_id, status, enviados, falhas, total):
+    publicar('campanha', {
+        'id': campanha_id, 'status': status, 'enviados': enviados, 'falhas': falhas, 'total': total
+    })
+
+
+def _ao_alterar_entidade(entidade, acao, ids):
+    dados = {'entidade': entidade, 'acao': acao}
+    if len(ids) <= MAXIMO_IDS_EVENTO:
+        dados['ids'] = list(ids)
+    publicar('entidade', dados)
+
+
+def registrar_eventos():
+    """Publica no feed as alterações avisadas pelo sinal entidade_alterada"""
+    entidade_alterada.connect(_ao_alterar_entidade)
@@ -0,0 +1,285 @@
+"""
+Importação em massa de clientes a partir de CSV ou XLSX.
+
+O arquivo é lido linha a linha; as linhas válidas são gravadas em lotes
+(INSERT com vários VALUES e UPDATE via executemany), com um commit por
+lote. Um lote que esbarra em restrição do banco é revertido e suas
+linhas entram no relatório de erros; os demais seguem. Linhas cujo
+cpf_cnpj ou e-mail (sem diferenciar maiúsculas) já existem atualizam o
+cliente correspondente (upsert); células vazias não apagam valores
+existentes.
+"""
+import csv
+import io
+import itertools
+import re
+import time
+import unicodedata
+from zipfile import BadZipFile
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.cliente import Cliente
+from src.utils.sinais import avisar_alteracao
+
+TAMANHO_LOTE = 1000
+TAMANHO_BLOCO_IDS = 500
+# Máximo de linhas com erro detalhadas na resposta
+MAXIMO_ERROS_DETALHADOS = 1000
+
+COLUNAS_IMPORTAVEIS = (
+    'nome', 'endereco', 'numero_telefone', 'numero_celular', 'possui_whatsapp', 'area_atuacao',
+    'cpf_cnpj', 'informacoes_financeiras', 'email', 'cargo', 'site'
+)
+
+# Valores para células vazias em clientes novos (executemany exige as
+# mesmas colunas em todas as linhas, então o default do modelo não se aplica)
+PADROES_INSERCAO = {'possui_whatsapp': False}
+
+# Nomes alternativos aceitos no cabeçalho do arquivo
+APELIDOS_COLUNAS = {
+    'telefone': 'numero_telefone',
+    'fone': 'numero_telefone',
+    'celular': 'numero_celular',
+    'whatsapp': 'possui_whatsapp',
+    'cpf': 'cpf_cnpj',
+    'cnpj': 'cpf_cnpj',
+    'cnpj_cpf': 'cpf_cnpj',
+    'e_mail': 'email',
+    'area': 'area_atuacao',
+    'area_de_atuacao': 'area_atuacao',
+}
+
+# Textos que o Excel interpretaria como fórmula: a exportação os grava com
+# um ' na frente (routes/exportacao.py), que sai de novo na importação
+INICIOS_DE_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+_VERDADEIROS = ('1', 'true', 'sim', 's', 'yes', 'y', 'x')
+_FALSOS = ('0', 'false', 'nao', 'n', 'no', '')
+
+
+class ArquivoInvalido(ValueError):
+    """Arquivo que não pode ser importado (formato ou cabeçalho)"""
+
+
+def _sem_acentos(texto):
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+
+
+def _normalizar_cabecalho(nome):
+    nome = _sem_acentos(str(nome or ''))
+    nome = re.sub(r'[^a-z0-9]+', '_', nome.strip().lower()).strip('_')
+    return APELIDOS_COLUNAS.get(nome, nome)
+
+
+def _linhas_csv(stream):
+    texto = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+    primeira = texto.readline()
+    if not primeira:
+        raise ArquivoInvalido('Arquivo vazio')
+    # Planilhas brasileiras costumam exportar CSV com ';'
+    delimitador = ';' if primeira.count(';') > primeira.count(',') else ','
+    yield from csv.reader(itertools.chain([primeira], texto), delimiter=delimitador)
+
+
+def _linhas_xlsx(stream):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ArquivoInvalido('Importação de XLSX requer o pacote openpyxl')
+    try:
+        planilha = load_workbook(stream, read_only=True, data_only=True).active
+    except (BadZipFile, KeyError, OSError):
+        raise ArquivoInvalido('Arquivo XLSX inválido')
+    for linha in planilha.iter_rows(values_only=True):
+        yield ['' if valor is None else str(valor) for valor in linha]
+
+
+def _valor_importado(valor):
+    if valor[:1] == "'" and valor[1:2] and valor[1:2] in INICIOS_DE_FORMULA:
+        valor = valor[1:]
+    return valor.strip()
+
+
+def ler_linhas(stream, formato):
+    """Gera (numero_da_linha, dict) para cada linha de dados do arquivo"""
+    linhas = _linhas_xlsx(stream) if formato == 'xlsx' else _linhas_csv(stream)
+    try:
+        cabecalho = [_normalizar_cabecalho(coluna) for coluna in next(linhas)]
+    except StopIteration:
+        raise ArquivoInvalido('Arquivo vazio')
+    if 'nome' not in cabecalho:
+        raise ArquivoInvalido('O arquivo precisa de uma coluna "nome"')
+
+    indices = [(i, coluna) for i, coluna in enumerate(cabecalho) if coluna in COLUNAS_IMPORTAVEIS]
+    for numero, valores in enumerate(linhas, start=2):
+        if not any(str(valor).strip() for valor in valores):
+            continue
+        yield numero, {coluna: (_valor_importado(valores[i]) if i < len(valores) else '') for i, coluna in indices}
+
+
+def validar_linha(dados):
+    """Converte e valida uma linha. Retorna (valores, erros)."""
+    erros = []
+    valores = {}
+    if not dados.get('nome'):
+        erros.append('nome é obrigatório')
+    for coluna, valor in dados.items():
+        valor = valor or None
+        if coluna == 'possui_whatsapp' and valor is not None:
+            normalizado = _sem_acentos(valor).lower()
+            if normalizado in _VERDADEIROS:
+                valor = True
+            elif normalizado in _FALSOS:
+                valor = False
+            else:
+                erros.append(f'possui_whatsapp inválido: {valor}')
+                continue
+        elif coluna == 'email' and valor is not None:
+            valor = valor.lower()
+            if not _EMAIL.match(valor):
+                erros.append(f'E-mail inválido: {valor}')
+                continue
+        tamanho = getattr(Cliente.__table__.c[coluna].type, 'length', None)
+        if isinstance(valor, str) and tamanho and len(valor) > tamanho:
+            erros.append(f'{coluna} excede {tamanho} caracteres')
+            continue
+        valores[coluna] = valor
+    return valores, erros
+
+
+def _buscar_existentes(coluna, chaves):
+    encontrados = {}
+    chaves = list(chaves)
+    for inicio in range(0, len(chaves), TAMANHO_BLOCO_IDS):
+        bloco = chaves[inicio:inicio + TAMANHO_BLOCO_IDS]
+        for id, chave in db.session.execute(select(Cliente.id, coluna).where(coluna.in_(bloco))):
+            encontrados[chave] = id
+    return encontrados
+
+
+class ResultadoImportacao:
+
+    def __init__(self):
+        self.linhas = 0
+        self.inseridos = 0
+        self.atualizados = 0
+        self.com_erro = 0
+        self.erros = []
+        self.inicio = time.monotonic()
+
+    def registrar_erro(self, linha, erros):
+        self.com_erro += 1
+        if len(self.erros) < MAXIMO_ERROS_DETALHADOS:
+            self.erros.append({'linha': linha, 'erros': erros})
+
+    def to_dict(self, final=False):
+        duracao = time.monotonic() - self.inicio
+        dados = {
+            'linhas_processadas': self.linhas,
+            'inseridos': self.inseridos,
+            'atualizados': self.atualizados,
+            'com_erro': self.com_erro,
+            'duracao_s': round(duracao, 3),
+            'linhas_por_segundo': round(self.linhas / duracao, 1) if duracao else None,
+        }
+        if final:
+            dados['concluido'] = True
+            dados['erros'] = self.erros
+            dados['erros_omitidos'] = self.com_erro - len(self.erros)
+        return dados
+
+
+def _gravar_lote(lote, colunas, resultado):
+    """Grava um lote de (linha, valores) já validados, em uma transação"""
+    # Linhas repetidas dentro do lote (mesmo CPF/CNPJ ou e-mail) são mescladas
+    mesclado = []
+    por_chave = {}
+    for linha, valores in lote:
+        alvos = {por_chave[(c, valores[c])] for c in ('cpf_cnpj', 'email') if valores.get(c) and (c, valores[c]) in por_chave}
+        if len(alvos) > 1:
+            resultado.registrar_erro(linha, ['CPF/CNPJ e e-mail repetem clientes diferentes do arquivo'])
+            continue
+        if alvos:
+            indice = alvos.pop()
+            mesclado[indice][1].update({c: v for c, v in valores.items() if v is not None})
+        else:
+            indice = len(mesclado)
+            mesclado.append((linha, dict(valores)))
+        for c in ('cpf_cnpj', 'email'):
+            if mesclado[indice][1].get(c):
+                por_chave[(c, mesclado[indice][1][c])] = indice
+
+    por_cpf = _buscar_existentes(Cliente.cpf_cnpj, {v['cpf_cnpj'] for _, v in mesclado if v.get('cpf_cnpj')})
+    # E-mails do arquivo já vêm em minúsculas; os gravados podem não estar
+    por_email = _buscar_existentes(func.lower(Cliente.email), {v['email'] for _, v in mesclado if v.get('email')})
+
+    novos, alterados, gravadas = [], [], []
+    for linha, valores in mesclado:
+        ids = {por_cpf.get(valores.get('cpf_cnpj')), por_email.get(valores.get('email'))} - {None}
+        if len(ids) > 1:
+            resultado.registrar_erro(linha, ['CPF/CNPJ e e-mail pertencem a clientes diferentes'])
+        elif ids:
+            alterados.append({'_id': ids.pop(), **{c: valores.get(c) for c in colunas}})
+            gravadas.append(linha)
+        else:
+            novos.append({c: valores[c] if valores.get(c) is not None else PADROES_INSERCAO.get(c) for c in colunas})
+            gravadas.append(linha)
+
+    tabela = Cliente.__table__
+    ids_novos = []
+    try:
+        if novos:
+            ids_novos = list(db.session.execute(insert(tabela).returning(tabela.c.id), novos).scalars())
+        if alterados:
+            # Célula vazia (None) mantém o valor atual do cliente
+            db.session.execute(
+                update(tabela)
+                .where(tabela.c.id == bindparam('_id'))
+                .values({c: func.coalesce(bindparam(c), tabela.c[c]) for c in colunas}),
+                alterados
+            )
+        db.session.commit()
+    except IntegrityError:
+        # Ex.: dois clientes já gravados com o mesmo e-mail em caixas diferentes
+        db.session.rollback()
+        for linha in sorted(gravadas):
+            resultado.registrar_erro(linha, ['Lote não gravado: CPF/CNPJ ou e-mail em conflito com clientes já cadastrados'])
+        return
+
+    resultado.inseridos += len(novos)
+    resultado.atualizados += len(alterados)
+    if ids_novos:
+        avisar_alteracao('cliente', acao='create', ids=ids_novos)
+    if alterados:
+        avisar_alteracao('cliente', acao='update', ids=[item['_id'] for item in alterados])
+
+
+def importar_clientes(stream, formato='csv'):
+    """
+    Importa o arquivo e gera um dict de progresso a cada lote gravado; o
+    último dict (com 'concluido') traz o relatório de erros por linha.
+    """
+    resultado = ResultadoImportacao()
+    linhas = ler_linhas(stream, formato)
+    colunas = None
+    lote = []
+
+    for numero, dados in linhas:
+        if colunas is None:
+            colunas = [c for c in COLUNAS_IMPORTAVEIS if c in dados]
+        resultado.linhas += 1
+        valores, erros = validar_linha(dados)
+        if erros:
+            resultado.registrar_erro(numero, erros)
+            continue
+        lote.append((numero, valores))
+        if len(lote) >= TAMANHO_LOTE:
+            _gravar_lote(lote, colunas, resultado)
+            lote = []
+            yield resultado.to_dict()
+
+    if lote:
+        _gravar_lote(lote, colunas, resultado)
+    yield resultado.to_dict(final=True)
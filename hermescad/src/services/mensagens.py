@@ -0,0 +1,303 @@
+"""
+Montagem das mensagens de uma campanha.
+
+Os anexos e o corpo são codificados (base64, CRLF e dot-stuffing do SMTP)
+uma única vez por campanha; cada destinatário recebe apenas um cabeçalho
+novo seguido das mesmas partes já prontas, que a conexão SMTP transmite
+sem concatená-las. Os anexos codificados ficam em um cache limitado,
+indexado pelo hash SHA-256 do conteúdo, e são reaproveitados entre
+campanhas. Corpos em HTML vão em multipart/alternative com uma versão em
+texto puro gerada a partir do HTML.
+"""
+import base64
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from html.parser import HTMLParser
+from email.message import Message
+from email.mime.base import MIMEBase
+from email import encoders, policy
+from email.utils import formatdate, make_msgid
+
+# Limite, em bytes já codificados, dos anexos mantidos em memória
+TAMANHO_CACHE_ANEXOS = int(os.getenv('CACHE_ANEXOS_MB', '256')) * 1024 * 1024
+TAMANHO_LEITURA = 1024 * 1024
+
+# Serialização com CRLF mantendo o modelo compat32 de email.mime
+_POLITICA = policy.compat32.clone(linesep='\r\n')
+
+_FIM_DE_LINHA = re.compile(rb'\r\n|\r|\n')
+# Uma marcação HTML de verdade (não basta um '<' como em "a < b")
+_MARCACAO_HTML = re.compile(r'<(?:/?[a-zA-Z][a-zA-Z0-9]*(?:\s[^<>]*)?/?|!--.*?--|!DOCTYPE[^<>]*)>', re.S)
+_PONTO_NO_INICIO = re.compile(rb'(?m)^\.')
+
+
+def preparar_para_smtp(dados):
+    """Normaliza fins de linha para CRLF e duplica pontos no início de linha (RFC 5321)"""
+    dados = _PONTO_NO_INICIO.sub(b'..', _FIM_DE_LINHA.sub(b'\r\n', dados))
+    if not dados.endswith(b'\r\n'):
+        dados += b'\r\n'
+    return dados
+
+
+class MensagemPreparada:
+    """Mensagem já pronta para a fase DATA, em partes que não são concatenadas"""
+
+    __slots__ = ('partes',)
+
+    def __init__(self, partes):
+        self.partes = partes
+
+    def __len__(self):
+        return sum(len(parte) for parte in self.partes)
+
+    def as_bytes(self):
+        return b''.join(self.partes)
+
+
+class CacheAnexos:
+    """
+    Cache LRU das partes MIME de anexos já codificadas, limitado em bytes.
+    O hash de um arquivo fica guardado enquanto alguma parte dele está no
+    cache e sai junto com ela.
+    """
+
+    def __init__(self, limite_bytes):
+        self.limite_bytes = limite_bytes
+        self._itens = OrderedDict()
+        # (caminho, tamanho, mtime) -> SHA-256, e SHA-256 -> essas chaves
+        self._hashes = {}
+        self._arquivos = {}
+        self._tamanho = 0
+        self._lock = threading.Lock()
+
+    def _hash_arquivo(self, caminho):
+        """(chave do arquivo, SHA-256 do conteúdo); relido só quando tamanho ou data de modificação mudam"""
+        info = os.stat(caminho)
+        arquivo = (caminho, info.st_size, info.st_mtime_ns)
+        with self._lock:
+            sha = self._hashes.get(arquivo)
+        if sha is None:
+            calculo = hashlib.sha256()
+            with open(caminho, 'rb') as conteudo:
+                for bloco in iter(lambda: conteudo.read(TAMANHO_LEITURA), b''):
+                    calculo.update(bloco)
+            sha = calculo.hexdigest()
+        return arquivo, sha
+
+    def _lembrar(self, arquivo, sha):
+        self._hashes[arquivo] = sha
+        self._arquivos.setdefault(sha, set()).add(arquivo)
+
+    def _esquecer(self, sha):
+        for arquivo in self._arquivos.pop(sha, ()):
+            self._hashes.pop(arquivo, None)
+
+    def obter(self, caminho, nome):
+        arquivo, sha = self._hash_arquivo(caminho)
+        chave = (sha, nome)
+        with self._lock:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self._lembrar(arquivo, sha)
+                return self._itens[chave]
+
+        parte = _codificar_anexo(caminho, nome)
+        with self._lock:
+            if chave not in self._itens and len(parte) <= self.limite_bytes:
+                self._itens[chave] = parte
+                self._tamanho += len(parte)
+                self._lembrar(arquivo, sha)
+                while self._tamanho > self.limite_bytes:
+                    (removido, _), removida = self._itens.popitem(last=False)
+                    self._tamanho -= len(removida)
+                    # O mesmo conteúdo pode continuar no cache com outro nome
+                    if not any(outro == removido for outro, _ in self._itens):
+                        self._esquecer(removido)
+        return parte
+
+
+def _codificar_anexo(caminho, nome):
+    tipo, _ = mimetypes.guess_type(nome)
+    principal, secundario = (tipo or 'application/octet-stream').split('/', 1)
+    parte = MIMEBase(principal, secundario)
+    with open(caminho, 'rb') as arquivo:
+        parte.set_payload(arquivo.read())
+    encoders.encode_base64(parte)
+    parte.add_header('Content-Disposition', 'attachment', filename=nome)
+    return preparar_para_smtp(parte.as_bytes(policy=_POLITICA))
+
+
+cache_anexos = CacheAnexos(TAMANHO_CACHE_ANEXOS)
+
+
+def eh_html(corpo):
+    return bool(corpo) and _MARCACAO_HTML.search(corpo) is not None
+
+
+class _ConversorTexto(HTMLParser):
+    BLOCOS = {'p', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'table', 'tr',
+              'blockquote', 'section', 'article', 'header', 'footer', 'hr', 'pre'}
+    IGNORADOS = {'script', 'style', 'head', 'title'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.partes = []
+        self._ignorando = 0
+        self._links = []
+
+    def handle_starttag(self, tag, atributos):
+        if tag in self.IGNORADOS:
+            self._ignorando += 1
+        elif tag in self.BLOCOS:
+            self.partes.append('\n\n')
+        elif tag == 'br':
+            self.partes.append('\n')
+        elif tag == 'li':
+            self.partes.append('\n- ')
+        elif tag in ('td', 'th'):
+            self.partes.append(' ')
+        elif tag == 'a':
+            self._links.append(dict(atributos).get('href'))
+
+    def handle_endtag(self, tag):
+        if tag in self.IGNORADOS:
+            self._ignorando = max(0, self._ignorando - 1)
+        elif tag in self.BLOCOS:
+            self.partes.append('\n\n')
+        elif tag == 'a' and self._links:
+            href = self._links.pop()
+            if href and not href.startswith(('#', 'mailto:')):
+                self.partes.append(f' ({href})')
+
+    def handle_data(self, dados):
+        if not self._ignorando:
+            self.partes.append(re.sub(r'\s+', ' ', dados))
+
+
+def html_para_texto(corpo):
+    """Versão em texto puro de um corpo HTML (parágrafos, quebras, listas e links)"""
+    conversor = _ConversorTexto()
+    conversor.feed(corpo)
+    conversor.close()
+    linhas = [linha.strip() for linha in ''.join(conversor.partes).split('\n')]
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(linhas)).strip() + '\n'
+
+
+def codificar_cabecalho(valor):
+    """
+    Valor de cabeçalho só com ASCII: texto com acentos vira encoded-words
+    em base64 (RFC 2047) de até 45 bytes, uma por linha dobrada, sem
+    partir caracteres UTF-8 ao meio. Bem mais rápido que email.header.Header.
+    """
+    if valor.isascii():
+        return valor
+    dados = valor.encode('utf-8')
+    palavras = []
+    inicio = 0
+    while inicio < len(dados):
+        fim = min(inicio + 45, len(dados))
+        # Não termina a palavra no meio de um caractere (bytes 10xxxxxx continuam o anterior)
+        while fim < len(dados) and 0x80 <= dados[fim] < 0xC0:
+            fim -= 1
+        palavras.append(f'=?utf-8?b?{base64.b64encode(dados[inicio:fim]).decode("ascii")}?=')
+        inicio = fim
+    return '\r\n '.join(palavras)
+
+
+def _parte_texto(texto, subtipo):
+    """
+    Parte text/<subtipo> em UTF-8 e base64, como MIMEText, sem passar pelo
+    gerador de email: linhas de 76 colunas em CRLF, que nunca começam com ponto.
+    """
+    return (
+        f'Content-Type: text/{subtipo}; charset="utf-8"\r\n'
+        f'Content-Transfer-Encoding: base64\r\n\r\n'
+    ).encode('ascii') + base64.encodebytes(texto.encode('utf-8')).replace(b'\n', b'\r\n')
+
+
+class ConstrutorMensagem:
+    """
+    Monta as mensagens de uma campanha. Criado uma vez por envio:
+
+        construtor = ConstrutorMensagem(remetente, assunto, corpo, anexos)
+        mensagem = construtor.montar('cliente@example.com')
+
+    `anexos` são caminhos ou pares (caminho, nome do anexo).
+    Um corpo com marcações HTML vai com a versão em texto puro
+    (multipart/alternative); `html` força a escolha.
+    """
+
+    def __init__(self, remetente, assunto, corpo, anexos, html=None):
+        self.remetente = remetente
+        self.assunto = assunto
+        self.html = eh_html(corpo) if html is None else html
+        # Evita a consulta de FQDN que make_msgid() faria a cada mensagem
+        self._dominio = remetente.rpartition('@')[2] or 'localhost'
+        self.fronteira = f'=============={uuid.uuid4().hex}=='
+        self._abertura = f'--{self.fronteira}\r\n'.encode('ascii')
+        self._fechamento = f'--{self.fronteira}--\r\n'.encode('ascii')
+        self._tipo_conteudo = f'Content-Type: multipart/mixed; boundary="{self.fronteira}"\r\n\r\n'.encode('ascii')
+        alternativa = f'=============={uuid.uuid4().hex}=='
+        self._alternativa = (
+            f'Content-Type: multipart/alternative; boundary="{alternativa}"\r\n\r\n--{alternativa}\r\n'.encode('ascii'),
+            f'--{alternativa}\r\n'.encode('ascii'),
+            f'--{alternativa}--\r\n'.encode('ascii'),
+        )
+
+        self._partes_fixas = []
+        for anexo in anexos:
+            caminho, nome = anexo if isinstance(anexo, tuple) else (anexo, os.path.basename(anexo))
+            if os.path.isfile(caminho):
+                self._partes_fixas += [self._abertura, cache_anexos.obter(caminho, nome)]
+        self._partes_fixas.append(self._fechamento)
+
+        fixo = Message()
+        fixo['From'] = self.remetente
+        fixo['MIME-Version'] = '1.0'
+        # as_bytes() termina com a linha em branco final
+        self._cabecalho_fixo = preparar_para_smtp(fixo.as_bytes(policy=_POLITICA)[:-2])
+
+        self._corpo = self._parte_corpo(corpo) if corpo is not None else None
+
+    def _parte_corpo(self, corpo, texto=None):
+        if not self.html:
+            return _parte_texto(corpo, 'plain')
+        abertura, separador, fechamento = self._alternativa
+        if texto is None:
+            texto = html_para_texto(corpo)
+        return b''.join([abertura, _parte_texto(texto, 'plain'), separador, _parte_texto(corpo, 'html'), fechamento])
+
+    def _cabecalho(self, destino, assunto):
+        # Só To, Subject, Date e Message-ID mudam a cada mensagem; o
+        # Content-Type multipart vai à parte (o gerador escreveria um corpo
+        # multipart vazio)
+        assunto = assunto.replace('\r', ' ').replace('\n', ' ')
+        # Quebras de linha no endereço injetariam cabeçalhos; o endereço em
+        # si não leva encoded-words (RFC 2047), vai em UTF-8 como está
+        destino = destino.replace('\r', '').replace('\n', '')
+        linhas = (
+            f'To: {destino}\r\n'
+            f'Subject: {codificar_cabecalho(assunto)}\r\n'
+            f'Date: {formatdate(localtime=True)}\r\n'
+            f'Message-ID: {make_msgid(domain=self._dominio)}\r\n'
+        )
+        return self._cabecalho_fixo + linhas.encode('utf-8') + self._tipo_conteudo
+
+    def montar(self, destino, assunto=None, corpo=None, texto=None):
+        """
+        Mensagem de um destinatário. `assunto` e `corpo` (e `texto`, a versão
+        em texto puro de um corpo HTML) substituem os da campanha quando
+        personalizados; os anexos são sempre compartilhados.
+        """
+        parte_corpo = self._parte_corpo(corpo, texto) if corpo is not None else self._corpo
+        return MensagemPreparada([
+            self._cabecalho(destino, assunto if assunto is not None else self.assunto),
+            self._abertura,
+            parte_corpo,
+            *self._partes_fixas
+        ])
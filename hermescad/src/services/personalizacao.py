@@ -0,0 +1,104 @@
+"""
+Personalização das campanhas com modelos Jinja2: "Olá, {{ nome }}!",
+"{% if cargo %}{{ cargo }} de {% endif %}{{ area_atuacao }}".
+
+Assunto e corpo são compilados uma vez por campanha num ambiente sandbox
+(o modelo é escrito pelo usuário: sem acesso a atributos internos nem a
+funções do Python). A versão em texto puro de um corpo HTML também vira um
+modelo, gerado uma vez a partir do HTML. Só as colunas de Cliente usadas
+pelos modelos são lidas, com um SELECT por lote de destinatários; modelos
+sem variáveis são renderizados uma única vez.
+"""
+from jinja2 import TemplateError, meta
+from jinja2.sandbox import ImmutableSandboxedEnvironment
+from sqlalchemy import select
+from src.models.user import db
+from src.models.cliente import Cliente
+from src.services.mensagens import eh_html, html_para_texto
+
+# Variáveis disponíveis nos modelos (colunas de Cliente)
+CAMPOS_MODELO = ('nome', 'email', 'cargo', 'area_atuacao', 'endereco', 'numero_celular',
+                 'numero_telefone', 'site', 'cpf_cnpj')
+
+
+class ModeloInvalido(ValueError):
+    """Erro de sintaxe ou variável desconhecida no modelo da campanha"""
+
+
+def _vazio_se_nulo(valor):
+    # Colunas nulas aparecem como texto vazio, não como "None"
+    return '' if valor is None else valor
+
+
+def _ambiente(autoescape):
+    return ImmutableSandboxedEnvironment(
+        autoescape=autoescape, finalize=_vazio_se_nulo, keep_trailing_newline=True
+    )
+
+
+# Valores dos clientes são escapados no corpo HTML, e só nele
+_ambiente_html = _ambiente(True)
+_ambiente_texto = _ambiente(False)
+
+
+class _Parte:
+    """Um modelo compilado, ou o texto pronto quando não há o que personalizar"""
+
+    def __init__(self, ambiente, fonte):
+        try:
+            arvore = ambiente.parse(fonte)
+            self.campos = meta.find_undeclared_variables(arvore)
+            desconhecidos = self.campos - set(CAMPOS_MODELO)
+            if desconhecidos:
+                raise ModeloInvalido(
+                    f'Variável desconhecida no modelo: {", ".join(sorted(desconhecidos))}. '
+                    f'Disponíveis: {", ".join(CAMPOS_MODELO)}'
+                )
+            modelo = ambiente.from_string(arvore)
+            # Confere o modelo uma vez, com todos os campos vazios
+            exemplo = modelo.render({campo: '' for campo in self.campos})
+        except TemplateError as e:
+            raise ModeloInvalido(f'Modelo inválido: {e}')
+        self._modelo = modelo if self.campos else None
+        self._texto = exemplo if not self.campos else None
+
+    def renderizar(self, dados):
+        return self._modelo.render(dados) if self._modelo is not None else self._texto
+
+
+class ModeloCampanha:
+    """
+    Assunto e corpo de uma campanha, compilados uma vez:
+
+        modelo = ModeloCampanha(assunto, corpo)
+        for dados in modelo.dados_clientes(ids).values():
+            assunto, corpo, texto = modelo.renderizar(dados)
+    """
+
+    def __init__(self, assunto, corpo, html=None):
+        self.html = eh_html(corpo) if html is None else html
+        ambiente = _ambiente_html if self.html else _ambiente_texto
+        self._assunto = _Parte(_ambiente_texto, assunto or '')
+        self._corpo = _Parte(ambiente, corpo or '')
+        self._texto = _Parte(_ambiente_texto, html_para_texto(corpo)) if self.html else None
+        partes = [self._assunto, self._corpo] + ([self._texto] if self._texto else [])
+        self.campos = tuple(campo for campo in CAMPOS_MODELO if any(campo in parte.campos for parte in partes))
+
+    @property
+    def personalizado(self):
+        return bool(self.campos)
+
+    def dados_clientes(self, cliente_ids):
+        """{cliente_id: {campo: valor}} com só as colunas usadas pelos modelos"""
+        if not self.campos or not cliente_ids:
+            return {}
+        colunas = [getattr(Cliente, campo) for campo in self.campos]
+        linhas = db.session.execute(select(Cliente.id, *colunas).where(Cliente.id.in_(cliente_ids)))
+        return {linha[0]: dict(zip(self.campos, linha[1:])) for linha in linhas}
+
+    def renderizar(self, dados):
+        """(assunto, corpo, texto) de um destinatário; texto é None para corpos sem HTML"""
+        # Quebras de linha no assunto abririam cabeçalhos novos
+        assunto = ' '.join(self._assunto.renderizar(dados).split())
+        texto = self._texto.renderizar(dados) if self._texto else None
+        return assunto, self._corpo.renderizar(dados), texto
@@ -0,0 +1,232 @@
+"""
+Segmentos de público: filtros salvos sobre os clientes, avaliados no banco.
+
+Os filtros são um objeto JSON; todas as condições informadas precisam ser
+atendidas:
+
+    {"area_atuacao": ["Construção", "Varejo"], "possui_whatsapp": true,
+     "possui_email": true, "data_cadastro_inicio": "2024-01-01",
+     "atividade_status": "Pendente", "atividade_desde": "2025-01-01"}
+
+As chaves atividade_* descrevem uma atividade do cliente (status, tipo,
+período); com "sem_atividade": true o segmento pega quem NÃO tem atividade
+assim.
+
+Um segmento materializado guarda os membros em segmento_membros. A
+atualização é incremental: só os clientes alterados (ou com atividades
+alteradas) desde calculado_em são reavaliados, e os excluídos saem pelos
+registros de exclusoes (utils/sincronizacao.py). Atividades transferidas
+deixam em exclusoes o cliente anterior, que também é reavaliado. A
+exclusão de atividades não diz de qual cliente elas eram; nesse caso
+segmentos com filtros de atividade são recalculados por inteiro, assim
+como segmentos calculados antes da retenção das exclusões. A atualização
+grava no banco: roda no comando atualizar-segmentos, no POST
+/segmentos/<id>/atualizar e antes de uma campanha. Campanhas percorrem os membros em
+blocos de ids (iterar_membros), sem montar listas enormes.
+"""
+import json
+from datetime import datetime
+from sqlalchemy import and_, delete, exists, func, insert, literal, or_, select, true, union
+from src.models.user import db
+from src.models.atividade import Atividade
+from src.models.cliente import Cliente
+from src.models.exclusao import Exclusao
+from src.models.segmento import SegmentoMembro
+from src.utils.paginacao import ParametroInvalido, ler_data
+from src.utils.sincronizacao import MARGEM_SINCRONIZACAO, RETENCAO_EXCLUSOES, TROCA_CLIENTE_ATIVIDADE
+
+FILTROS_CLIENTE = ('area_atuacao', 'possui_whatsapp', 'possui_email', 'possui_celular',
+                   'data_cadastro_inicio', 'data_cadastro_fim')
+FILTROS_ATIVIDADE = ('atividade_status', 'atividade_tipo', 'atividade_desde', 'atividade_ate', 'sem_atividade')
+FILTROS_BOOLEANOS = ('possui_whatsapp', 'possui_email', 'possui_celular', 'sem_atividade')
+FILTROS_DATA = ('data_cadastro_inicio', 'data_cadastro_fim', 'atividade_desde', 'atividade_ate')
+FILTROS_LISTA = ('area_atuacao', 'atividade_status', 'atividade_tipo')
+
+
+def ler_filtros(dados):
+    """Valida os filtros recebidos e devolve-os normalizados (listas e datas ISO)"""
+    if not isinstance(dados, dict):
+        raise ParametroInvalido('filtros deve ser um objeto JSON')
+    desconhecidos = set(dados) - set(FILTROS_CLIENTE) - set(FILTROS_ATIVIDADE)
+    if desconhecidos:
+        raise ParametroInvalido(f'Filtro desconhecido: {", ".join(sorted(desconhecidos))}')
+
+    filtros = {}
+    for nome, valor in dados.items():
+        if valor is None or valor == '' or valor == []:
+            continue
+        if nome in FILTROS_BOOLEANOS:
+            if not isinstance(valor, bool):
+                raise ParametroInvalido(f'{nome} deve ser true ou false')
+            filtros[nome] = valor
+        elif nome in FILTROS_DATA:
+            filtros[nome] = ler_data(str(valor), nome).isoformat()
+        elif nome in FILTROS_LISTA:
+            valores = valor if isinstance(valor, list) else [valor]
+            if not all(isinstance(item, str) and item for item in valores):
+                raise ParametroInvalido(f'{nome} deve ser um texto ou uma lista de textos')
+            filtros[nome] = sorted(set(valores))
+    return filtros
+
+
+def usa_atividades(filtros):
+    return any(nome in filtros for nome in FILTROS_ATIVIDADE)
+
+
+def condicao(filtros):
+    """Condição SQL sobre Cliente equivalente aos filtros (já normalizados)"""
+    condicoes = []
+    if 'area_atuacao' in filtros:
+        condicoes.append(Cliente.area_atuacao.in_(filtros['area_atuacao']))
+    if 'possui_whatsapp' in filtros:
+        condicoes.append(Cliente.possui_whatsapp.is_(True) if filtros['possui_whatsapp']
+                         else or_(Cliente.possui_whatsapp.is_(False), Cliente.possui_whatsapp.is_(None)))
+    for nome, coluna in (('possui_email', Cliente.email), ('possui_celular', Cliente.numero_celular)):
+        if nome in filtros:
+            preenchido = func.coalesce(coluna, '') != ''
+            condicoes.append(preenchido if filtros[nome] else ~preenchido)
+    if 'data_cadastro_inicio' in filtros:
+        condicoes.append(Cliente.data_cadastro >= datetime.fromisoformat(filtros['data_cadastro_inicio']))
+    if 'data_cadastro_fim' in filtros:
+        condicoes.append(Cliente.data_cadastro < datetime.fromisoformat(filtros['data_cadastro_fim']))
+
+    if usa_atividades(filtros):
+        atividade = [Atividade.cliente_id == Cliente.id]
+        if 'atividade_status' in filtros:
+            atividade.append(Atividade.status.in_(filtros['atividade_status']))
+        if 'atividade_tipo' in filtros:
+            atividade.append(Atividade.tipo.in_(filtros['atividade_tipo']))
+        if 'atividade_desde' in filtros:
+            atividade.append(Atividade.data_hora >= datetime.fromisoformat(filtros['atividade_desde']))
+        if 'atividade_ate' in filtros:
+            atividade.append(Atividade.data_hora < datetime.fromisoformat(filtros['atividade_ate']))
+        # EXISTS usa o índice (cliente_id, data_hora) de atividades
+        possui = exists().where(*atividade)
+        condicoes.append(~possui if filtros.get('sem_atividade') else possui)
+    return and_(true(), *condicoes)
+
+
+def consulta_ids(segmento):
+    """SELECT dos ids dos membros: da tabela materializada ou avaliando os filtros"""
+    if segmento.materializado:
+        return select(SegmentoMembro.cliente_id.label('id')).where(SegmentoMembro.segmento_id == segmento.id)
+    return select(Cliente.id).where(condicao(segmento.dicionario_filtros()))
+
+
+def contar(filtros):
+    return db.session.execute(select(func.count()).select_from(Cliente).where(condicao(filtros))).scalar()
+
+
+def _inserir_membros(segmento, filtros, *restricoes):
+    db.session.execute(insert(SegmentoMembro).from_select(
+        ['segmento_id', 'cliente_id'],
+        select(literal(segmento.id), Cliente.id).where(condicao(filtros), *restricoes)
+    ))
+
+
+def recalcular(segmento):
+    """Avaliação completa dos membros (e do total). Faz o commit."""
+    agora = datetime.utcnow()
+    filtros = segmento.dicionario_filtros()
+    if segmento.materializado:
+        db.session.execute(delete(SegmentoMembro).where(SegmentoMembro.segmento_id == segmento.id))
+        _inserir_membros(segmento, filtros)
+        segmento.total = db.session.execute(
+            select(func.count()).where(SegmentoMembro.segmento_id == segmento.id)
+        ).scalar()
+    else:
+        segmento.total = contar(filtros)
+    segmento.calculado_em = agora
+    db.session.commit()
+    return segmento
+
+
+def atualizar(segmento):
+    """
+    Traz os membros de um segmento materializado para o estado atual,
+    reavaliando só os clientes alterados desde a última atualização.
+    Segmentos não materializados apenas têm o total recontado. Faz o commit.
+    """
+    if not segmento.materializado or segmento.calculado_em is None:
+        return recalcular(segmento)
+    # Exclusões mais antigas que a retenção já foram apagadas
+    if segmento.calculado_em < datetime.utcnow() - RETENCAO_EXCLUSOES:
+        return recalcular(segmento)
+
+    filtros = segmento.dicionario_filtros()
+    # Mesma margem da sincronização: cobre transações que gravaram antes e fizeram commit depois
+    desde = segmento.calculado_em - MARGEM_SINCRONIZACAO
+    if usa_atividades(filtros) and db.session.execute(
+        select(exists().where(Exclusao.tabela == Atividade.__tablename__, Exclusao.excluido_em >= desde))
+    ).scalar():
+        return recalcular(segmento)
+
+    agora = datetime.utcnow()
+    alterados = [select(Cliente.id).where(Cliente.atualizado_em >= desde)]
+    if usa_atividades(filtros):
+        alterados.append(select(Atividade.cliente_id).where(Atividade.atualizado_em >= desde))
+        alterados.append(select(Exclusao.registro_id).where(
+            Exclusao.tabela == TROCA_CLIENTE_ATIVIDADE, Exclusao.excluido_em >= desde
+        ))
+    alterados = union(*alterados).subquery() if len(alterados) > 1 else alterados[0].subquery()
+    excluidos = select(Exclusao.registro_id).where(
+        Exclusao.tabela == Cliente.__tablename__, Exclusao.excluido_em >= desde
+    )
+
+    db.session.execute(delete(SegmentoMembro).where(
+        SegmentoMembro.segmento_id == segmento.id,
+        or_(SegmentoMembro.cliente_id.in_(select(alterados.c[0])), SegmentoMembro.cliente_id.in_(excluidos))
+    ))
+    _inserir_membros(segmento, filtros, Cliente.id.in_(select(alterados.c[0])))
+    segmento.total = db.session.execute(
+        select(func.count()).where(SegmentoMembro.segmento_id == segmento.id)
+    ).scalar()
+    segmento.calculado_em = agora
+    db.session.commit()
+    return segmento
+
+
+def iterar_membros(segmento, tamanho):
+    """
+    Ids dos membros em blocos de até `tamanho`, em ordem, por cursor
+    (keyset). Não faz commit: chame atualizar() antes para um segmento
+    materializado estar em dia.
+    """
+    consulta = consulta_ids(segmento).subquery()
+    ultimo = 0
+    while True:
+        bloco = db.session.execute(
+            select(consulta.c.id).where(consulta.c.id > ultimo).order_by(consulta.c.id).limit(tamanho)
+        ).scalars().all()
+        if not bloco:
+            return
+        yield bloco
+        ultimo = bloco[-1]
+
+
+def salvar(segmento, dados):
+    """Aplica nome, filtros e materializado recebidos e recalcula os membros"""
+    if 'nome' in dados:
+        nome = (dados['nome'] or '').strip()
+        if not nome:
+            raise ParametroInvalido('Nome do segmento é obrigatório')
+        segmento.nome = nome
+    if 'filtros' in dados:
+        segmento.filtros = json.dumps(ler_filtros(dados['filtros']), ensure_ascii=False, sort_keys=True)
+    if 'materializado' in dados:
+        if not isinstance(dados['materializado'], bool):
+            raise ParametroInvalido('materializado deve ser true ou false')
+        segmento.materializado = dados['materializado']
+        if not segmento.materializado and segmento.id is not None:
+            db.session.execute(delete(SegmentoMembro).where(SegmentoMembro.segmento_id == segmento.id))
+    if not segmento.nome:
+        raise ParametroInvalido('Nome do segmento é obrigatório')
+    db.session.add(segmento)
+    db.session.flush()
+    return recalcular(segmento)
+
+
+def excluir(segmento):
+    db.session.execute(delete(SegmentoMembro).where(SegmentoMembro.segmento_id == segmento.id))
+    db.session.delete(segmento)
+    db.session.commit()
@@ -0,0 +1,199 @@
+"""
+Servidor do feed /api/events para produção (vários workers do gunicorn).
+
+Uma conexão SSE aberta num worker WSGI prende uma thread enquanto o
+navegador estiver na página; aqui todas as conexões ficam num único loop
+asyncio. Os workers publicam os eventos em datagramas no socket Unix
+EVENTOS_SOCKET (ver services/eventos.py); este processo os numera, guarda
+o histórico para o Last-Event-ID e os repassa a cada navegador conectado.
+
+    EVENTOS_SOCKET=/run/hermescad/eventos.sock \\
+        python -m src.services.servidor_eventos --unix /run/hermescad/sse.sock
+
+O nginx encaminha /api/events para --unix (ou --host/--porta).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+from urllib.parse import parse_qs, urlsplit
+from src.services.eventos import (ESPERA_RECONEXAO_MS, INTERVALO_HEARTBEAT, EVENTOS_SOCKET,
+                                  HistoricoEventos, evento_reset)
+
+# Eventos pendentes por conexão; um navegador que não lê é desconectado
+TAMANHO_FILA_CONEXAO = 256
+TAMANHO_MAXIMO_CABECALHOS = 16 * 1024
+
+logger = logging.getLogger('hermescad.eventos')
+
+CABECALHOS_SSE = (
+    b'HTTP/1.1 200 OK\r\n'
+    b'Content-Type: text/event-stream; charset=utf-8\r\n'
+    b'Cache-Control: no-cache\r\n'
+    b'X-Accel-Buffering: no\r\n'
+    b'Connection: close\r\n\r\n'
+)
+
+
+def _resposta_erro(status, mensagem):
+    corpo = json.dumps({'error': mensagem}).encode('utf-8')
+    return (f'HTTP/1.1 {status}\r\nContent-Type: application/json\r\n'
+            f'Content-Length: {len(corpo)}\r\nConnection: close\r\n\r\n').encode('ascii') + corpo
+
+
+class Conexao:
+    """Fila de eventos de um navegador conectado"""
+
+    def __init__(self):
+        self.fila = asyncio.Queue(TAMANHO_FILA_CONEXAO)
+        self.encerrada = False
+
+    def enviar(self, evento):
+        try:
+            self.fila.put_nowait(evento)
+        except asyncio.QueueFull:
+            # Cliente lento: a conexão é encerrada e ele retoma pelo Last-Event-ID
+            self.encerrada = True
+
+
+class ServidorEventos:
+    def __init__(self):
+        self.historico = HistoricoEventos()
+        self.conexoes = set()
+
+    # Publicação (datagramas dos workers)
+
+    def receber(self, datagrama):
+        try:
+            mensagem = json.loads(datagrama)
+            tipo, dados = mensagem['tipo'], mensagem['dados']
+        except (ValueError, KeyError, TypeError):
+            logger.warning('Datagrama de evento inválido descartado')
+            return
+        evento = self.historico.adicionar(tipo, dados)
+        for conexao in list(self.conexoes):
+            conexao.enviar(evento)
+            if conexao.encerrada:
+                self.conexoes.discard(conexao)
+
+    # Conexões SSE
+
+    async def atender(self, leitor, escritor):
+        try:
+            cabecalho = await leitor.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            escritor.close()
+            return
+
+        linhas = cabecalho.decode('latin-1').split('\r\n')
+        partes = linhas[0].split(' ')
+        if len(partes) != 3 or partes[0] != 'GET':
+            escritor.write(_resposta_erro('405 Method Not Allowed', 'Use GET'))
+            await self._fechar(escritor)
+            return
+        cabecalhos = {}
+        for linha in linhas[1:]:
+            nome, _, valor = linha.partition(':')
+            cabecalhos[nome.strip().lower()] = valor.strip()
+        parametros = parse_qs(urlsplit(partes[1]).query)
+        ultimo_id = (cabecalhos.get('last-event-id')
+                     or parametros.get('last_event_id', [''])[0]
+                     or f'{self.historico.geracao}-{self.historico.sequencia}')
+
+        conexao = Conexao()
+        # Histórico e registro sem await no meio: nenhum evento fica de fora
+        pendentes = self.historico.desde(ultimo_id)
+        if len(pendentes) > TAMANHO_FILA_CONEXAO:
+            pendentes = [evento_reset(self.historico.geracao, self.historico.sequencia)]
+        for evento in pendentes:
+            conexao.enviar(evento)
+        self.conexoes.add(conexao)
+        try:
+            escritor.write(CABECALHOS_SSE + f'retry: {ESPERA_RECONEXAO_MS}\n\n'.encode('ascii'))
+            await escritor.drain()
+            while not conexao.encerrada:
+                try:
+                    evento = await asyncio.wait_for(conexao.fila.get(), INTERVALO_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    escritor.write(b': ping\n\n')
+                else:
+                    escritor.write(evento.formatar())
+                await escritor.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.conexoes.discard(conexao)
+            await self._fechar(escritor)
+
+    @staticmethod
+    async def _fechar(escritor):
+        escritor.close()
+        try:
+            await escritor.wait_closed()
+        except ConnectionError:
+            pass
+
+
+class _ProtocoloPublicacao(asyncio.DatagramProtocol):
+    def __init__(self, servidor):
+        self.servidor = servidor
+
+    def datagram_received(self, dados, endereco):
+        self.servidor.receber(dados)
+
+
+def _remover_socket(caminho):
+    if caminho and os.path.exists(caminho):
+        os.unlink(caminho)
+
+
+async def executar(socket_publicacao, unix=None, host='127.0.0.1', porta=5001):
+    loop = asyncio.get_running_loop()
+    servidor = ServidorEventos()
+
+    _remover_socket(socket_publicacao)
+    transporte, _ = await loop.create_datagram_endpoint(
+        lambda: _ProtocoloPublicacao(servidor), local_addr=socket_publicacao, family=socket.AF_UNIX
+    )
+    # Os workers do gunicorn rodam com outro usuário em algumas instalações
+    os.chmod(socket_publicacao, 0o660)
+
+    if unix:
+        _remover_socket(unix)
+        http = await asyncio.start_unix_server(servidor.atender, path=unix, limit=TAMANHO_MAXIMO_CABECALHOS)
+        os.chmod(unix, 0o660)
+        logger.info('Eventos: publicação em %s, SSE em %s', socket_publicacao, unix)
+    else:
+        http = await asyncio.start_server(servidor.atender, host, porta, limit=TAMANHO_MAXIMO_CABECALHOS)
+        logger.info('Eventos: publicação em %s, SSE em %s:%s', socket_publicacao, host, porta)
+
+    parar = asyncio.Event()
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sinal, parar.set)
+    async with http:
+        await parar.wait()
+    transporte.close()
+    _remover_socket(socket_publicacao)
+    _remover_socket(unix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor do feed de eventos (SSE) do HermesCad')
+    parser.add_argument('--socket-publicacao', default=EVENTOS_SOCKET,
+                        help='Socket Unix onde os workers publicam (padrão: EVENTOS_SOCKET)')
+    parser.add_argument('--unix', help='Atende o SSE neste socket Unix (em vez de --host/--porta)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=5001)
+    args = parser.parse_args()
+    if not args.socket_publicacao:
+        parser.error('informe --socket-publicacao ou defina EVENTOS_SOCKET')
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+    asyncio.run(executar(args.socket_publicacao, args.unix, args.host, args.porta))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+"""
+Entrega de e-mails por SMTP com várias conexões em paralelo.
+
+Cada conexão é reaproveitada por até `mensagens_por_conexao` envios e
+depois reaberta; um token bucket limita a taxa global de mensagens por
+segundo; respostas 4xx (transitórias) e quedas de conexão são tentadas de
+novo com backoff exponencial, e só a mensagem afetada falha.
+Mensagens são texto/bytes comuns ou MensagemPreparada (ver mensagens.py).
+"""
+import os
+import queue
+import random
+import smtplib
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from src.services.configuracoes import configuracoes
+from src.services.mensagens import MensagemPreparada
+
+# Valores usados quando as configurações do sistema não definem o servidor de e-mail
+SMTP_SERVER_PADRAO = os.getenv('SMTP_SERVER', '')
+SMTP_PORT_PADRAO = int(os.getenv('SMTP_PORT', '587'))
+EMAIL_USER_PADRAO = os.getenv('EMAIL_USER', '')
+EMAIL_PASSWORD_PADRAO = os.getenv('EMAIL_PASSWORD', '')
+EMAIL_FROM_PADRAO = os.getenv('EMAIL_FROM', EMAIL_USER_PADRAO)
+
+SMTP_TIMEOUT = int(os.getenv('SMTP_TIMEOUT', '30'))
+TENTATIVAS = 4
+BACKOFF_INICIAL = 1.0
+BACKOFF_MAXIMO = 30.0
+# Partes a partir deste tamanho são escritas no socket sem concatenação
+TAMANHO_MINIMO_ENVIO_DIRETO = 64 * 1024
+
+
+@dataclass
+class ConfiguracaoSMTP:
+    servidor: str
+    porta: int = 587
+    usuario: str = ''
+    senha: str = ''
+    usar_tls: bool = True
+    remetente: str = ''
+    max_conexoes: int = 4
+    mensagens_por_conexao: int = 100
+    taxa_por_segundo: float = 10.0
+    timeout: int = SMTP_TIMEOUT
+    tentativas: int = TENTATIVAS
+
+    @property
+    def configurado(self):
+        return bool(self.servidor and self.remetente)
+
+    @classmethod
+    def de_configuracoes(cls, config):
+        """Monta a configuração a partir das Configuracoes do sistema (ou das variáveis de ambiente)"""
+        if config is None or not config.email_server:
+            return cls(
+                servidor=SMTP_SERVER_PADRAO,
+                porta=SMTP_PORT_PADRAO,
+                usuario=EMAIL_USER_PADRAO,
+                senha=EMAIL_PASSWORD_PADRAO,
+                remetente=EMAIL_FROM_PADRAO
+            )
+        return cls(
+            servidor=config.email_server,
+            porta=config.email_port or 587,
+            usuario=config.email_user or '',
+            senha=config.email_password or '',
+            usar_tls=config.email_use_tls if config.email_use_tls is not None else True,
+            remetente=config.email_remetente or config.email_user or '',
+            max_conexoes=max(1, config.email_max_conexoes or 4),
+            mensagens_por_conexao=max(1, config.email_mensagens_por_conexao or 100),
+            taxa_por_segundo=config.email_taxa_por_segundo if config.email_taxa_por_segundo is not None else 10.0
+        )
+
+    @classmethod
+    def carregar(cls):
+        return cls.de_configuracoes(configuracoes.obter())
+
+
+class TokenBucket:
+    """Limita a taxa de eventos por segundo, permitindo rajadas de até `capacidade`"""
+
+    def __init__(self, taxa, capacidade=None):
+        self.taxa = taxa
+        self.capacidade = capacidade or max(1.0, taxa)
+        self._tokens = self.capacidade
+        self._atualizado = time.monotonic()
+        self._lock = threading.Lock()
+
+    def pausar(self, segundos):
+        """Nenhum evento nos próximos `segundos` (ex.: o servidor pediu para esperar)"""
+        if not self.taxa or self.taxa <= 0:
+            return
+        with self._lock:
+            agora = time.monotonic()
+            atual = min(self.capacidade, self._tokens + (agora - self._atualizado) * self.taxa)
+            self._tokens = min(atual, -segundos * self.taxa)
+            self._atualizado = agora
+
+    def aguardar(self):
+        if not self.taxa or self.taxa <= 0:
+            return
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._tokens = min(self.capacidade, self._tokens + (agora - self._atualizado) * self.taxa)
+                self._atualizado = agora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.taxa
+            time.sleep(espera)
+
+
+def erro_transitorio(erro):
+    """Indica se vale a pena tentar o envio de novo"""
+    if isinstance(erro, smtplib.SMTPRecipientsRefused):
+        return all(400 <= codigo < 500 for codigo, _ in erro.recipients.values())
+    if isinstance(erro, smtplib.SMTPResponseException):
+        return 400 <= erro.smtp_code < 500
+    return isinstance(erro, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, socket.timeout, ConnectionError))
+
+
+class _Conexao:
+
+    def __init__(self, config):
+        self.config = config
+        self.smtp = None
+        self.enviadas = 0
+
+    def _abrir(self):
+        smtp = smtplib.SMTP(self.config.servidor, self.config.porta, timeout=self.config.timeout)
+        try:
+            smtp.ehlo()
+            if self.config.usar_tls:
+                # Sem STARTTLS anunciado não segue em texto puro: a senha
+                # iria aberta para quem removeu a extensão do EHLO
+                if not smtp.has_extn('starttls'):
+                    raise smtplib.SMTPNotSupportedError('O servidor SMTP não oferece STARTTLS')
+                smtp.starttls()
+                smtp.ehlo()
+            if self.config.usuario and self.config.senha:
+                smtp.login(self.config.usuario, self.config.senha)
+            # Sem Nagle: cada comando espera a resposta, não há o que agrupar
+            smtp.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except BaseException:
+            smtp.close()
+            raise
+        self.smtp = smtp
+        self.enviadas = 0
+
+    def fechar(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+        self.smtp = None
+
+    def _enviar_partes(self, remetente, destino, partes):
+        """
+        Equivalente a sendmail() para uma MensagemPreparada: as partes já
+        estão em CRLF e com dot-stuffing, então são escritas no socket uma a
+        uma, sem montar a mensagem inteira nem percorrê-la de novo.
+        """
+        codigo, resposta = self.smtp.mail(remetente)
+        if codigo != 250:
+            raise smtplib.SMTPSenderRefused(codigo, resposta, remetente)
+        codigo, resposta = self.smtp.rcpt(destino)
+        if codigo not in (250, 251):
+            raise smtplib.SMTPRecipientsRefused({destino: (codigo, resposta)})
+        codigo, resposta = self.smtp.docmd('data')
+        if codigo != 354:
+            raise smtplib.SMTPDataError(codigo, resposta)
+        # Partes pequenas (cabeçalho, corpo, fronteiras) vão juntas num só
+        # write; anexos grandes e compartilhados são enviados sem cópia
+        pendentes = []
+        for parte in partes:
+            if len(parte) < TAMANHO_MINIMO_ENVIO_DIRETO:
+                pendentes.append(parte)
+                continue
+            if pendentes:
+                self.smtp.send(b''.join(pendentes))
+                pendentes = []
+            self.smtp.send(parte)
+        pendentes.append(b'.\r\n')
+        self.smtp.send(b''.join(pendentes))
+        codigo, resposta = self.smtp.getreply()
+        if codigo != 250:
+            raise smtplib.SMTPDataError(codigo, resposta)
+
+    def enviar(self, remetente, destino, mensagem):
+        if self.smtp is None or self.enviadas >= self.config.mensagens_por_conexao:
+            self.fechar()
+            self._abrir()
+        try:
+            if isinstance(mensagem, MensagemPreparada):
+                self._enviar_partes(remetente, destino, mensagem.partes)
+            else:
+                self.smtp.sendmail(remetente, destino, mensagem)
+        except (smtplib.SMTPServerDisconnected, OSError):
+            self.smtp = None
+            raise
+        except smtplib.SMTPException:
+            # Deixa a sessão pronta para a próxima mensagem
+            try:
+                self.smtp.rset()
+            except (smtplib.SMTPException, OSError):
+                self.smtp = None
+            raise
+        finally:
+            self.enviadas += 1
+
+
+class PoolSMTP:
+    """
+    Pool de até `max_conexoes` sessões SMTP. Use como context manager para
+    garantir que as conexões sejam fechadas:
+
+        with PoolSMTP(config) as pool:
+            erros = pool.enviar_lote([(destino, mensagem), ...])
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.limite = TokenBucket(config.taxa_por_segundo)
+        self._livres = queue.LifoQueue()
+        self._conexoes = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=config.max_conexoes, thread_name_prefix='smtp')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def _obter_conexao(self):
+        try:
+            return self._livres.get_nowait()
+        except queue.Empty:
+            conexao = _Conexao(self.config)
+            with self._lock:
+                self._conexoes.append(conexao)
+            return conexao
+
+    def enviar(self, destino, mensagem, remetente=None):
+        """Envia uma mensagem, tentando de novo em erros transitórios. Levanta o último erro."""
+        remetente = remetente or self.config.remetente
+        conexao = self._obter_conexao()
+        try:
+            for tentativa in range(self.config.tentativas):
+                self.limite.aguardar()
+                try:
+                    conexao.enviar(remetente, destino, mensagem)
+                    return
+                except Exception as e:
+                    if tentativa + 1 >= self.config.tentativas or not erro_transitorio(e):
+                        raise
+                    espera = min(BACKOFF_MAXIMO, BACKOFF_INICIAL * 2 ** tentativa)
+                    time.sleep(espera * random.uniform(0.5, 1.0))
+        finally:
+            self._livres.put(conexao)
+
+    def _enviar_capturando(self, item):
+        destino, mensagem = item
+        try:
+            self.enviar(destino, mensagem)
+            return None
+        except Exception as e:
+            return e
+
+    def enviar_lote(self, itens):
+        """
+        Envia [(destino, mensagem), ...] em paralelo. Retorna, na mesma
+        ordem, None para cada envio bem-sucedido ou a exceção do que falhou.
+        """
+        return list(self._executor.map(self._enviar_capturando, itens))
+
+    def fechar(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for conexao in self._conexoes:
+                conexao.fechar()
+            self._conexoes = []
@@ -0,0 +1,308 @@
+"""
+Entrega de mensagens WhatsApp por um provedor HTTP.
+
+O provedor padrão segue a API do WhatsApp Business (Cloud API): a imagem
+da campanha é enviada uma vez (POST /<numero_id>/media) e todas as
+mensagens usam o id devolvido; cada destinatário é uma requisição
+POST /<numero_id>/messages. O DespachoWhatsApp envia em paralelo por até
+`max_conexoes` conexões HTTP persistentes, limita a taxa de mensagens por
+segundo (um limite por provedor e número remetente, compartilhado pelas
+campanhas do processo) e tenta de novo respostas 429/5xx e quedas de
+conexão com backoff exponencial, respeitando o Retry-After (um 429 pausa
+todas as threads do número remetente).
+
+Outros provedores implementam ProvedorWhatsApp e entram em PROVEDORES.
+Para testar sem um provedor real, use tools/whatsapp_mock.py.
+"""
+import http.client
+import json
+import mimetypes
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+from src.services.smtp import BACKOFF_INICIAL, BACKOFF_MAXIMO, TENTATIVAS, TokenBucket
+
+WHATSAPP_PROVEDOR = os.getenv('WHATSAPP_PROVEDOR', 'business_api')
+WHATSAPP_API_URL = os.getenv('WHATSAPP_API_URL', '')
+WHATSAPP_TOKEN = os.getenv('WHATSAPP_TOKEN', '')
+WHATSAPP_NUMERO_ID = os.getenv('WHATSAPP_NUMERO_ID', '')
+WHATSAPP_CONEXOES = int(os.getenv('WHATSAPP_CONEXOES', '8'))
+WHATSAPP_TAXA = float(os.getenv('WHATSAPP_TAXA', '20'))
+WHATSAPP_TIMEOUT = int(os.getenv('WHATSAPP_TIMEOUT', '30'))
+# Código do país acrescentado aos números cadastrados sem DDI
+DDI_PADRAO = os.getenv('WHATSAPP_DDI_PADRAO', '55')
+
+
+def normalizar_e164(numero, ddi=DDI_PADRAO):
+    """
+    '+55 (11) 99999-9999', '(011) 99999-9999' ou '11999999999' -> '+5511999999999'.
+    Números sem DDI recebem `ddi`. Retorna None se o número não for válido.
+    """
+    if not numero:
+        return None
+    numero = numero.strip()
+    digitos = re.sub(r'\D', '', numero)
+    if not numero.startswith('+'):
+        if digitos.startswith('00'):
+            # Prefixo de discagem internacional
+            digitos = digitos[2:]
+        else:
+            # Zero do código de área (ex.: 011)
+            digitos = digitos.lstrip('0')
+            if len(digitos) <= 11:
+                if len(digitos) < 10:
+                    return None
+                digitos = ddi + digitos
+    if not 8 <= len(digitos) <= 15 or digitos.startswith('0'):
+        return None
+    return '+' + digitos
+
+
+@dataclass
+class ConfiguracaoWhatsApp:
+    url_api: str = WHATSAPP_API_URL
+    token: str = WHATSAPP_TOKEN
+    numero_id: str = WHATSAPP_NUMERO_ID
+    provedor: str = WHATSAPP_PROVEDOR
+    max_conexoes: int = WHATSAPP_CONEXOES
+    taxa_por_segundo: float = WHATSAPP_TAXA
+    timeout: int = WHATSAPP_TIMEOUT
+    tentativas: int = TENTATIVAS
+
+    @property
+    def configurado(self):
+        return bool(self.url_api and self.token and self.numero_id and self.provedor in PROVEDORES)
+
+    @classmethod
+    def carregar(cls):
+        return cls()
+
+
+class ErroProvedor(Exception):
+    """Resposta de erro do provedor (status None: sem resposta)"""
+
+    def __init__(self, mensagem, status=None, retry_after=None):
+        super().__init__(mensagem)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class ProvedorIndisponivel(ErroProvedor):
+    """O provedor recusou (429/5xx) todas as mensagens de um lote"""
+
+
+def _sobrecarga(erro):
+    return isinstance(erro, ErroProvedor) and erro.status is not None and (erro.status == 429 or erro.status >= 500)
+
+
+def erro_transitorio(erro):
+    """Indica se vale a pena tentar o envio de novo"""
+    if isinstance(erro, ErroProvedor):
+        return erro.status is None or _sobrecarga(erro)
+    return isinstance(erro, (http.client.HTTPException, ConnectionError, TimeoutError))
+
+
+def falha_de_conexao(erro):
+    """
+    Erros que impedem o envio a qualquer destinatário e interrompem a
+    campanha: provedor sem resposta, credenciais recusadas ou o lote
+    inteiro recusado. Um 429/5xx isolado (já tentado de novo) é falha só
+    daquele destinatário.
+    """
+    if isinstance(erro, ProvedorIndisponivel):
+        return True
+    if isinstance(erro, ErroProvedor):
+        return erro.status is None or erro.status in (401, 403)
+    return isinstance(erro, (http.client.HTTPException, OSError))
+
+
+class ProvedorWhatsApp(ABC):
+    """
+    Interface dos provedores. As implementações são usadas por várias
+    threads ao mesmo tempo; sem algum dos métodos abstratos a falha vem ao
+    instanciar, não no meio de uma campanha.
+    """
+
+    def __init__(self, config):
+        self.config = config
+
+    @abstractmethod
+    def enviar_midia(self, caminho, nome=None):
+        """Envia o arquivo ao provedor e retorna o id usado nas mensagens; `nome` define o tipo"""
+
+    @abstractmethod
+    def enviar_mensagem(self, destino, texto, midia_id=None):
+        """Envia a mensagem ao número E.164 `destino` e retorna o id dela no provedor"""
+
+    def fechar(self):
+        pass
+
+
+class ProvedorBusinessAPI(ProvedorWhatsApp):
+    """WhatsApp Business (Cloud API) ou compatível, com uma conexão persistente por thread"""
+
+    def __init__(self, config):
+        super().__init__(config)
+        url = urlsplit(config.url_api)
+        self._classe = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        self._endereco = url.netloc
+        self._base = f'{url.path.rstrip("/")}/{config.numero_id}'
+        self._local = threading.local()
+        self._conexoes = []
+        self._lock = threading.Lock()
+
+    def _conexao(self):
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            conexao = self._classe(self._endereco, timeout=self.config.timeout)
+            self._local.conexao = conexao
+            with self._lock:
+                self._conexoes.append(conexao)
+        return conexao
+
+    def _requisitar(self, caminho, corpo, tipo):
+        conexao = self._conexao()
+        cabecalhos = {'Authorization': f'Bearer {self.config.token}', 'Content-Type': tipo}
+        try:
+            conexao.request('POST', f'{self._base}/{caminho}', body=corpo, headers=cabecalhos)
+            resposta = conexao.getresponse()
+            dados = resposta.read()
+        except (http.client.HTTPException, OSError):
+            # A próxima requisição desta thread abre uma conexão nova
+            conexao.close()
+            raise
+        if resposta.status >= 400:
+            try:
+                mensagem = json.loads(dados)['error']['message']
+            except (ValueError, KeyError, TypeError):
+                mensagem = dados.decode('utf-8', 'replace')[:200] or resposta.reason
+            retry_after = resposta.getheader('Retry-After')
+            raise ErroProvedor(f'{resposta.status}: {mensagem}', resposta.status,
+                               float(retry_after) if retry_after and retry_after.isdigit() else None)
+        return json.loads(dados)
+
+    def enviar_midia(self, caminho, nome=None):
+        nome = (nome or os.path.basename(caminho)).replace('"', '')
+        tipo = mimetypes.guess_type(nome)[0] or 'application/octet-stream'
+        fronteira = uuid.uuid4().hex
+        with open(caminho, 'rb') as arquivo:
+            conteudo = arquivo.read()
+        corpo = b''.join([
+            f'--{fronteira}\r\nContent-Disposition: form-data; name="messaging_product"\r\n\r\nwhatsapp\r\n'.encode(),
+            f'--{fronteira}\r\nContent-Disposition: form-data; name="type"\r\n\r\n{tipo}\r\n'.encode(),
+            f'--{fronteira}\r\nContent-Disposition: form-data; name="file"; filename="{nome}"\r\n'
+            f'Content-Type: {tipo}\r\n\r\n'.encode(),
+            conteudo,
+            f'\r\n--{fronteira}--\r\n'.encode(),
+        ])
+        return self._requisitar('media', corpo, f'multipart/form-data; boundary={fronteira}')['id']
+
+    def enviar_mensagem(self, destino, texto, midia_id=None):
+        mensagem = {'messaging_product': 'whatsapp', 'recipient_type': 'individual', 'to': destino.lstrip('+')}
+        if midia_id:
+            mensagem.update(type='image', image={'id': midia_id, 'caption': texto})
+        else:
+            mensagem.update(type='text', text={'body': texto, 'preview_url': False})
+        corpo = json.dumps(mensagem, ensure_ascii=False).encode('utf-8')
+        return self._requisitar('messages', corpo, 'application/json')['messages'][0]['id']
+
+    def fechar(self):
+        with self._lock:
+            for conexao in self._conexoes:
+                conexao.close()
+            self._conexoes = []
+
+
+PROVEDORES = {'business_api': ProvedorBusinessAPI}
+
+# Um limite de taxa por provedor e número remetente, comum às campanhas do processo
+_limites = {}
+_limites_lock = threading.Lock()
+
+
+def _limite_de(config):
+    chave = (config.provedor, config.url_api, config.numero_id)
+    with _limites_lock:
+        limite = _limites.get(chave)
+        if limite is None or limite.taxa != config.taxa_por_segundo:
+            limite = _limites[chave] = TokenBucket(config.taxa_por_segundo)
+        return limite
+
+
+class DespachoWhatsApp:
+    """
+    Envio em paralelo pelo provedor configurado. Use como context manager
+    para garantir que as conexões sejam fechadas:
+
+        with DespachoWhatsApp(config) as despacho:
+            midia_id = despacho.enviar_midia(caminho)
+            resultados = despacho.enviar_lote([(destino, texto, midia_id), ...])
+    """
+
+    def __init__(self, config, provedor=None):
+        self.config = config
+        self.provedor = provedor or PROVEDORES[config.provedor](config)
+        self.limite = _limite_de(config)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, config.max_conexoes), thread_name_prefix='whatsapp')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def _com_tentativas(self, funcao, *args):
+        for tentativa in range(self.config.tentativas):
+            try:
+                return funcao(*args)
+            except Exception as e:
+                if tentativa + 1 >= self.config.tentativas or not erro_transitorio(e):
+                    raise
+                espera = getattr(e, 'retry_after', None)
+                if espera is None:
+                    espera = BACKOFF_INICIAL * 2 ** tentativa * random.uniform(0.5, 1.0)
+                espera = min(BACKOFF_MAXIMO, espera)
+                if getattr(e, 'status', None) == 429:
+                    # O limite é do número remetente: as outras threads também esperam
+                    self.limite.pausar(espera)
+                time.sleep(espera)
+
+    def enviar_midia(self, caminho, nome=None):
+        return self._com_tentativas(self.provedor.enviar_midia, caminho, nome)
+
+    def enviar(self, destino, texto, midia_id=None):
+        """Envia uma mensagem e retorna o id dela no provedor. Levanta o último erro."""
+        def enviar_limitado():
+            self.limite.aguardar()
+            return self.provedor.enviar_mensagem(destino, texto, midia_id)
+        return self._com_tentativas(enviar_limitado)
+
+    def _enviar_capturando(self, item):
+        try:
+            return self.enviar(*item)
+        except Exception as e:
+            return e
+
+    def enviar_lote(self, itens):
+        """
+        Envia [(destino, texto, midia_id), ...] em paralelo. Retorna, na
+        mesma ordem, o id da mensagem no provedor ou a exceção do envio que
+        falhou. Se o provedor recusou o lote inteiro com 429/5xx, os erros
+        viram ProvedorIndisponivel (a campanha para em vez de marcar todos
+        como falha).
+        """
+        resultados = list(self._executor.map(self._enviar_capturando, itens))
+        if resultados and all(_sobrecarga(resultado) for resultado in resultados):
+            resultados = [ProvedorIndisponivel(str(erro), erro.status, erro.retry_after) for erro in resultados]
+        return resultados
+
+    def fechar(self):
+        self._executor.shutdown(wait=True)
+        self.provedor.fechar()
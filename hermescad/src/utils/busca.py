@@ -0,0 +1,120 @@
+import re
+from sqlalchemy import inspect, text
+
+# Índice FTS5 dos clientes. O tokenizador unicode61 com remove_diacritics
+# faz "Joao" encontrar "João"; documentos e telefones são indexados também
+# só com dígitos para que "11987654321" encontre "(11) 98765-4321".
+TABELA_FTS = 'clientes_fts'
+COLUNAS_FTS = ('nome', 'email', 'area_atuacao', 'cargo', 'cpf_cnpj', 'endereco', 'telefones')
+
+# Pesos do bm25 na mesma ordem de COLUNAS_FTS
+PESOS_FTS = (10.0, 6.0, 2.0, 2.0, 6.0, 1.0, 4.0)
+
+LIMITE_BUSCA_PADRAO = 20
+LIMITE_BUSCA_MAXIMO = 100
+
+
+def _somente_digitos(expressao):
+    for caractere in (' ', '.', '-', '/', '(', ')', '+'):
+        expressao = f"replace({expressao}, '{caractere}', '')"
+    return expressao
+
+
+def _valores(prefixo):
+    """Expressões SQL com os valores indexados de um registro (new/old/clientes)"""
+    def coluna(nome):
+        return f"coalesce({prefixo}.{nome}, '')"
+    return (
+        coluna('nome'),
+        coluna('email'),
+        coluna('area_atuacao'),
+        coluna('cargo'),
+        f"{coluna('cpf_cnpj')} || ' ' || {_somente_digitos(coluna('cpf_cnpj'))}",
+        coluna('endereco'),
+        f"{coluna('numero_telefone')} || ' ' || {coluna('numero_celular')} || ' ' || "
+        f"{_somente_digitos(coluna('numero_telefone'))} || ' ' || {_somente_digitos(coluna('numero_celular'))}",
+    )
+
+
+def _inserir(prefixo):
+    return (
+        f"INSERT INTO {TABELA_FTS}(rowid, {', '.join(COLUNAS_FTS)}) "
+        f"VALUES ({prefixo}.id, {', '.join(_valores(prefixo))});"
+    )
+
+
+def busca_disponivel(engine):
+    return engine.dialect.name == 'sqlite'
+
+
+def garantir_indice_busca(db):
+    """
+    Cria a tabela FTS5 e os gatilhos que a mantêm sincronizada com
+    `clientes` a cada INSERT/UPDATE/DELETE. Se a tabela ainda não existia,
+    indexa os clientes já cadastrados.
+    """
+    engine = db.engine
+    if not busca_disponivel(engine):
+        return
+
+    existia = inspect(engine).has_table(TABELA_FTS)
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_FTS} USING fts5("
+            f"{', '.join(COLUNAS_FTS)}, tokenize = 'unicode61 remove_diacritics 2')"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_ai AFTER INSERT ON clientes BEGIN "
+            f"{_inserir('new')} END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_ad AFTER DELETE ON clientes BEGIN "
+            f"DELETE FROM {TABELA_FTS} WHERE rowid = old.id; END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_au AFTER UPDATE ON clientes BEGIN "
+            f"DELETE FROM {TABELA_FTS} WHERE rowid = old.id; {_inserir('new')} END"
+        ))
+
+    if not existia:
+        reconstruir_indice_busca(db)
+
+
+def reconstruir_indice_busca(db):
+    """Reindexa todos os clientes (para bancos antigos ou índice corrompido)"""
+    with db.engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM {TABELA_FTS}"))
+        conn.execute(text(
+            f"INSERT INTO {TABELA_FTS}(rowid, {', '.join(COLUNAS_FTS)}) "
+            f"SELECT clientes.id, {', '.join(_valores('clientes'))} FROM clientes"
+        ))
+        conn.execute(text(f"INSERT INTO {TABELA_FTS}({TABELA_FTS}) VALUES ('optimize')"))
+        return conn.execute(text(f"SELECT count(*) FROM {TABELA_FTS}")).scalar()
+
+
+def montar_consulta_fts(termo):
+    """
+    Converte o texto digitado em uma expressão MATCH: cada palavra vira um
+    prefixo entre aspas ("joa"*), combinadas com AND. Retorna None se não
+    houver palavras.
+    """
+    palavras = re.findall(r'\w+', termo)
+    if not palavras:
+        return None
+    return ' '.join(f'"{palavra}"*' for palavra in palavras)
+
+
+def buscar_ids_clientes(db, termo, limite):
+    """Retorna os ids dos clientes que casam com `termo`, do mais relevante ao menos"""
+    consulta = montar_consulta_fts(termo)
+    if consulta is None:
+        return []
+    pesos = ', '.join(str(peso) for peso in PESOS_FTS)
+    linhas = db.session.execute(
+        text(
+            f"SELECT rowid FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH :consulta "
+            f"ORDER BY bm25({TABELA_FTS}, {pesos}) LIMIT :limite"
+        ),
+        {'consulta': consulta, 'limite': limite}
+    )
+    return [linha[0] for linha in linhas]
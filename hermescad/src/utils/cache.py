@@ -0,0 +1,38 @@
+import threading
+import time
+
+
+class CacheTemporario:
+    """
+    Cache em memória com validade curta (TTL), por processo.
+
+    Cada worker mantém sua própria cópia: a invalidação explícita vale para
+    o processo que recebeu a escrita e os demais expiram pelo TTL.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._valores = {}
+        self._geracao = 0
+        self._lock = threading.Lock()
+
+    def obter(self, chave, calcular):
+        """Retorna o valor em cache ou calcula e armazena um novo"""
+        agora = time.monotonic()
+        with self._lock:
+            item = self._valores.get(chave)
+            if item and item[0] > agora:
+                return item[1]
+            geracao = self._geracao
+
+        valor = calcular()
+        with self._lock:
+            # Não guarda um valor calculado antes de uma invalidação concorrente
+            if geracao == self._geracao:
+                self._valores[chave] = (agora + self.ttl, valor)
+        return valor
+
+    def invalidar(self):
+        with self._lock:
+            self._geracao += 1
+            self._valores.clear()
@@ -0,0 +1,35 @@
+import hashlib
+from functools import wraps
+from flask import make_response, request
+from src.utils.contadores import ler_versoes
+
+
+def com_etag(*contadores):
+    """
+    Decorador de rotas GET: o ETag é derivado das versões dos contadores
+    informados (ex.: 'clientes') e da URL. Se o cliente envia o mesmo ETag
+    em If-None-Match, responde 304 sem executar a rota.
+
+    As versões são lidas antes da consulta da rota: se o dado mudar no
+    meio, o ETag enviado fica velho e a próxima requisição recebe 200.
+    """
+    def decorador(rota):
+        @wraps(rota)
+        def envolvida(*args, **kwargs):
+            versoes = ler_versoes(contadores)
+            chave = f'{versoes}|{request.full_path}|{request.headers.get("Accept", "")}'
+            etag = hashlib.sha1(chave.encode('utf-8')).hexdigest()[:20]
+
+            if request.if_none_match.contains_weak(etag):
+                resposta = make_response('', 304)
+            else:
+                resposta = make_response(rota(*args, **kwargs))
+                if resposta.status_code != 200:
+                    return resposta
+            # Fraco: o corpo pode ir comprimido ou não
+            resposta.set_etag(etag, weak=True)
+            resposta.headers['Cache-Control'] = 'no-cache'
+            resposta.vary.add('Accept')
+            return resposta
+        return envolvida
+    return decorador
@@ -0,0 +1,64 @@
+"""
+Campos parciais (?fields=id,nome,email) e serialização direta de tuplas.
+
+A projeção vai para o SELECT: só as colunas pedidas são lidas do banco e
+as linhas chegam como tuplas, sem montar objetos do ORM nem passar pelo
+identity map. Sem ?fields=, a projeção tem todas as colunas e produz o
+mesmo dicionário que Modelo.to_dict().
+"""
+from datetime import date, datetime
+from src.utils.paginacao import ParametroInvalido
+
+
+def _isoformat(valor):
+    return valor.isoformat() if valor is not None else None
+
+
+class Projecao:
+    """Colunas de um modelo escolhidas para a resposta"""
+
+    def __init__(self, modelo, nomes):
+        tabela = modelo.__table__
+        self.nomes = tuple(nomes)
+        self.colunas = [tabela.c[nome] for nome in self.nomes]
+        # Só datas precisam de conversão; as demais colunas vão como vieram do banco
+        self._conversoes = [
+            (indice, _isoformat) for indice, coluna in enumerate(self.colunas)
+            if coluna.type.python_type in (datetime, date)
+        ]
+
+    def aplicar(self, query, *extras):
+        """
+        Troca as entidades da consulta pelas colunas da projeção. `extras`
+        são colunas lidas mas não devolvidas (ex.: as da ordenação, usadas
+        no cursor da paginação).
+        """
+        return query.with_entities(*self.colunas, *[coluna for coluna in extras if coluna.key not in self.nomes])
+
+    def serializar(self, linha):
+        # zip para nas colunas da projeção e ignora as extras no fim da linha
+        registro = dict(zip(self.nomes, linha))
+        for indice, converter in self._conversoes:
+            nome = self.nomes[indice]
+            registro[nome] = converter(registro[nome])
+        return registro
+
+
+def ler_campos(args, modelo):
+    """
+    Lê ?fields= (nomes separados por vírgula) e valida contra as colunas
+    do modelo. Sem o parâmetro, devolve a projeção com todas as colunas.
+    """
+    disponiveis = [coluna.name for coluna in modelo.__table__.columns]
+    valor = (args.get('fields') or '').strip()
+    if not valor:
+        return Projecao(modelo, disponiveis)
+
+    nomes = []
+    for nome in valor.split(','):
+        nome = nome.strip()
+        if nome not in disponiveis:
+            raise ParametroInvalido(f'Campo inválido: {nome}. Use: {", ".join(disponiveis)}')
+        if nome not in nomes:
+            nomes.append(nome)
+    return Projecao(modelo, nomes)
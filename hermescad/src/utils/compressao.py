@@ -0,0 +1,64 @@
+import zlib
+from flask import request
+
+# Respostas menores que isso não compensam o custo de comprimir
+TAMANHO_MINIMO_COMPRESSAO = 1024
+NIVEL_GZIP = 6
+
+MIMETYPES_COMPRIMIVEIS = frozenset({
+    'application/json', 'application/x-ndjson', 'application/javascript', 'image/svg+xml',
+    'text/csv', 'text/css', 'text/html', 'text/javascript', 'text/plain',
+})
+
+
+def aceita_gzip():
+    return 'gzip' in request.accept_encodings
+
+
+def comprimir_blocos(blocos, sincronizar=False):
+    """
+    Comprime um iterável de bytes em gzip à medida que é consumido. Com
+    `sincronizar`, cada bloco é enviado assim que comprimido (NDJSON e
+    streams que o cliente lê aos poucos).
+    """
+    compressor = zlib.compressobj(NIVEL_GZIP, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    try:
+        for bloco in blocos:
+            if isinstance(bloco, str):
+                bloco = bloco.encode('utf-8')
+            dados = compressor.compress(bloco)
+            if sincronizar:
+                dados += compressor.flush(zlib.Z_SYNC_FLUSH)
+            if dados:
+                yield dados
+        yield compressor.flush()
+    finally:
+        if hasattr(blocos, 'close'):
+            blocos.close()
+
+
+def comprimir_resposta(resposta):
+    """
+    after_request: comprime em gzip respostas de texto/JSON acima de
+    TAMANHO_MINIMO_COMPRESSAO (e as enviadas em streaming) quando o
+    cliente aceita. Arquivos (send_file) e respostas já codificadas ficam
+    como estão.
+    """
+    if (resposta.mimetype not in MIMETYPES_COMPRIMIVEIS or resposta.status_code != 200
+            or 'Content-Encoding' in resposta.headers or resposta.direct_passthrough):
+        return resposta
+
+    resposta.vary.add('Accept-Encoding')
+    if request.method == 'HEAD' or not aceita_gzip():
+        return resposta
+
+    if resposta.is_streamed:
+        resposta.response = comprimir_blocos(resposta.response, sincronizar=True)
+        resposta.headers.pop('Content-Length', None)
+    else:
+        dados = resposta.get_data()
+        if len(dados) < TAMANHO_MINIMO_COMPRESSAO:
+            return resposta
+        resposta.set_data(zlib.compress(dados, NIVEL_GZIP, 16 + zlib.MAX_WBITS))
+    resposta.headers['Content-Encoding'] = 'gzip'
+    return resposta
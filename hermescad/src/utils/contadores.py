@@ -0,0 +1,74 @@
+import itertools
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+from src.models.user import db
+from src.models.contador_alteracao import ContadorAlteracao
+
+_tabela = ContadorAlteracao.__table__
+
+# Tabelas cuja versão é incrementada automaticamente a cada commit que as altera
+TABELAS_VERSIONADAS = frozenset({'clientes', 'atividades', 'produtos'})
+
+
+def ler_versao(nome):
+    """Versão atual do contador (0 se nunca foi incrementado)"""
+    return db.session.execute(select(_tabela.c.versao).where(_tabela.c.nome == nome)).scalar() or 0
+
+
+def ler_versoes(nomes):
+    """Versões de vários contadores em uma consulta, na ordem de `nomes`"""
+    versoes = dict(db.session.execute(select(_tabela.c.nome, _tabela.c.versao).where(_tabela.c.nome.in_(nomes))).all())
+    return tuple(versoes.get(nome, 0) for nome in nomes)
+
+
+def incrementar_versao(nome, sessao=None):
+    """Incrementa o contador na transação corrente; o commit fica com quem chamou"""
+    sessao = sessao or db.session
+    resultado = sessao.execute(
+        update(_tabela).where(_tabela.c.nome == nome).values(versao=_tabela.c.versao + 1)
+    )
+    if resultado.rowcount == 0:
+        sessao.execute(insert(_tabela).values(nome=nome, versao=1))
+
+
+def _alteradas(sessao):
+    return sessao.info.setdefault('tabelas_alteradas', set())
+
+
+def _ao_gravar_objetos(sessao, contexto):
+    for objeto in itertools.chain(sessao.new, sessao.dirty, sessao.deleted):
+        tabela = getattr(objeto, '__tablename__', None)
+        if tabela in TABELAS_VERSIONADAS:
+            _alteradas(sessao).add(tabela)
+
+
+def _ao_executar(estado):
+    # INSERT/UPDATE/DELETE em massa (executemany) não passam pelo flush
+    if estado.is_insert or estado.is_update or estado.is_delete:
+        tabela = getattr(estado.statement.table, 'name', None)
+        if tabela in TABELAS_VERSIONADAS:
+            _alteradas(estado.session).add(tabela)
+
+
+def _antes_do_commit(sessao):
+    sessao.flush()
+    for nome in sorted(sessao.info.pop('tabelas_alteradas', ())):
+        incrementar_versao(nome, sessao)
+
+
+def _descartar(sessao, *args):
+    sessao.info.pop('tabelas_alteradas', None)
+
+
+def registrar_versionamento():
+    """
+    Incrementa, na mesma transação do commit, o contador de cada tabela
+    de TABELAS_VERSIONADAS alterada pela sessão, seja pelo ORM ou por
+    insert()/update()/delete() executados com session.execute().
+    """
+    if event.contains(Session, 'before_commit', _antes_do_commit):
+        return
+    event.listen(Session, 'after_flush', _ao_gravar_objetos)
+    event.listen(Session, 'do_orm_execute', _ao_executar)
+    event.listen(Session, 'before_commit', _antes_do_commit)
+    event.listen(Session, 'after_rollback', _descartar)
@@ -0,0 +1,87 @@
+from sqlalchemy import delete, insert, inspect, select, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from src.models.versao_esquema import VersaoEsquema
+from src.utils.busca import garantir_indice_busca
+from src.utils.sincronizacao import garantir_registro_exclusoes, preencher_atualizado_em
+
+# Incrementar sempre que modelos, índices ou a busca textual mudarem
+VERSAO_ESQUEMA = 10
+
+
+def _indices_existentes(conn, inspector, tabela):
+    if conn.dialect.name == 'sqlite':
+        # O inspector não reflete índices de expressão (ex.: lower(email)) no SQLite
+        return set(conn.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :tabela"), {'tabela': tabela}
+        ).scalars())
+    return {indice['name'] for indice in inspector.get_indexes(tabela)}
+
+
+def atualizar_esquema(db):
+    """
+    Cria as tabelas que faltam e acrescenta colunas e índices novos às
+    tabelas já existentes (db.create_all() não altera tabelas existentes,
+    então bancos app.db antigos ficariam sem os índices dos modelos).
+    Retorna a lista das alterações feitas.
+    """
+    tabelas_antes = set(inspect(db.engine).get_table_names())
+    db.create_all()
+    alteracoes = [f'tabela {tabela.name}' for tabela in db.metadata.sorted_tables if tabela.name not in tabelas_antes]
+
+    engine = db.engine
+    preparer = engine.dialect.identifier_preparer
+    inspector = inspect(engine)
+
+    with engine.begin() as conn:
+        for tabela in db.metadata.sorted_tables:
+            existentes = {coluna['name'] for coluna in inspector.get_columns(tabela.name)}
+            for coluna in tabela.columns:
+                if coluna.name in existentes or coluna.primary_key:
+                    continue
+                tipo = coluna.type.compile(dialect=engine.dialect)
+                conn.execute(text(
+                    f'ALTER TABLE {preparer.format_table(tabela)} '
+                    f'ADD COLUMN {preparer.format_column(coluna)} {tipo}'
+                ))
+                alteracoes.append(f'coluna {tabela.name}.{coluna.name}')
+
+            indices = _indices_existentes(conn, inspector, tabela.name)
+            for indice in tabela.indexes:
+                if indice.name not in indices:
+                    indice.create(conn)
+                    alteracoes.append(f'índice {indice.name}')
+
+    return alteracoes
+
+
+def versao_instalada(db):
+    """Versão gravada no banco, ou None se ele nunca foi migrado"""
+    try:
+        with db.engine.connect() as conn:
+            return conn.execute(
+                select(VersaoEsquema.versao).order_by(VersaoEsquema.id.desc()).limit(1)
+            ).scalar()
+    except (OperationalError, ProgrammingError):
+        # Tabela versao_esquema ainda não existe
+        return None
+
+
+def migrar(db, forcar=False):
+    """
+    Aplica o esquema (tabelas, colunas, índices, busca textual, gatilhos
+    de exclusão e atualizado_em das linhas antigas) se a versão gravada no
+    banco for diferente de VERSAO_ESQUEMA, ou sempre com `forcar`. Retorna
+    a lista das alterações feitas.
+    """
+    if not forcar and versao_instalada(db) == VERSAO_ESQUEMA:
+        return []
+    alteracoes = atualizar_esquema(db)
+    garantir_indice_busca(db)
+    garantir_registro_exclusoes(db)
+    preenchidas = preencher_atualizado_em(db)
+    if preenchidas:
+        alteracoes.append(f'atualizado_em preenchido em {preenchidas} linha(s)')
+    with db.engine.begin() as conn:
+        conn.execute(delete(VersaoEsquema))
+        conn.execute(insert(VersaoEsquema).values(versao=VERSAO_ESQUEMA))
+    return alteracoes
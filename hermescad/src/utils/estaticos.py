@@ -0,0 +1,71 @@
+import mimetypes
+import os
+import re
+from flask import abort, request, send_from_directory
+
+# Arquivos gerados pelo Vite com hash do conteúdo no nome (assets/index-3f9a1c2b.js)
+PADRAO_HASH = re.compile(r'^assets/.+-[A-Za-z0-9_-]{8,}\.[a-z0-9]+$')
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+
+# Variantes pré-comprimidas no build, em ordem de preferência
+VARIANTES = (('br', '.br'), ('gzip', '.gz'))
+
+
+class ArquivosEstaticos:
+    """
+    Serve o build do frontend a partir de um índice em memória dos
+    arquivos, em vez de consultar o disco a cada requisição. O índice é
+    refeito quando um caminho não é encontrado e a pasta mudou (novo build).
+    """
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self._arquivos = frozenset()
+        self._assinatura = None
+
+    def _assinatura_atual(self):
+        assinatura = []
+        for pasta in (self.pasta, os.path.join(self.pasta, 'assets')):
+            try:
+                assinatura.append(os.stat(pasta).st_mtime_ns)
+            except OSError:
+                assinatura.append(None)
+        return tuple(assinatura)
+
+    def _indexar(self):
+        self._assinatura = self._assinatura_atual()
+        arquivos = set()
+        for raiz, _, nomes in os.walk(self.pasta):
+            relativa = os.path.relpath(raiz, self.pasta)
+            for nome in nomes:
+                caminho = nome if relativa == '.' else os.path.join(relativa, nome)
+                arquivos.add(caminho.replace(os.sep, '/'))
+        self._arquivos = frozenset(arquivos)
+
+    def existe(self, caminho):
+        if caminho in self._arquivos:
+            return True
+        if self._assinatura != self._assinatura_atual():
+            self._indexar()
+        return caminho in self._arquivos
+
+    def servir(self, caminho):
+        """Arquivo pedido, ou index.html para as rotas do frontend (SPA)"""
+        if not caminho or not self.existe(caminho):
+            caminho = 'index.html'
+            if not self.existe(caminho):
+                abort(404, 'index.html not found')
+
+        arquivo, codificacao = caminho, None
+        for nome, extensao in VARIANTES:
+            if nome in request.accept_encodings and self.existe(caminho + extensao):
+                arquivo, codificacao = caminho + extensao, nome
+                break
+
+        resposta = send_from_directory(self.pasta, arquivo, mimetype=mimetypes.guess_type(caminho)[0])
+        if codificacao:
+            resposta.headers['Content-Encoding'] = codificacao
+        resposta.vary.add('Accept-Encoding')
+        # index.html sempre revalidado; assets com hash nunca mudam
+        resposta.headers['Cache-Control'] = CACHE_IMUTAVEL if PADRAO_HASH.match(caminho) else 'no-cache'
+        return resposta
@@ -0,0 +1,176 @@
+"""
+Instrumentação por requisição: latência, tamanho da resposta e número e
+tempo das instruções SQL (eventos do engine), registrados em
+utils/metricas.py.
+
+Opcionalmente:
+- LOG_REQUISICOES_LENTAS_MS: requisições mais lentas que isso são
+  registradas no log 'hermescad.requisicoes_lentas' com as instruções
+  SQL mais demoradas;
+- PERFIL_HABILITADO=1: requisições com o cabeçalho X-Profile são
+  amostradas (pilha da thread a cada PERFIL_INTERVALO_MS) e as pilhas, no
+  formato "collapsed" dos flame graphs, gravadas em PERFIL_DIR; o nome do
+  arquivo volta no cabeçalho X-Profile-File.
+"""
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from src.utils import metricas
+
+REQUISICAO_LENTA_MS = float(os.getenv('LOG_REQUISICOES_LENTAS_MS', '0'))
+INSTRUCOES_NO_LOG = 5
+
+PERFIL_HABILITADO = os.getenv('PERFIL_HABILITADO', '').lower() in ('1', 'true', 'sim')
+PERFIL_DIR = os.getenv('PERFIL_DIR', os.path.join(tempfile.gettempdir(), 'hermescad-perfis'))
+PERFIL_INTERVALO = float(os.getenv('PERFIL_INTERVALO_MS', '5')) / 1000
+CABECALHO_PERFIL = 'X-Profile'
+
+logger_lentas = logging.getLogger('hermescad.requisicoes_lentas')
+
+
+class AmostradorPerfil:
+    """Amostra periodicamente a pilha de uma thread (perfil por amostragem)"""
+
+    def __init__(self, id_thread, intervalo=PERFIL_INTERVALO):
+        self.id_thread = id_thread
+        self.intervalo = intervalo
+        self.pilhas = Counter()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, name='perfil', daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            quadro = sys._current_frames().get(self.id_thread)
+            if quadro is None:
+                continue
+            pilha = []
+            while quadro is not None:
+                codigo = quadro.f_code
+                pilha.append(f'{os.path.basename(codigo.co_filename)}:{codigo.co_name}')
+                quadro = quadro.f_back
+            self.pilhas[';'.join(reversed(pilha))] += 1
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+
+    def gravar(self, caminho):
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            for pilha, amostras in self.pilhas.most_common():
+                arquivo.write(f'{pilha} {amostras}\n')
+
+
+class MedicaoRequisicao:
+
+    __slots__ = ('inicio', 'consultas', 'tempo_sql', 'instrucoes', 'amostrador', 'arquivo_perfil')
+
+    def __init__(self, registrar_instrucoes):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tempo_sql = 0.0
+        self.instrucoes = [] if registrar_instrucoes else None
+        self.amostrador = None
+        self.arquivo_perfil = None
+
+
+def _medicao_atual():
+    if has_request_context():
+        return g.get('_medicao')
+    return None
+
+
+def _antes_da_instrucao(conexao, cursor, instrucao, parametros, contexto, executemany):
+    # No contexto da execução, não na conexão: uma instrução que falha não
+    # chega ao after_cursor_execute e não deixa início pendente no pool
+    if contexto is not None:
+        contexto._inicio_instrucao = time.perf_counter()
+
+
+def _depois_da_instrucao(conexao, cursor, instrucao, parametros, contexto, executemany):
+    inicio = getattr(contexto, '_inicio_instrucao', None)
+    if inicio is None:
+        return
+    duracao = time.perf_counter() - inicio
+    medicao = _medicao_atual()
+    if medicao is None:
+        return
+    medicao.consultas += 1
+    medicao.tempo_sql += duracao
+    if medicao.instrucoes is not None:
+        medicao.instrucoes.append((duracao, instrucao))
+
+
+def _iniciar_medicao():
+    medicao = g._medicao = MedicaoRequisicao(registrar_instrucoes=REQUISICAO_LENTA_MS > 0)
+    if PERFIL_HABILITADO and CABECALHO_PERFIL in request.headers:
+        medicao.amostrador = AmostradorPerfil(threading.get_ident()).iniciar()
+
+
+def _registrar_lenta(medicao, descricao, duracao):
+    instrucoes = sorted(medicao.instrucoes or [], key=lambda item: item[0], reverse=True)[:INSTRUCOES_NO_LOG]
+    linhas = [
+        f'{descricao} levou {duracao * 1000:.0f} ms: {medicao.consultas} instruções SQL '
+        f'em {medicao.tempo_sql * 1000:.0f} ms'
+    ]
+    linhas += [f'  {tempo * 1000:8.1f} ms  {" ".join(instrucao.split())[:500]}' for tempo, instrucao in instrucoes]
+    logger_lentas.warning('\n'.join(linhas))
+
+
+def _finalizar(medicao, endpoint, descricao, metodo, status, tamanho):
+    # Chamado quando a resposta termina de ser enviada (inclusive streaming)
+    duracao = time.perf_counter() - medicao.inicio
+    metricas.requisicoes.inc(endpoint=endpoint, metodo=metodo, status=status)
+    metricas.duracao_requisicao.observar(duracao, endpoint=endpoint)
+    metricas.consultas_requisicao.observar(medicao.consultas, endpoint=endpoint)
+    metricas.duracao_sql.observar(medicao.tempo_sql, endpoint=endpoint)
+    if tamanho is not None:
+        metricas.tamanho_resposta.observar(tamanho, endpoint=endpoint)
+
+    if medicao.amostrador is not None:
+        medicao.amostrador.parar()
+        medicao.amostrador.gravar(os.path.join(PERFIL_DIR, medicao.arquivo_perfil))
+    if REQUISICAO_LENTA_MS and duracao * 1000 >= REQUISICAO_LENTA_MS:
+        _registrar_lenta(medicao, descricao, duracao)
+
+
+def _concluir_medicao(resposta):
+    medicao = g.pop('_medicao', None)
+    if medicao is None:
+        return resposta
+    endpoint = request.endpoint or 'nenhum'
+    descricao = f'{request.method} {request.full_path.rstrip("?")} ({endpoint})'
+
+    if medicao.amostrador is not None:
+        os.makedirs(PERFIL_DIR, exist_ok=True)
+        medicao.arquivo_perfil = f'perfil-{datetime.now():%Y%m%d-%H%M%S-%f}-{endpoint}.txt'
+        resposta.headers['X-Profile-File'] = medicao.arquivo_perfil
+
+    # Respostas em streaming só terminam depois do after_request: o registro
+    # fica para o fechamento da resposta
+    metodo, status = request.method, resposta.status_code
+    tamanho = None if resposta.is_streamed else resposta.calculate_content_length()
+    resposta.call_on_close(lambda: _finalizar(medicao, endpoint, descricao, metodo, status, tamanho))
+    return resposta
+
+
+def instrumentar(app, engine):
+    """
+    Liga a instrumentação ao app e ao engine. Deve ser chamada antes de
+    registrar outros after_request (ex.: compressão), para medir o
+    tamanho final da resposta.
+    """
+    event.listen(engine, 'before_cursor_execute', _antes_da_instrucao)
+    event.listen(engine, 'after_cursor_execute', _depois_da_instrucao)
+    app.before_request(_iniciar_medicao)
+    app.after_request(_concluir_medicao)
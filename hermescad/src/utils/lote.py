@@ -0,0 +1,206 @@
+from datetime import datetime
+from sqlalchemy import Boolean, DateTime, Float, Integer, String, bindparam, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.utils.sinais import avisar_alteracao
+
+# Máximo de operações (create + update + delete) por requisição
+MAXIMO_ITENS_LOTE = 5000
+TAMANHO_BLOCO_IDS = 500
+
+OPERACOES = ('create', 'update', 'delete')
+
+
+class ItemInvalido(ValueError):
+    """Item do lote com dados inválidos"""
+
+
+def _converter(coluna, valor):
+    """Converte um valor JSON para o tipo da coluna, como fazem as rotas de item único"""
+    if valor is None:
+        if not coluna.nullable:
+            raise ItemInvalido(f'{coluna.name} é obrigatório')
+        return None
+    tipo = coluna.type
+    if isinstance(tipo, Boolean):
+        if not isinstance(valor, bool):
+            raise ItemInvalido(f'{coluna.name} deve ser true ou false')
+        return valor
+    if isinstance(tipo, Integer):
+        if isinstance(valor, bool):
+            raise ItemInvalido(f'{coluna.name} deve ser um número inteiro')
+        try:
+            return int(valor)
+        except (TypeError, ValueError):
+            raise ItemInvalido(f'{coluna.name} deve ser um número inteiro')
+    if isinstance(tipo, Float):
+        try:
+            return float(valor)
+        except (TypeError, ValueError):
+            raise ItemInvalido(f'{coluna.name} deve ser um número')
+    if isinstance(tipo, DateTime):
+        try:
+            return datetime.fromisoformat(valor)
+        except (TypeError, ValueError):
+            raise ItemInvalido('Formato de data inválido')
+    if isinstance(tipo, String):
+        valor = str(valor)
+        if tipo.length and len(valor) > tipo.length:
+            raise ItemInvalido(f'{coluna.name} excede {tipo.length} caracteres')
+    return valor
+
+
+def _validar(tabela, item, campos, novo):
+    if not isinstance(item, dict):
+        raise ItemInvalido('Item deve ser um objeto')
+    valores = {campo: _converter(tabela.c[campo], item[campo]) for campo in campos if campo in item}
+    if novo:
+        for campo in campos:
+            coluna = tabela.c[campo]
+            if campo not in valores and not coluna.nullable and coluna.default is None:
+                raise ItemInvalido(f'{campo} é obrigatório')
+    return valores
+
+
+def _ler_id(item):
+    id = item.get('id') if isinstance(item, dict) else item
+    if not isinstance(id, int) or isinstance(id, bool):
+        raise ItemInvalido('id inválido')
+    return id
+
+
+def _em_blocos(ids):
+    ids = list(ids)
+    for inicio in range(0, len(ids), TAMANHO_BLOCO_IDS):
+        yield ids[inicio:inicio + TAMANHO_BLOCO_IDS]
+
+
+def _agrupar_por_colunas(itens):
+    """
+    executemany exige as mesmas colunas em todos os parâmetros; itens com
+    campos diferentes vão em grupos separados (os defaults do modelo
+    continuam valendo para as colunas ausentes).
+    """
+    grupos = {}
+    for indice, valores in itens:
+        grupos.setdefault(tuple(sorted(valores)), []).append((indice, valores))
+    return grupos.values()
+
+
+def executar_lote(modelo, entidade, dados, campos):
+    """
+    Aplica um lote {"create": [{...}], "update": [{"id": 1, ...}],
+    "delete": [2, 3]} em uma única transação, com um INSERT/UPDATE
+    (executemany) por conjunto de colunas e DELETE ... IN por bloco de ids.
+    Tudo é validado antes da escrita: se algum item for inválido, nada é
+    gravado e a resposta (400) traz o erro de cada item. Retorna
+    (resposta, status_http).
+    """
+    if not isinstance(dados, dict) or not any(dados.get(op) for op in OPERACOES):
+        return {'error': 'Informe ao menos uma lista em create, update ou delete'}, 400
+    if any(not isinstance(dados.get(op, []), list) for op in OPERACOES):
+        return {'error': 'create, update e delete devem ser listas'}, 400
+    if sum(len(dados.get(op, [])) for op in OPERACOES) > MAXIMO_ITENS_LOTE:
+        return {'error': f'O lote excede {MAXIMO_ITENS_LOTE} itens'}, 400
+
+    tabela = modelo.__table__
+    resultados = {op: [] for op in OPERACOES}
+    criar, atualizar, excluir = [], [], []
+    com_erro = 0
+
+    def registrar(op, indice, funcao):
+        nonlocal com_erro
+        try:
+            return funcao()
+        except ItemInvalido as e:
+            resultados[op].append({'index': indice, 'error': str(e)})
+            com_erro += 1
+
+    for indice, item in enumerate(dados.get('create', [])):
+        valores = registrar('create', indice, lambda: _validar(tabela, item, campos, novo=True))
+        if valores is not None:
+            criar.append((indice, valores))
+
+    vistos = set()
+    for indice, item in enumerate(dados.get('update', [])):
+        def ler():
+            id = _ler_id(item)
+            if id in vistos:
+                raise ItemInvalido('id repetido no lote')
+            vistos.add(id)
+            return id, _validar(tabela, item, campos, novo=False)
+        lido = registrar('update', indice, ler)
+        if lido is not None:
+            atualizar.append((indice, *lido))
+
+    for indice, item in enumerate(dados.get('delete', [])):
+        def ler():
+            id = _ler_id(item)
+            if id in vistos:
+                raise ItemInvalido('id repetido no lote')
+            vistos.add(id)
+            return id
+        id = registrar('delete', indice, ler)
+        if id is not None:
+            excluir.append((indice, id))
+
+    existentes = set()
+    for bloco in _em_blocos(vistos):
+        existentes.update(db.session.execute(select(tabela.c.id).where(tabela.c.id.in_(bloco))).scalars())
+    for op, itens in (('update', atualizar), ('delete', excluir)):
+        for indice, id, *_ in itens:
+            if id not in existentes:
+                resultados[op].append({'index': indice, 'id': id, 'error': 'Registro não encontrado'})
+                com_erro += 1
+
+    if com_erro:
+        for op in OPERACOES:
+            resultados[op].sort(key=lambda resultado: resultado['index'])
+        return {'error': f'Lote rejeitado: {com_erro} item(ns) inválido(s)', **resultados}, 400
+
+    ids_criados = {}
+    try:
+        for grupo in _agrupar_por_colunas(criar):
+            ids = db.session.execute(
+                insert(tabela).returning(tabela.c.id, sort_by_parameter_order=True),
+                [valores for _, valores in grupo]
+            ).scalars().all()
+            ids_criados.update(zip((indice for indice, _ in grupo), ids))
+
+        alteracoes = [(indice, {'_id': id, **valores}) for indice, id, valores in atualizar if valores]
+        for grupo in _agrupar_por_colunas(alteracoes):
+            db.session.execute(
+                update(tabela).where(tabela.c.id == bindparam('_id')),
+                [valores for _, valores in grupo]
+            )
+
+        for bloco in _em_blocos(id for _, id in excluir):
+            db.session.execute(delete(tabela).where(tabela.c.id.in_(bloco)))
+
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        return {'error': str(e.orig)}, 409
+    except Exception as e:
+        db.session.rollback()
+        return {'error': str(e)}, 400
+
+    # Registros gravados, para o frontend atualizar a lista sem buscá-la de novo
+    alterados = list(ids_criados.values()) + [id for _, id, _ in atualizar]
+    registros = {}
+    for bloco in _em_blocos(alterados):
+        registros.update({registro.id: registro.to_dict() for registro in modelo.query.filter(modelo.id.in_(bloco))})
+
+    resultados['create'] = [
+        {'index': indice, 'id': ids_criados[indice], 'item': registros.get(ids_criados[indice])}
+        for indice, _ in criar
+    ]
+    resultados['update'] = [{'index': indice, 'id': id, 'item': registros.get(id)} for indice, id, _ in atualizar]
+    resultados['delete'] = [{'index': indice, 'id': id} for indice, id in excluir]
+
+    for acao, ids in (('create', list(ids_criados.values())),
+                      ('update', [id for _, id, _ in atualizar]),
+                      ('delete', [id for _, id in excluir])):
+        if ids:
+            avisar_alteracao(entidade, acao=acao, ids=ids)
+    return resultados, 200
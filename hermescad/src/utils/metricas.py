@@ -0,0 +1,132 @@
+"""
+Métricas do processo em formato texto do Prometheus, sem dependências.
+
+Cada worker do gunicorn tem os seus contadores; o /metrics de um worker
+mostra apenas as requisições atendidas por ele (o Prometheus soma as
+séries se cada worker for exposto como alvo, ou use um único worker com
+threads).
+"""
+import os
+import threading
+from bisect import bisect_left
+
+BUCKETS_DURACAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+BUCKETS_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+PREFIXO = 'hermescad_'
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _rotulos(nomes, valores):
+    if not nomes:
+        return ''
+    return '{' + ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)) + '}'
+
+
+class Contador:
+    tipo = 'counter'
+
+    def __init__(self, nome, descricao, rotulos=()):
+        self.nome = PREFIXO + nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, valor=1, **rotulos):
+        chave = tuple(rotulos[nome] for nome in self.rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def exportar(self):
+        with self._lock:
+            valores = sorted(self._valores.items())
+        for chave, valor in valores:
+            yield f'{self.nome}{_rotulos(self.rotulos, chave)} {valor}'
+
+
+class Histograma:
+    tipo = 'histogram'
+
+    def __init__(self, nome, descricao, rotulos=(), buckets=BUCKETS_DURACAO):
+        self.nome = PREFIXO + nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, **rotulos):
+        chave = tuple(rotulos[nome] for nome in self.rotulos)
+        indice = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                # contagens por bucket (o último é +Inf), soma
+                serie = self._series[chave] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][indice] += 1
+            serie[1] += valor
+
+    def exportar(self):
+        with self._lock:
+            series = sorted((chave, (list(contagens), soma)) for chave, (contagens, soma) in self._series.items())
+        nomes = self.rotulos + ('le',)
+        for chave, (contagens, soma) in series:
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + ('+Inf',), contagens):
+                acumulado += contagem
+                yield f'{self.nome}_bucket{_rotulos(nomes, chave + (limite,))} {acumulado}'
+            yield f'{self.nome}_sum{_rotulos(self.rotulos, chave)} {soma}'
+            yield f'{self.nome}_count{_rotulos(self.rotulos, chave)} {acumulado}'
+
+
+class Registro:
+
+    def __init__(self):
+        self._metricas = []
+
+    def registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def exportar(self):
+        linhas = []
+        for metrica in self._metricas:
+            linhas.append(f'# HELP {metrica.nome} {metrica.descricao}')
+            linhas.append(f'# TYPE {metrica.nome} {metrica.tipo}')
+            linhas.extend(metrica.exportar())
+        linhas.extend(_metricas_processo())
+        return '\n'.join(linhas) + '\n'
+
+
+def _metricas_processo():
+    try:
+        with open('/proc/self/statm') as arquivo:
+            residente = int(arquivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return []
+    return [
+        '# HELP process_resident_memory_bytes Memória residente do processo',
+        '# TYPE process_resident_memory_bytes gauge',
+        f'process_resident_memory_bytes {residente}',
+    ]
+
+
+registro = Registro()
+
+requisicoes = registro.registrar(Contador(
+    'http_requisicoes_total', 'Requisições atendidas', ('endpoint', 'metodo', 'status')))
+duracao_requisicao = registro.registrar(Histograma(
+    'http_duracao_segundos', 'Duração das requisições, até o fim do envio da resposta', ('endpoint',)))
+tamanho_resposta = registro.registrar(Histograma(
+    'http_resposta_bytes', 'Tamanho das respostas com tamanho conhecido', ('endpoint',), BUCKETS_BYTES))
+consultas_requisicao = registro.registrar(Histograma(
+    'sql_consultas_por_requisicao', 'Instruções SQL executadas por requisição', ('endpoint',), BUCKETS_CONSULTAS))
+duracao_sql = registro.registrar(Histograma(
+    'sql_duracao_por_requisicao_segundos', 'Tempo gasto em SQL por requisição', ('endpoint',)))
+mensagens_campanha = registro.registrar(Contador(
+    'campanha_mensagens_total', 'Mensagens de campanhas processadas', ('canal', 'resultado')))
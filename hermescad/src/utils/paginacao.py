@@ -0,0 +1,128 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+
+# Limites de página para as rotas de listagem
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 500
+
+VALORES_VERDADEIROS = ('1', 'true', 'sim', 'yes', 'on')
+VALORES_FALSOS = ('0', 'false', 'nao', 'não', 'no', 'off')
+
+
+class ParametroInvalido(ValueError):
+    """Parâmetro de consulta inválido (a rota responde 400)"""
+
+
+def ler_bool(valor, nome):
+    """Converte um parâmetro de consulta em booleano"""
+    valor = valor.strip().lower()
+    if valor in VALORES_VERDADEIROS:
+        return True
+    if valor in VALORES_FALSOS:
+        return False
+    raise ParametroInvalido(f'Valor inválido para {nome}: {valor}')
+
+
+def ler_data(valor, nome):
+    """Converte um parâmetro de consulta ISO 8601 em datetime"""
+    try:
+        return datetime.fromisoformat(valor)
+    except ValueError:
+        raise ParametroInvalido(f'Formato de data inválido para {nome}')
+
+
+def ler_inteiro(valor, nome):
+    try:
+        return int(valor)
+    except ValueError:
+        raise ParametroInvalido(f'Valor inválido para {nome}: {valor}')
+
+
+def pagina_solicitada(args):
+    """Indica se a requisição pediu paginação (limit ou cursor)"""
+    return 'limit' in args or 'cursor' in args
+
+
+def ler_limite(args):
+    limite = ler_inteiro(args.get('limit', str(LIMITE_PADRAO)), 'limit')
+    if limite < 1:
+        raise ParametroInvalido('limit deve ser maior que zero')
+    return min(limite, LIMITE_MAXIMO)
+
+
+def ler_ordenacao(args, ordenacoes, padrao):
+    """
+    Lê o parâmetro ``sort`` (ex.: ``nome`` ou ``-nome``) e valida contra
+    as chaves permitidas. Retorna (chave, coluna, descendente).
+    """
+    valor = args.get('sort', padrao)
+    descendente = valor.startswith('-')
+    chave = valor.lstrip('-')
+    if chave not in ordenacoes:
+        permitidas = ', '.join(sorted(ordenacoes))
+        raise ParametroInvalido(f'Ordenação inválida: {chave}. Use uma de: {permitidas}')
+    return chave, ordenacoes[chave], descendente
+
+
+def _colunas_ordenacao(coluna, chave_primaria):
+    if coluna is chave_primaria:
+        return [chave_primaria]
+    return [coluna, chave_primaria]
+
+
+def ordenar(query, coluna, descendente, chave_primaria):
+    colunas = _colunas_ordenacao(coluna, chave_primaria)
+    return query.order_by(*[c.desc() if descendente else c.asc() for c in colunas])
+
+
+def codificar_cursor(chave, valores):
+    valores = [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+    dados = json.dumps({'s': chave, 'v': valores}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(dados).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor, chave, colunas):
+    try:
+        dados = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if dados['s'] != chave or len(dados['v']) != len(colunas):
+            raise ValueError
+        valores = []
+        for coluna, valor in zip(colunas, dados['v']):
+            if coluna.type.python_type is datetime:
+                valor = datetime.fromisoformat(valor)
+            valores.append(valor)
+        return valores
+    except (ValueError, KeyError, TypeError):
+        raise ParametroInvalido('Cursor inválido')
+
+
+def paginar(query, args, chave, coluna, descendente, chave_primaria):
+    """
+    Aplica paginação por cursor (keyset) à consulta já filtrada.
+
+    A posição é dada pelos valores (coluna de ordenação, id) do último
+    registro da página anterior, de modo que o banco percorre o índice a
+    partir desse ponto em vez de pular linhas com OFFSET.
+    Retorna (registros, proximo_cursor).
+    """
+    limite = ler_limite(args)
+    colunas = _colunas_ordenacao(coluna, chave_primaria)
+
+    cursor = args.get('cursor')
+    if cursor:
+        valores = decodificar_cursor(cursor, chave, colunas)
+        posicao = tuple_(*colunas) if len(colunas) > 1 else colunas[0]
+        limite_inferior = tuple_(*valores) if len(valores) > 1 else valores[0]
+        query = query.filter(posicao < limite_inferior if descendente else posicao > limite_inferior)
+
+    registros = ordenar(query, coluna, descendente, chave_primaria).limit(limite + 1).all()
+
+    proximo_cursor = None
+    if len(registros) > limite:
+        registros = registros[:limite]
+        ultimo = registros[-1]
+        proximo_cursor = codificar_cursor(chave, [getattr(ultimo, c.key) for c in colunas])
+
+    return registros, proximo_cursor
@@ -0,0 +1,24 @@
+import logging
+from blinker import Namespace
+
+logger = logging.getLogger(__name__)
+
+_sinais = Namespace()
+
+# Enviado (com avisar_alteracao) depois de cada commit que cria, altera ou remove
+# registros. sender: nome da entidade ('cliente', 'atividade', 'produto');
+# argumentos: acao ('create', 'update' ou 'delete') e ids (lista de ids).
+entidade_alterada = _sinais.signal('entidade-alterada')
+
+
+def avisar_alteracao(entidade, acao, ids):
+    """
+    Envia entidade_alterada depois do commit. A falha de um assinante
+    (invalidação de cache, feed de eventos) vai para o log e não impede os
+    demais nem chega a quem gravou: os dados já estão no banco.
+    """
+    for receptor in entidade_alterada.receivers_for(entidade):
+        try:
+            receptor(entidade, acao=acao, ids=ids)
+        except Exception:
+            logger.exception('Falha ao avisar %s de %s em %s', getattr(receptor, '__name__', receptor), acao, entidade)
@@ -0,0 +1,183 @@
+"""
+Sincronização incremental das listagens (?updated_since=<token>).
+
+Cada linha de clientes, atividades e produtos guarda atualizado_em; as
+exclusões ficam na tabela exclusoes, preenchida por gatilhos no banco. A
+listagem comum devolve o token no cabeçalho X-Sync-Token; com
+?updated_since=<token> a resposta traz só as linhas alteradas e os ids
+excluídos desde então, e um novo token:
+
+    {"items": [...], "deleted": [3, 17], "sync_token": "..."}
+
+O cliente aplica primeiro as exclusões e depois as linhas. A consulta
+volta MARGEM_SINCRONIZACAO segundos antes do token para cobrir transações
+que gravaram atualizado_em antes do token mas só fizeram commit depois;
+algumas linhas podem vir repetidas, nunca faltar. Tokens mais velhos que a
+retenção das exclusões recebem 410 (o cliente recarrega a lista inteira).
+
+A mesma tabela guarda, com tabela = TROCA_CLIENTE_ATIVIDADE, o cliente
+anterior de cada atividade transferida para outro cliente: a atividade não
+foi excluída, mas o cliente antigo a perdeu (services/segmentos.py).
+"""
+import base64
+import os
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import jsonify, make_response
+from sqlalchemy import delete, select, text, update
+from src.models.user import db
+from src.models.exclusao import Exclusao
+from src.utils.contadores import incrementar_versao
+from src.utils.paginacao import ParametroInvalido
+
+MARGEM_SINCRONIZACAO = timedelta(seconds=int(os.getenv('SINCRONIZACAO_MARGEM_S', '5')))
+RETENCAO_EXCLUSOES = timedelta(days=int(os.getenv('EXCLUSOES_RETENCAO_DIAS', '30')))
+TABELAS_SINCRONIZADAS = ('clientes', 'atividades', 'produtos')
+CABECALHO_TOKEN = 'X-Sync-Token'
+TROCA_CLIENTE_ATIVIDADE = 'atividades_cliente'
+
+
+def gerar_token(momento=None):
+    momento = momento or datetime.utcnow()
+    return base64.urlsafe_b64encode(momento.isoformat().encode('ascii')).decode('ascii').rstrip('=')
+
+
+def ler_token(valor):
+    """Momento do token; None para '0' (tudo, sem exclusões)"""
+    if valor in ('', '0'):
+        return None
+    try:
+        return datetime.fromisoformat(base64.urlsafe_b64decode(valor + '=' * (-len(valor) % 4)).decode('ascii'))
+    except (ValueError, UnicodeDecodeError):
+        raise ParametroInvalido('Token de sincronização inválido')
+
+
+def responder_alteracoes(query, modelo, projecao, valor_token):
+    """
+    Resposta de ?updated_since=: `query` já filtrada e projetada (linhas
+    alteradas que deixaram de atender aos filtros não aparecem).
+    """
+    desde = ler_token(valor_token)
+    if desde is not None and desde < datetime.utcnow() - RETENCAO_EXCLUSOES:
+        return jsonify({'error': 'Token de sincronização expirado; recarregue a lista completa'}), 410
+
+    # Gerado antes das consultas: o que for gravado durante elas vem na próxima
+    token = gerar_token()
+    excluidos = []
+    if desde is not None:
+        inicio = desde - MARGEM_SINCRONIZACAO
+        query = query.filter(modelo.atualizado_em >= inicio)
+        excluidos = db.session.execute(
+            select(Exclusao.registro_id).distinct()
+            .where(Exclusao.tabela == modelo.__tablename__, Exclusao.excluido_em >= inicio)
+        ).scalars().all()
+
+    linhas = query.order_by(modelo.atualizado_em, modelo.id).all()
+    return jsonify({
+        'items': [projecao.serializar(linha) for linha in linhas],
+        'deleted': sorted(excluidos),
+        'sync_token': token
+    })
+
+
+def com_token_sincronizacao(rota):
+    """Acrescenta X-Sync-Token às listagens comuns (ponto de partida do ?updated_since=)"""
+    @wraps(rota)
+    def envolvida(*args, **kwargs):
+        token = gerar_token()
+        resposta = make_response(rota(*args, **kwargs))
+        if resposta.status_code == 200 and CABECALHO_TOKEN not in resposta.headers:
+            resposta.headers[CABECALHO_TOKEN] = token
+        return resposta
+    return envolvida
+
+
+def _gatilhos_sqlite(tabela):
+    # Mesmo formato de data que o SQLAlchemy grava (texto ISO, UTC)
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {tabela}_exclusao AFTER DELETE ON {tabela} BEGIN "
+        f"INSERT INTO exclusoes (tabela, registro_id, excluido_em) "
+        f"VALUES ('{tabela}', old.id, strftime('%Y-%m-%d %H:%M:%f', 'now')); END"
+    ]
+
+
+def _gatilho_troca_cliente_sqlite():
+    return [
+        "CREATE TRIGGER IF NOT EXISTS atividades_troca_cliente AFTER UPDATE OF cliente_id ON atividades "
+        "WHEN old.cliente_id IS NOT NULL AND old.cliente_id IS NOT new.cliente_id BEGIN "
+        "INSERT INTO exclusoes (tabela, registro_id, excluido_em) "
+        f"VALUES ('{TROCA_CLIENTE_ATIVIDADE}', old.cliente_id, strftime('%Y-%m-%d %H:%M:%f', 'now')); END"
+    ]
+
+
+def _gatilhos_postgresql(tabela):
+    return [
+        "CREATE OR REPLACE FUNCTION registrar_exclusao() RETURNS trigger AS $$ BEGIN "
+        "INSERT INTO exclusoes (tabela, registro_id, excluido_em) "
+        "VALUES (TG_TABLE_NAME, OLD.id, now() AT TIME ZONE 'utc'); RETURN OLD; END $$ LANGUAGE plpgsql",
+        f"CREATE OR REPLACE TRIGGER {tabela}_exclusao AFTER DELETE ON {tabela} "
+        f"FOR EACH ROW EXECUTE FUNCTION registrar_exclusao()",
+    ]
+
+
+def _gatilho_troca_cliente_postgresql():
+    return [
+        "CREATE OR REPLACE FUNCTION registrar_troca_cliente() RETURNS trigger AS $$ BEGIN "
+        "INSERT INTO exclusoes (tabela, registro_id, excluido_em) "
+        f"VALUES ('{TROCA_CLIENTE_ATIVIDADE}', OLD.cliente_id, now() AT TIME ZONE 'utc'); RETURN NEW; END $$ "
+        "LANGUAGE plpgsql",
+        "CREATE OR REPLACE TRIGGER atividades_troca_cliente AFTER UPDATE OF cliente_id ON atividades "
+        "FOR EACH ROW WHEN (OLD.cliente_id IS NOT NULL AND OLD.cliente_id IS DISTINCT FROM NEW.cliente_id) "
+        "EXECUTE FUNCTION registrar_troca_cliente()",
+    ]
+
+
+def garantir_registro_exclusoes(db):
+    """
+    Cria os gatilhos que gravam em exclusoes cada linha excluída das
+    tabelas sincronizadas e o cliente anterior das atividades transferidas
+    """
+    gatilhos = {
+        'sqlite': (_gatilhos_sqlite, _gatilho_troca_cliente_sqlite),
+        'postgresql': (_gatilhos_postgresql, _gatilho_troca_cliente_postgresql),
+    }.get(db.engine.dialect.name)
+    if gatilhos is None:
+        return
+    exclusao, troca_cliente = gatilhos
+    with db.engine.begin() as conn:
+        for tabela in TABELAS_SINCRONIZADAS:
+            for instrucao in exclusao(tabela):
+                conn.execute(text(instrucao))
+        for instrucao in troca_cliente():
+            conn.execute(text(instrucao))
+
+
+def preencher_atualizado_em(db):
+    """
+    Preenche atualizado_em das linhas gravadas antes de a coluna existir
+    (o ADD COLUMN as deixa nulas e ?updated_since= nunca as devolveria).
+    Recebem o momento da migração, então aparecem no próximo delta de
+    qualquer token. Retorna quantas linhas foram preenchidas.
+    """
+    agora = datetime.utcnow()
+    total = 0
+    with db.engine.begin() as conn:
+        for nome in TABELAS_SINCRONIZADAS:
+            tabela = db.metadata.tables[nome]
+            preenchidas = conn.execute(
+                update(tabela).where(tabela.c.atualizado_em.is_(None)).values(atualizado_em=agora)
+            ).rowcount
+            if preenchidas:
+                # Respostas em cache (ETag) ainda trazem atualizado_em nulo
+                incrementar_versao(nome, conn)
+                total += preenchidas
+    return total
+
+
+def limpar_exclusoes(db):
+    """Apaga exclusões mais velhas que a retenção. Retorna quantas foram apagadas."""
+    resultado = db.session.execute(
+        delete(Exclusao).where(Exclusao.excluido_em < datetime.utcnow() - RETENCAO_EXCLUSOES)
+    )
+    db.session.commit()
+    return resultado.rowcount
@@ -0,0 +1,68 @@
+import json
+from flask import Response, stream_with_context
+
+MIMETYPE_NDJSON = 'application/x-ndjson'
+
+# Linhas buscadas do banco por vez e tamanho aproximado de cada bloco enviado
+TAMANHO_LOTE = 500
+TAMANHO_BLOCO = 64 * 1024
+
+
+def formato_stream(request):
+    """
+    Retorna 'ndjson' se o cliente pediu Accept: application/x-ndjson,
+    'json' se pediu ?stream=1 e None para a resposta comum.
+    """
+    if any(mimetype == MIMETYPE_NDJSON for mimetype, _ in request.accept_mimetypes):
+        return 'ndjson'
+    stream = request.args.get('stream', '').lower()
+    if stream == 'ndjson':
+        return 'ndjson'
+    if stream in ('1', 'true', 'json'):
+        return 'json'
+    return None
+
+
+def iterar_em_lotes(query, tamanho=TAMANHO_LOTE):
+    """Percorre a consulta buscando `tamanho` linhas por vez"""
+    return query.yield_per(tamanho)
+
+
+def _gerar_blocos(registros, serializar, formato):
+    separador = '\n' if formato == 'ndjson' else ','
+    bloco = ['['] if formato == 'json' else []
+    tamanho = 0
+    primeiro = True
+
+    for registro in registros:
+        linha = json.dumps(serializar(registro), ensure_ascii=False, separators=(',', ':'))
+        if formato == 'json' and not primeiro:
+            bloco.append(separador)
+        bloco.append(linha)
+        if formato == 'ndjson':
+            bloco.append(separador)
+        primeiro = False
+
+        tamanho += len(linha)
+        if tamanho >= TAMANHO_BLOCO:
+            yield ''.join(bloco).encode('utf-8')
+            bloco = []
+            tamanho = 0
+
+    if formato == 'json':
+        bloco.append(']')
+    if bloco:
+        yield ''.join(bloco).encode('utf-8')
+
+
+def resposta_stream(registros, serializar, formato):
+    """
+    Responde os registros como NDJSON ou array JSON, codificando cada linha
+    à medida que é lida, sem montar a lista inteira em memória.
+    `registros` deve ser iterável de forma preguiçosa (ex.: iterar_em_lotes).
+    """
+    mimetype = MIMETYPE_NDJSON if formato == 'ndjson' else 'application/json'
+    return Response(
+        stream_with_context(_gerar_blocos(registros, serializar, formato)),
+        mimetype=mimetype
+    )
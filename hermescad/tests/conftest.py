@@ -0,0 +1,33 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from src.main import create_app, init_db
+from src.models.user import db as _db
+
+
+@pytest.fixture
+def app(tmp_path):
+    """App com um banco SQLite novo (em arquivo: o envio de campanhas usa outras threads)"""
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'teste.db'}",
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'TESTING': True,
+    })
+    init_db(app)
+    with app.app_context():
+        yield app
+        _db.session.remove()
+        _db.engine.dispose()
+
+
+@pytest.fixture
+def db(app):
+    return _db
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
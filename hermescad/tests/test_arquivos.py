@@ -0,0 +1,85 @@
+import hashlib
+import io
+import threading
+from src.models.anexo import UploadParcial
+from src.services import arquivos
+
+
+class _CorpoEmEspera(io.BytesIO):
+    """Corpo que só começa a chegar depois de `liberar`"""
+
+    def __init__(self, conteudo, liberar):
+        super().__init__(conteudo)
+        self.liberar = liberar
+
+    def read(self, tamanho=-1):
+        self.liberar.wait(5)
+        return super().read(tamanho)
+
+
+def _iniciar(client, conteudo, **extra):
+    resposta = client.post('/api/mala_direta/uploads', json=dict(nome='a.bin', tamanho=len(conteudo), **extra))
+    assert resposta.status_code == 201, resposta.get_json()
+    return resposta.get_json()['upload_id']
+
+
+def test_parte_perdedora_nao_sobrescreve_a_vencedora(app, db):
+    conteudo = b'A' * 10 + b'B' * 10
+    with app.app_context():
+        upload = arquivos.iniciar_upload('a.bin', len(conteudo))
+        upload_id = upload.id
+    liberar = threading.Event()
+    erros = []
+
+    def perdedora():
+        with app.app_context():
+            atrasada = db.session.get(UploadParcial, upload_id)
+            try:
+                arquivos.gravar_parte(atrasada, 0, _CorpoEmEspera(b'X' * 10, liberar))
+            except arquivos.UploadConflito as e:
+                erros.append(e.recebido)
+
+    thread = threading.Thread(target=perdedora)
+    thread.start()
+    with app.app_context():
+        arquivos.gravar_parte(db.session.get(UploadParcial, upload_id), 0, io.BytesIO(conteudo[:10]))
+    liberar.set()
+    thread.join()
+
+    assert erros == [10]
+    with app.app_context():
+        anexo = arquivos.gravar_parte(db.session.get(UploadParcial, upload_id), 10, io.BytesIO(conteudo[10:]))
+        assert anexo.sha256 == hashlib.sha256(conteudo).hexdigest()
+
+
+def test_sha256_divergente_recomeca_o_upload(client, db):
+    conteudo = b'conteudo do arquivo'
+    upload_id = _iniciar(client, conteudo, sha256=hashlib.sha256(b'outro').hexdigest())
+
+    resposta = client.put(f'/api/mala_direta/uploads/{upload_id}', data=conteudo,
+                          headers={'Content-Range': f'bytes 0-{len(conteudo) - 1}/{len(conteudo)}'})
+
+    assert resposta.status_code == 400
+    assert resposta.get_json()['recebido'] == 0
+    assert client.get(f'/api/mala_direta/uploads/{upload_id}').get_json()['recebido'] == 0
+
+
+def test_sha256_conferido_vira_anexo(client, db):
+    conteudo = b'conteudo do arquivo'
+    upload_id = _iniciar(client, conteudo, sha256=hashlib.sha256(conteudo).hexdigest().upper())
+
+    resposta = client.put(f'/api/mala_direta/uploads/{upload_id}', data=conteudo,
+                          headers={'Content-Range': f'bytes 0-{len(conteudo) - 1}/{len(conteudo)}'})
+
+    assert resposta.status_code == 201
+    assert resposta.get_json()['sha256'] == hashlib.sha256(conteudo).hexdigest()
+
+
+def test_upload_simples_so_responde_413_para_tamanho(client, db, monkeypatch):
+    monkeypatch.setattr(arquivos, 'TAMANHO_MAXIMO', 4)
+
+    grande = client.post('/api/mala_direta/upload', data={'file': (io.BytesIO(b'12345'), 'a.bin')})
+    invalido = client.post('/api/mala_direta/uploads', json={'nome': 'a.bin', 'tamanho': 2, 'sha256': 'xyz'})
+
+    assert grande.status_code == 413
+    assert invalido.status_code == 400
@@ -0,0 +1,92 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from src.models.campanha import Campanha, CampanhaDestinatario
+from src.services import campanhas
+
+
+def _campanha(db, destinatarios=3, **valores):
+    campanha = Campanha(canal='email', assunto='Oferta', corpo='Olá', total_destinatarios=destinatarios, **valores)
+    db.session.add(campanha)
+    db.session.flush()
+    db.session.add_all([
+        CampanhaDestinatario(campanha_id=campanha.id, cliente_id=i + 1, destino=f'cliente{i}@example.com',
+                             status=CampanhaDestinatario.PENDENTE)
+        for i in range(destinatarios)
+    ])
+    db.session.commit()
+    return campanha
+
+
+def test_so_um_worker_reivindica_a_campanha(db):
+    campanha = _campanha(db)
+    assert campanhas._reivindicar(campanha.id)
+    assert not campanhas._reivindicar(campanha.id)
+    db.session.refresh(campanha)
+    assert campanha.status == Campanha.ENVIANDO
+
+
+def test_campanha_sem_heartbeat_e_interrompida_e_pode_ser_retomada(db):
+    campanha = _campanha(db, status=Campanha.ENVIANDO,
+                         heartbeat_em=datetime.utcnow() - campanhas.TEMPO_SEM_HEARTBEAT - timedelta(seconds=1))
+    campanhas.verificar_interrupcao(campanha)
+    assert campanha.status == Campanha.INTERROMPIDA
+    assert campanhas._reivindicar(campanha.id)
+
+
+def test_campanha_com_heartbeat_recente_nao_e_interrompida(db):
+    campanha = _campanha(db, status=Campanha.ENVIANDO, heartbeat_em=datetime.utcnow())
+    campanhas.verificar_interrupcao(campanha)
+    assert campanha.status == Campanha.ENVIANDO
+    assert not campanhas._reivindicar(campanha.id)
+
+
+class _EnvioLento:
+    """Envio falso cujo lote demora mais que TEMPO_SEM_HEARTBEAT"""
+    enviados = []
+
+    def __init__(self, campanha):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def enviar_lote(self, lote):
+        time.sleep(1.0)
+        self.enviados.extend(destinatario.destino for destinatario in lote)
+        return [None] * len(lote)
+
+    @staticmethod
+    def falha_de_conexao(erro):
+        return False
+
+
+def test_lote_demorado_renova_heartbeat_e_nao_e_reivindicado_por_outro_worker(app, db, monkeypatch):
+    monkeypatch.setattr(campanhas, 'TEMPO_SEM_HEARTBEAT', timedelta(seconds=0.4))
+    monkeypatch.setattr(campanhas, 'INTERVALO_HEARTBEAT', timedelta(seconds=0.1))
+    monkeypatch.setitem(campanhas.ENVIOS, 'email', _EnvioLento)
+    _EnvioLento.enviados = []
+    campanha = _campanha(db)
+    assert campanhas._reivindicar(campanha.id)
+
+    def enviar():
+        with app.app_context():
+            campanhas._enviar_pendentes(campanha.id)
+            db.session.remove()
+
+    worker = threading.Thread(target=enviar)
+    worker.start()
+    # Outro worker consultando a campanha no meio do lote
+    time.sleep(0.7)
+    campanhas.verificar_interrupcao(campanha)
+    assert campanha.status == Campanha.ENVIANDO
+    assert not campanhas._reivindicar(campanha.id)
+    worker.join()
+
+    db.session.refresh(campanha)
+    assert campanha.status == Campanha.CONCLUIDA
+    assert campanha.enviados == 3
+    assert sorted(_EnvioLento.enviados) == [f'cliente{i}@example.com' for i in range(3)]
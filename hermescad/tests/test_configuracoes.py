@@ -0,0 +1,32 @@
+import pytest
+from src.services.configuracoes import configuracoes
+from src.services.smtp import ConfiguracaoSMTP
+
+
+@pytest.mark.parametrize('campo, valor', [
+    ('email_taxa_por_segundo', 'abc'),
+    ('email_taxa_por_segundo', 0),
+    ('email_max_conexoes', 0),
+    ('email_max_conexoes', 2.5),
+    ('email_mensagens_por_conexao', True),
+    ('email_port', 70000),
+    ('email_use_tls', 'sim'),
+    ('cor_primaria', '#1234567'),
+])
+def test_valor_invalido_responde_400_sem_gravar(client, campo, valor):
+    resposta = client.post('/api/configuracoes_sistema', json={'email_server': 'smtp.example.com', campo: valor})
+
+    assert resposta.status_code == 400
+    assert campo in resposta.get_json()['error']
+    assert configuracoes.obter().email_server is None
+
+
+def test_valores_do_formulario_sao_convertidos(client):
+    resposta = client.post('/api/configuracoes_sistema', json={
+        'email_server': 'smtp.example.com', 'email_port': '2525', 'email_remetente': 'loja@example.com',
+        'email_taxa_por_segundo': '2.5', 'email_max_conexoes': 8, 'email_mensagens_por_conexao': '',
+    })
+
+    assert resposta.status_code == 200
+    smtp = ConfiguracaoSMTP.carregar()
+    assert (smtp.porta, smtp.taxa_por_segundo, smtp.max_conexoes, smtp.mensagens_por_conexao) == (2525, 2.5, 8, 100)
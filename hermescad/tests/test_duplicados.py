@@ -0,0 +1,94 @@
+from src.models.atividade import Atividade
+from src.models.cliente import Cliente
+from src.models.duplicidade import Duplicidade
+from src.services import duplicados
+
+
+def _clientes(db, *dados):
+    clientes = [Cliente(**valores) for valores in dados]
+    db.session.add_all(clientes)
+    db.session.commit()
+    return [cliente.id for cliente in clientes]
+
+
+def _pares(db):
+    return {(d.cliente_id, d.duplicado_id): d for d in Duplicidade.query.filter_by(status=Duplicidade.PENDENTE)}
+
+
+def test_chaves_normalizam_documento_email_telefone_e_nome():
+    chaves = duplicados.chaves_cliente('João da Silva', '123.456.789-09', ' Joao@Example.COM ', None, '(11) 98765-4321')
+    assert chaves == {
+        'documento:12345678909',
+        'email:joao@example.com',
+        'telefone:+5511987654321',
+        'telefone:+551187654321',
+        'nome:' + ' '.join(duplicados.fonetica(palavra) for palavra in ('joao', 'silva')),
+    }
+    assert duplicados.documento_normalizado('111.111.111-11') is None
+
+
+def test_detecta_variacoes_e_ignora_homonimos(db):
+    ana, copia, homonima, outro = _clientes(
+        db,
+        {'nome': 'Ana Lúcia Souza', 'cpf_cnpj': '12345678909', 'numero_celular': '(11) 98765-4321'},
+        {'nome': 'ANA LUCIA SOUZA', 'cpf_cnpj': '123.456.789-09'},
+        {'nome': 'Ana Lúcia Souza', 'cpf_cnpj': '98765432100'},
+        {'nome': 'Carlos Pereira', 'numero_celular': '+55 11 8765-4321'},
+    )
+
+    resultado = duplicados.detectar()
+
+    pares = _pares(db)
+    assert (ana, copia) in pares
+    assert 'documento' in pares[ana, copia].to_dict()['motivos']
+    # Mesmo nome com documentos válidos diferentes: pessoas diferentes
+    assert (ana, homonima) not in pares
+    # Só o telefone (sem o nono dígito) em comum não basta
+    assert (ana, outro) not in pares
+    assert resultado['sugestoes'] == len(pares)
+
+
+def test_par_ignorado_nao_volta_a_ser_sugerido(client, db):
+    ana, copia = _clientes(db, {'nome': 'Ana Souza', 'email': 'ana@example.com'},
+                           {'nome': 'Ana Souza', 'email': 'ANA@example.com '})
+    duplicados.detectar()
+    sugestao, = _pares(db).values()
+
+    assert client.post(f'/api/clientes/duplicados/{sugestao.id}/ignorar').status_code == 200
+    duplicados.detectar()
+
+    assert _pares(db) == {}
+    assert Duplicidade.query.filter_by(status=Duplicidade.IGNORADA).count() == 1
+
+
+def test_mesclar_completa_campos_move_atividades_e_exclui_o_duplicado(client, db):
+    ana, copia = _clientes(
+        db,
+        {'nome': 'Ana Souza', 'email': 'ana@example.com'},
+        {'nome': 'Ana S.', 'email': 'ana.souza@example.com', 'cpf_cnpj': '12345678909',
+         'numero_celular': '11987654321', 'possui_whatsapp': True},
+    )
+    db.session.add_all([Atividade(cliente_id=copia, tipo='Ligação'), Atividade(cliente_id=ana, tipo='Reunião')])
+    db.session.commit()
+    duplicados.detectar()
+
+    resposta = client.post(f'/api/clientes/{ana}/mesclar', json={'duplicado_id': copia})
+
+    assert resposta.status_code == 200
+    assert resposta.get_json()['atividades_transferidas'] == 1
+    db.session.expire_all()
+    cliente = db.session.get(Cliente, ana)
+    # O e-mail do cliente mantido não é trocado; os campos vazios são completados
+    assert (cliente.nome, cliente.email, cliente.cpf_cnpj, cliente.numero_celular, cliente.possui_whatsapp) == (
+        'Ana Souza', 'ana@example.com', '12345678909', '11987654321', True)
+    assert db.session.get(Cliente, copia) is None
+    assert {atividade.cliente_id for atividade in Atividade.query} == {ana}
+    assert Duplicidade.query.count() == 0
+
+
+def test_mesclar_valida_os_ids(client, db):
+    ana, = _clientes(db, {'nome': 'Ana'})
+
+    assert client.post(f'/api/clientes/{ana}/mesclar', json={'duplicado_id': ana}).status_code == 400
+    assert client.post(f'/api/clientes/{ana}/mesclar', json={'duplicado_id': 'x'}).status_code == 400
+    assert client.post(f'/api/clientes/{ana}/mesclar', json={'duplicado_id': 999}).status_code == 404
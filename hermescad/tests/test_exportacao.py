@@ -0,0 +1,34 @@
+import csv
+import io
+from openpyxl import load_workbook
+from src.models.cliente import Cliente
+
+
+def test_texto_com_cara_de_formula_sai_como_texto(client, db):
+    db.session.add(Cliente(nome='=HYPERLINK("http://x","clique")', cargo='+cmd|calc', numero_telefone='-1'))
+    db.session.commit()
+
+    texto = client.get('/api/export/clientes').get_data().decode('utf-8-sig')
+    planilha = load_workbook(io.BytesIO(client.get('/api/export/clientes?formato=xlsx').get_data())).active
+
+    cabecalho, valores = list(csv.reader(io.StringIO(texto), delimiter=';'))
+    linha_csv = dict(zip(cabecalho, valores))
+    assert linha_csv['nome'] == '\'=HYPERLINK("http://x","clique")'
+    assert (linha_csv['cargo'], linha_csv['numero_telefone']) == ("'+cmd|calc", "'-1")
+    linha = [celula.value for celula in planilha[2]]
+    assert '\'=HYPERLINK("http://x","clique")' in linha
+    assert all(celula.data_type != 'f' for celula in planilha[2])
+
+
+def test_reimportar_a_exportacao_tira_o_prefixo(client, db):
+    db.session.add(Cliente(nome='@Fulano', cargo='-'))
+    db.session.commit()
+    exportado = client.get('/api/export/clientes').get_data()
+    db.session.query(Cliente).delete()
+    db.session.commit()
+
+    resposta = client.post('/api/clientes/import', data={'file': (io.BytesIO(exportado), 'clientes.csv')})
+
+    assert resposta.status_code == 200, resposta.get_json()
+    cliente, = Cliente.query.all()
+    assert (cliente.nome, cliente.cargo) == ('@Fulano', '-')
@@ -0,0 +1,58 @@
+import io
+from openpyxl import Workbook
+from src.models.cliente import Cliente
+from src.services import importacao
+
+
+def _importar(client, conteudo, nome='clientes.csv'):
+    resposta = client.post('/api/clientes/import', data={'file': (io.BytesIO(conteudo), nome)})
+    assert resposta.status_code == 200, resposta.get_json()
+    return resposta.get_json()
+
+
+def test_reimportacao_atualiza_cliente_com_email_em_outra_caixa(client, db):
+    db.session.add(Cliente(nome='Fulano', email='Fulano@X.com'))
+    db.session.commit()
+
+    resultado = _importar(client, 'nome;email;cargo\nFulano de Tal;fulano@x.com;Diretor\n'.encode())
+
+    assert (resultado['inseridos'], resultado['atualizados']) == (0, 1)
+    cliente, = Cliente.query.all()
+    assert (cliente.nome, cliente.cargo) == ('Fulano de Tal', 'Diretor')
+
+
+def test_importacao_xlsx(client, db):
+    planilha = Workbook()
+    planilha.active.append(['Nome', 'E-mail', 'WhatsApp'])
+    planilha.active.append(['Ana', 'ANA@example.com', 'sim'])
+    arquivo = io.BytesIO()
+    planilha.save(arquivo)
+
+    resultado = _importar(client, arquivo.getvalue(), 'clientes.xlsx')
+
+    assert resultado['inseridos'] == 1 and resultado['com_erro'] == 0
+    cliente, = Cliente.query.all()
+    assert (cliente.email, cliente.possui_whatsapp) == ('ana@example.com', True)
+
+
+def test_lote_em_conflito_vira_erro_e_os_outros_lotes_seguem(client, db, monkeypatch):
+    monkeypatch.setattr(importacao, 'TAMANHO_LOTE', 1)
+    # Dois clientes antigos com o mesmo e-mail em caixas diferentes: gravar o
+    # e-mail em minúsculas num deles esbarra no UNIQUE do outro
+    db.session.add(Cliente(nome='Beto', email='beto@x.com'))
+    db.session.commit()
+    db.session.add(Cliente(nome='Beto Antigo', email='Beto@X.com'))
+    db.session.commit()
+
+    resultado = _importar(client, 'nome;email\nAna;ana@x.com\nBeto;beto@x.com\nCaio;caio@x.com\n'.encode())
+
+    assert (resultado['inseridos'], resultado['com_erro']) == (2, 1)
+    assert [erro['linha'] for erro in resultado['erros']] == [3]
+    assert {c.nome for c in Cliente.query.all()} == {'Ana', 'Beto', 'Beto Antigo', 'Caio'}
+
+
+def test_arquivo_xlsx_corrompido_retorna_400(client, db):
+    resposta = client.post('/api/clientes/import',
+                           data={'file': (io.BytesIO(b'nao e um zip'), 'clientes.xlsx')})
+
+    assert resposta.status_code == 400
@@ -0,0 +1,20 @@
+import pytest
+from flask import g
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+
+def test_instrucao_com_erro_nao_desalinha_as_medicoes(app, db):
+    with app.test_request_context():
+        app.preprocess_request()
+        with db.engine.connect() as conexao:
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    conexao.execute(text('SELECT * FROM tabela_que_nao_existe'))
+            conexao.execute(text('SELECT 1'))
+            # Nada pendurado na conexão, que volta ao pool
+            assert '_inicio_instrucao' not in conexao.info
+
+        medicao = g._medicao
+        assert medicao.consultas == 1
+        assert 0 <= medicao.tempo_sql < 1
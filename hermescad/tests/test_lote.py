@@ -0,0 +1,68 @@
+from src.models.produto import Produto
+
+
+def _produto(db, nome, preco=10.0):
+    produto = Produto(nome=nome, preco=preco)
+    db.session.add(produto)
+    db.session.commit()
+    return produto.id
+
+
+def _estado(db):
+    db.session.expire_all()
+    return sorted((produto.nome, produto.preco) for produto in Produto.query.all())
+
+
+def test_lote_valido_grava_tudo(client, db):
+    alterado = _produto(db, 'Caneta')
+    excluido = _produto(db, 'Lápis')
+
+    resposta = client.post('/api/produtos/batch', json={
+        'create': [{'nome': 'Caderno', 'preco': 25}, {'nome': 'Borracha', 'preco': '2.5'}],
+        'update': [{'id': alterado, 'preco': 12}],
+        'delete': [excluido],
+    })
+
+    assert resposta.status_code == 200
+    dados = resposta.get_json()
+    assert [item['item']['nome'] for item in dados['create']] == ['Caderno', 'Borracha']
+    assert dados['update'][0]['item']['preco'] == 12
+    assert dados['delete'] == [{'index': 0, 'id': excluido}]
+    assert _estado(db) == [('Borracha', 2.5), ('Caderno', 25.0), ('Caneta', 12.0)]
+
+
+def test_um_item_invalido_rejeita_o_lote_inteiro(client, db):
+    existente = _produto(db, 'Caneta')
+
+    resposta = client.post('/api/produtos/batch', json={
+        'create': [{'nome': 'Caderno', 'preco': 25}, {'nome': 'Sem preço'}],
+        'update': [{'id': existente, 'preco': 'caro'}, {'id': 999, 'preco': 1}],
+        'delete': [existente],
+    })
+
+    assert resposta.status_code == 400
+    dados = resposta.get_json()
+    assert dados['create'] == [{'index': 1, 'error': 'preco é obrigatório'}]
+    assert dados['update'] == [
+        {'index': 0, 'error': 'preco deve ser um número'},
+        {'index': 1, 'id': 999, 'error': 'Registro não encontrado'},
+    ]
+    assert dados['delete'] == [{'index': 0, 'error': 'id repetido no lote'}]
+    assert _estado(db) == [('Caneta', 10.0)]
+
+
+def test_violacao_de_unicidade_desfaz_o_lote(client, db):
+    _produto(db, 'Caneta')
+
+    resposta = client.post('/api/produtos/batch', json={
+        'create': [{'nome': 'Caderno', 'preco': 25}, {'nome': 'Caneta', 'preco': 1}],
+    })
+
+    assert resposta.status_code == 409
+    assert _estado(db) == [('Caneta', 10.0)]
+
+
+def test_lote_vazio_ou_mal_formado(client):
+    assert client.post('/api/produtos/batch', json={}).status_code == 400
+    assert client.post('/api/produtos/batch', json={'create': {'nome': 'x'}}).status_code == 400
+    assert client.post('/api/produtos/batch', data='x', content_type='application/json').status_code == 400
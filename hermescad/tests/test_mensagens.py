@@ -0,0 +1,43 @@
+from src.services.mensagens import CacheAnexos, ConstrutorMensagem
+
+
+def _arquivo(tmp_path, nome, tamanho):
+    caminho = tmp_path / nome
+    caminho.write_bytes(nome.encode() * (tamanho // len(nome)))
+    return str(caminho)
+
+
+def test_hashes_saem_do_cache_junto_com_as_partes(tmp_path):
+    cache = CacheAnexos(limite_bytes=6000)
+    a = _arquivo(tmp_path, 'a.bin', 3000)
+    b = _arquivo(tmp_path, 'b.bin', 3000)
+
+    parte_a = cache.obter(a, 'a.bin')
+    assert cache.obter(a, 'a.bin') is parte_a
+    cache.obter(b, 'b.bin')
+
+    # Cada parte codificada tem mais de 3000 bytes: b expulsa a, e o hash de a sai junto
+    assert [nome for _, nome in cache._itens] == ['b.bin']
+    assert [caminho for caminho, _, _ in cache._hashes] == [b]
+    assert list(cache._arquivos) == [sha for sha, _ in cache._itens]
+
+
+def test_hash_fica_enquanto_o_conteudo_esta_no_cache_com_outro_nome(tmp_path):
+    cache = CacheAnexos(limite_bytes=10000)
+    a = _arquivo(tmp_path, 'a.bin', 3000)
+    cache.obter(a, 'a.bin')
+    cache.obter(a, 'copia.bin')
+    cache.obter(_arquivo(tmp_path, 'b.bin', 3000), 'b.bin')
+
+    assert [nome for _, nome in cache._itens] == ['copia.bin', 'b.bin']
+    assert a in [caminho for caminho, _, _ in cache._hashes]
+
+
+def test_quebra_de_linha_no_destino_nao_injeta_cabecalho():
+    construtor = ConstrutorMensagem('loja@example.com', 'Oferta', 'Olá', [])
+
+    mensagem = construtor.montar('cliente@example.com\r\nBcc: todos@example.com').as_bytes()
+
+    cabecalho = mensagem.split(b'\r\n\r\n', 1)[0]
+    assert b'To: cliente@example.comBcc: todos@example.com\r\n' in cabecalho
+    assert b'\r\nBcc:' not in cabecalho
@@ -0,0 +1,48 @@
+from datetime import timedelta
+from src.models.segmento import Segmento
+from src.services import segmentos
+from src.utils import sincronizacao
+
+
+def _criar(client, url, dados):
+    resposta = client.post(url, json=dados)
+    assert resposta.status_code == 201, resposta.get_json()
+    return resposta.get_json()['id']
+
+
+def _membros(client, segmento_id):
+    return [item['id'] for item in client.get(f'/api/segmentos/{segmento_id}/clientes').get_json()['items']]
+
+
+def test_atividade_transferida_tira_o_cliente_anterior_do_segmento(client, db, monkeypatch):
+    monkeypatch.setattr(segmentos, 'MARGEM_SINCRONIZACAO', timedelta(0))
+    ana = _criar(client, '/api/clientes', {'nome': 'Ana'})
+    bruno = _criar(client, '/api/clientes', {'nome': 'Bruno'})
+    atividade = _criar(client, '/api/atividades', {
+        'cliente_id': ana, 'tipo': 'Visita', 'status': 'Pendente', 'data_hora': '2026-01-10T10:00:00'
+    })
+    segmento = _criar(client, '/api/segmentos', {
+        'nome': 'Com visita pendente', 'materializado': True, 'filtros': {'atividade_status': 'Pendente'}
+    })
+    assert _membros(client, segmento) == [ana]
+
+    resposta = client.post('/api/atividades/batch', json={'update': [{'id': atividade, 'cliente_id': bruno}]})
+    assert resposta.status_code == 200, resposta.get_json()
+
+    # GET não grava: os membros continuam os da última atualização
+    assert _membros(client, segmento) == [ana]
+    assert client.post(f'/api/segmentos/{segmento}/atualizar').get_json()['total'] == 1
+    assert _membros(client, segmento) == [bruno]
+
+
+def test_get_do_segmento_nao_recalcula(client, db):
+    _criar(client, '/api/clientes', {'nome': 'Ana'})
+    segmento_id = _criar(client, '/api/segmentos', {'nome': 'Todos', 'materializado': True, 'filtros': {}})
+    calculado_em = db.session.get(Segmento, segmento_id).calculado_em
+    _criar(client, '/api/clientes', {'nome': 'Bruno'})
+
+    dados = client.get(f'/api/segmentos/{segmento_id}').get_json()
+
+    assert dados['total'] == 1
+    db.session.expire_all()
+    assert db.session.get(Segmento, segmento_id).calculado_em == calculado_em
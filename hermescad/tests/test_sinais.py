@@ -0,0 +1,24 @@
+from src.models.produto import Produto
+from src.utils.sinais import entidade_alterada
+
+
+def test_falha_de_assinante_nao_afeta_a_gravacao(client, db):
+    avisados = []
+
+    def quebrado(sender, **kwargs):
+        raise RuntimeError('cache indisponível')
+
+    def registrar(sender, **kwargs):
+        avisados.append((sender, kwargs['acao']))
+
+    entidade_alterada.connect(quebrado)
+    entidade_alterada.connect(registrar)
+    try:
+        resposta = client.post('/api/produtos', json={'nome': 'Caneta', 'preco': 2})
+    finally:
+        entidade_alterada.disconnect(quebrado)
+        entidade_alterada.disconnect(registrar)
+
+    assert resposta.status_code == 201
+    assert Produto.query.count() == 1
+    assert avisados == [('produto', 'create')]
@@ -0,0 +1,70 @@
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from src.models.cliente import Cliente
+from src.utils import sincronizacao
+from src.utils.esquema import migrar
+
+
+def _criar_cliente(client, nome):
+    resposta = client.post('/api/clientes', json={'nome': nome})
+    assert resposta.status_code == 201
+    return resposta.get_json()['id']
+
+
+def test_delta_traz_alteracoes_e_exclusoes_desde_o_token(client, monkeypatch):
+    monkeypatch.setattr(sincronizacao, 'MARGEM_SINCRONIZACAO', timedelta(0))
+    inalterado = _criar_cliente(client, 'Ana')
+    alterado = _criar_cliente(client, 'Bruno')
+    excluido = _criar_cliente(client, 'Carla')
+    token = client.get('/api/clientes').headers['X-Sync-Token']
+    time.sleep(0.01)
+
+    assert client.put(f'/api/clientes/{alterado}', json={'nome': 'Bruno Souza'}).status_code == 200
+    assert client.delete(f'/api/clientes/{excluido}').status_code == 200
+    novo = _criar_cliente(client, 'Diego')
+
+    delta = client.get(f'/api/clientes?updated_since={token}').get_json()
+    assert [item['id'] for item in delta['items']] == [alterado, novo]
+    assert delta['items'][0]['nome'] == 'Bruno Souza'
+    assert delta['deleted'] == [excluido]
+    assert inalterado not in delta['deleted']
+
+    # O novo token não repete o que já foi entregue
+    time.sleep(0.01)
+    seguinte = client.get(f"/api/clientes?updated_since={delta['sync_token']}").get_json()
+    assert seguinte['items'] == [] and seguinte['deleted'] == []
+
+
+def test_token_expirado_ou_invalido(client):
+    expirado = sincronizacao.gerar_token(datetime.utcnow() - sincronizacao.RETENCAO_EXCLUSOES - timedelta(days=1))
+    assert client.get(f'/api/clientes?updated_since={expirado}').status_code == 410
+    assert client.get('/api/clientes?updated_since=xyz').status_code == 400
+
+
+def test_migracao_preenche_atualizado_em_nulo(client, db, monkeypatch):
+    monkeypatch.setattr(sincronizacao, 'MARGEM_SINCRONIZACAO', timedelta(0))
+    id = _criar_cliente(client, 'Ana')
+    # Linha gravada antes de a coluna existir
+    with db.engine.begin() as conn:
+        conn.execute(update(Cliente.__table__).values(atualizado_em=None))
+    token = sincronizacao.gerar_token()
+    time.sleep(0.01)
+
+    alteracoes = migrar(db, forcar=True)
+
+    assert 'atualizado_em preenchido em 1 linha(s)' in alteracoes
+    delta = client.get(f'/api/clientes?updated_since={token}').get_json()
+    assert [item['id'] for item in delta['items']] == [id]
+    assert delta['items'][0]['atualizado_em'] is not None
+
+
+def test_agenda_devolve_datas_em_iso_8601(client):
+    resposta = client.post('/api/atividades', json={'tipo': 'Ligação', 'data_hora': '2026-03-10T14:30:00'})
+    assert resposta.status_code == 201
+
+    agenda = client.get('/api/atividades/agenda?from=2026-03-10&to=2026-03-10').get_json()
+
+    item, = agenda['items']
+    assert item['data_hora'] == '2026-03-10T14:30:00'
+    datetime.fromisoformat(item['atualizado_em'])
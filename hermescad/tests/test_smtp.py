@@ -0,0 +1,71 @@
+import smtplib
+from types import SimpleNamespace
+
+import pytest
+
+from src.services import smtp as modulo_smtp
+
+
+class _SMTPFalso:
+    extensoes = set()
+    falha_login = None
+    abertos = []
+
+    def __init__(self, *args, **kwargs):
+        self.fechado = False
+        self.chamadas = []
+        _SMTPFalso.abertos.append(self)
+
+    def ehlo(self):
+        self.chamadas.append('ehlo')
+
+    def has_extn(self, nome):
+        return nome in self.extensoes
+
+    def starttls(self):
+        self.chamadas.append('starttls')
+
+    def login(self, usuario, senha):
+        self.chamadas.append('login')
+        if self.falha_login:
+            raise self.falha_login
+
+    def close(self):
+        self.fechado = True
+
+
+def _config(**valores):
+    padrao = dict(servidor='smtp.exemplo', porta=587, timeout=5, usar_tls=True,
+                  usuario='conta', senha='segredo')
+    padrao.update(valores)
+    return SimpleNamespace(**padrao)
+
+
+@pytest.fixture
+def smtp_falso(monkeypatch):
+    _SMTPFalso.abertos = []
+    _SMTPFalso.extensoes = set()
+    _SMTPFalso.falha_login = None
+    monkeypatch.setattr(modulo_smtp.smtplib, 'SMTP', _SMTPFalso)
+    return _SMTPFalso
+
+
+def test_tls_exigido_sem_starttls_nao_envia_a_senha(smtp_falso):
+    with pytest.raises(smtplib.SMTPNotSupportedError):
+        modulo_smtp._Conexao(_config())._abrir()
+
+    conexao, = smtp_falso.abertos
+    assert 'login' not in conexao.chamadas
+    assert conexao.fechado
+
+
+def test_login_recusado_fecha_o_socket(smtp_falso):
+    smtp_falso.extensoes = {'starttls'}
+    smtp_falso.falha_login = smtplib.SMTPAuthenticationError(535, b'recusado')
+
+    with pytest.raises(smtplib.SMTPAuthenticationError):
+        modulo_smtp._Conexao(_config())._abrir()
+
+    conexao, = smtp_falso.abertos
+    assert conexao.chamadas == ['ehlo', 'starttls', 'ehlo', 'login']
+    assert conexao.fechado
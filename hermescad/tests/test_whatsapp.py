@@ -0,0 +1,68 @@
+import time
+import pytest
+from src.services import whatsapp
+from src.services.whatsapp import ConfiguracaoWhatsApp, DespachoWhatsApp, ErroProvedor, falha_de_conexao
+
+
+class _ProvedorFalso(whatsapp.ProvedorWhatsApp):
+    """Responde conforme `respostas[destino]`: lista de status HTTP, um por tentativa (200 = enviada)"""
+
+    def __init__(self, respostas):
+        super().__init__(None)
+        self.respostas = respostas
+        self.tentativas = {}
+
+    def enviar_mensagem(self, destino, texto, midia_id=None):
+        tentativa = self.tentativas[destino] = self.tentativas.get(destino, 0) + 1
+        status = self.respostas[destino][min(tentativa, len(self.respostas[destino])) - 1]
+        if status != 200:
+            raise ErroProvedor(f'{status}: erro', status, 0)
+        return f'msg-{destino}'
+
+    def enviar_midia(self, caminho, nome=None):
+        return 'midia-1'
+
+
+def _despachar(respostas, monkeypatch):
+    monkeypatch.setattr(time, 'sleep', lambda segundos: None)
+    config = ConfiguracaoWhatsApp(url_api='http://teste', token='x', numero_id='1',
+                                  taxa_por_segundo=0, tentativas=3, max_conexoes=2)
+    provedor = _ProvedorFalso(respostas)
+    with DespachoWhatsApp(config, provedor) as despacho:
+        resultados = despacho.enviar_lote([(destino, 'Olá', None) for destino in respostas])
+    return resultados, provedor
+
+
+def test_429_isolado_e_tentado_de_novo_e_so_falha_o_destinatario(monkeypatch):
+    resultados, provedor = _despachar({
+        '+5511900000001': [200],
+        '+5511900000002': [429, 200],
+        '+5511900000003': [429],
+    }, monkeypatch)
+
+    assert resultados[:2] == ['msg-+5511900000001', 'msg-+5511900000002']
+    assert provedor.tentativas['+5511900000003'] == 3
+    assert isinstance(resultados[2], ErroProvedor)
+    assert not falha_de_conexao(resultados[2])
+
+
+def test_lote_inteiro_recusado_interrompe_a_campanha(monkeypatch):
+    resultados, _ = _despachar({'+5511900000001': [503], '+5511900000002': [429]}, monkeypatch)
+
+    assert all(falha_de_conexao(resultado) for resultado in resultados)
+
+
+def test_erros_de_transporte_e_credenciais_interrompem_a_campanha():
+    assert falha_de_conexao(ConnectionRefusedError())
+    assert falha_de_conexao(ErroProvedor('sem resposta'))
+    assert falha_de_conexao(ErroProvedor('401: token inválido', 401))
+    assert not falha_de_conexao(ErroProvedor('400: número inválido', 400))
+
+
+def test_provedor_sem_os_metodos_falha_ao_instanciar():
+    class _SoMensagem(whatsapp.ProvedorWhatsApp):
+        def enviar_mensagem(self, destino, texto, midia_id=None):
+            return 'msg'
+
+    with pytest.raises(TypeError):
+        _SoMensagem(None)
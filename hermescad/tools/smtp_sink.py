@@ -0,0 +1,127 @@
+"""
+Servidor SMTP local que aceita e descarta mensagens, para testar o envio
+de campanhas sem um provedor real.
+
+    python tools/smtp_sink.py --porta 1025
+    SMTP_SERVER=localhost SMTP_PORT=1025 EMAIL_FROM=crm@example.com python src/main.py
+
+Também pode ser usado a partir de scripts de benchmark:
+
+    sink = SmtpSink(porta=0, latencia=0.005)
+    sink.iniciar()
+    ... sink.porta, sink.mensagens ...
+    sink.parar()
+"""
+import argparse
+import random
+import socketserver
+import threading
+import time
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def _responder(self, linha):
+        if self.server.sink.latencia:
+            time.sleep(self.server.sink.latencia)
+        self.wfile.write(linha.encode('ascii') + b'\r\n')
+        self.wfile.flush()
+
+    def handle(self):
+        sink = self.server.sink
+        sink._registrar('conexoes')
+        self._responder('220 smtp-sink pronto')
+        while True:
+            linha = self.rfile.readline()
+            if not linha:
+                return
+            comando = linha.decode('latin-1').strip()
+            verbo = comando.split(' ', 1)[0].upper()
+
+            if verbo == 'EHLO':
+                self.wfile.write(b'250-smtp-sink\r\n250-8BITMIME\r\n')
+                self._responder('250 SIZE 52428800')
+            elif verbo == 'HELO':
+                self._responder('250 smtp-sink')
+            elif verbo == 'MAIL':
+                if sink.taxa_falha and random.random() < sink.taxa_falha:
+                    self._responder('451 4.3.0 Falha temporaria simulada')
+                else:
+                    self._responder('250 OK')
+            elif verbo == 'RCPT':
+                self._responder('250 OK')
+            elif verbo == 'DATA':
+                self._responder('354 Envie a mensagem; termine com <CRLF>.<CRLF>')
+                tamanho = 0
+                while True:
+                    parte = self.rfile.readline()
+                    if not parte or parte in (b'.\r\n', b'.\n'):
+                        break
+                    tamanho += len(parte)
+                sink._registrar('mensagens', tamanho)
+                self._responder('250 OK mensagem aceita')
+            elif verbo in ('RSET', 'NOOP'):
+                self._responder('250 OK')
+            elif verbo == 'QUIT':
+                self._responder('221 Tchau')
+                return
+            else:
+                self._responder('502 Comando nao implementado')
+
+
+class _Servidor(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class SmtpSink:
+
+    def __init__(self, host='127.0.0.1', porta=1025, latencia=0.0, taxa_falha=0.0):
+        self.host = host
+        self.porta = porta
+        self.latencia = latencia
+        self.taxa_falha = taxa_falha
+        self.mensagens = 0
+        self.conexoes = 0
+        self.bytes_recebidos = 0
+        self._lock = threading.Lock()
+        self._servidor = None
+
+    def _registrar(self, contador, tamanho=0):
+        with self._lock:
+            setattr(self, contador, getattr(self, contador) + 1)
+            self.bytes_recebidos += tamanho
+
+    def iniciar(self):
+        self._servidor = _Servidor((self.host, self.porta), _Handler)
+        self._servidor.sink = self
+        self.porta = self._servidor.server_address[1]
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self
+
+    def parar(self):
+        if self._servidor:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor SMTP local que descarta as mensagens')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=1025)
+    parser.add_argument('--latencia', type=float, default=0.0, help='atraso (s) antes de cada resposta')
+    parser.add_argument('--taxa-falha', type=float, default=0.0, help='fração de MAIL FROM respondidos com 451')
+    args = parser.parse_args()
+
+    sink = SmtpSink(args.host, args.porta, args.latencia, args.taxa_falha).iniciar()
+    print(f'smtp-sink ouvindo em {args.host}:{sink.porta}')
+    try:
+        while True:
+            time.sleep(5)
+            print(f'{sink.mensagens} mensagens, {sink.conexoes} conexões, {sink.bytes_recebidos} bytes')
+    except KeyboardInterrupt:
+        sink.parar()
+
+
+if __name__ == '__main__':
+    main()
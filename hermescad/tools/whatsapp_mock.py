@@ -0,0 +1,155 @@
+"""
+Provedor WhatsApp local (no formato da Cloud API do WhatsApp Business)
+que aceita e descarta as mensagens, para testar as campanhas sem um
+provedor real.
+
+    python tools/whatsapp_mock.py --porta 8025
+    WHATSAPP_API_URL=http://localhost:8025/v19.0 WHATSAPP_TOKEN=teste \\
+        WHATSAPP_NUMERO_ID=100 python src/main.py
+
+Também pode ser usado a partir de scripts de benchmark:
+
+    mock = WhatsAppMock(porta=0, latencia=0.02)
+    mock.iniciar()
+    ... mock.url, mock.mensagens, mock.midias ...
+    mock.parar()
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Conexões persistentes, como as do provedor real
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _responder(self, status, dados, cabecalhos=None):
+        corpo = json.dumps(dados).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _erro(self, status, mensagem, cabecalhos=None):
+        self._responder(status, {'error': {'message': mensagem, 'code': status}}, cabecalhos)
+
+    def do_POST(self):
+        mock = self.server.mock
+        corpo = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if mock.latencia:
+            time.sleep(mock.latencia)
+
+        if self.headers.get('Authorization', '') != f'Bearer {mock.token}':
+            return self._erro(401, 'Token de acesso inválido')
+        if not mock.consumir_taxa():
+            mock._registrar('limitadas')
+            return self._erro(429, 'Limite de mensagens por segundo excedido', {'Retry-After': '1'})
+        if mock.taxa_falha and random.random() < mock.taxa_falha:
+            return self._erro(503, 'Falha temporária simulada')
+
+        recurso = self.path.rstrip('/').rsplit('/', 1)[-1]
+        if recurso == 'media':
+            numero = mock._registrar('midias', len(corpo))
+            return self._responder(200, {'id': f'midia-{numero}'})
+        if recurso == 'messages':
+            try:
+                mensagem = json.loads(corpo)
+                destino = mensagem['to']
+            except (ValueError, KeyError, TypeError):
+                return self._erro(400, 'Corpo inválido')
+            if not destino.isdigit():
+                return self._erro(400, f'Número inválido: {destino}')
+            numero = mock._registrar('mensagens', len(corpo))
+            return self._responder(200, {
+                'messaging_product': 'whatsapp',
+                'contacts': [{'input': destino, 'wa_id': destino}],
+                'messages': [{'id': f'wamid.mock-{numero}'}]
+            })
+        self._erro(404, 'Recurso desconhecido')
+
+
+class WhatsAppMock:
+
+    def __init__(self, host='127.0.0.1', porta=8025, latencia=0.0, taxa_falha=0.0, limite_taxa=0, token='teste'):
+        self.host = host
+        self.porta = porta
+        self.latencia = latencia
+        self.taxa_falha = taxa_falha
+        # Requisições aceitas por segundo (0 = sem limite); as demais recebem 429
+        self.limite_taxa = limite_taxa
+        self.token = token
+        self.mensagens = 0
+        self.midias = 0
+        self.limitadas = 0
+        self.bytes_recebidos = 0
+        self._lock = threading.Lock()
+        self._janela = (0, 0)
+        self._servidor = None
+
+    @property
+    def url(self):
+        return f'http://{self.host}:{self.porta}/v19.0'
+
+    def _registrar(self, contador, tamanho=0):
+        with self._lock:
+            valor = getattr(self, contador) + 1
+            setattr(self, contador, valor)
+            self.bytes_recebidos += tamanho
+            return valor
+
+    def consumir_taxa(self):
+        if not self.limite_taxa:
+            return True
+        with self._lock:
+            segundo, usadas = self._janela
+            agora = int(time.monotonic())
+            if agora != segundo:
+                segundo, usadas = agora, 0
+            self._janela = (segundo, usadas + 1)
+            return usadas < self.limite_taxa
+
+    def iniciar(self):
+        self._servidor = ThreadingHTTPServer((self.host, self.porta), _Handler)
+        self._servidor.daemon_threads = True
+        self._servidor.mock = self
+        self.porta = self._servidor.server_address[1]
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self
+
+    def parar(self):
+        if self._servidor:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Provedor WhatsApp local que descarta as mensagens')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8025)
+    parser.add_argument('--latencia', type=float, default=0.0, help='atraso (s) antes de cada resposta')
+    parser.add_argument('--taxa-falha', type=float, default=0.0, help='fração de requisições respondidas com 503')
+    parser.add_argument('--limite-taxa', type=int, default=0, help='requisições aceitas por segundo (0 = sem limite)')
+    parser.add_argument('--token', default='teste', help='token esperado no cabeçalho Authorization')
+    args = parser.parse_args()
+
+    mock = WhatsAppMock(args.host, args.porta, args.latencia, args.taxa_falha, args.limite_taxa, args.token).iniciar()
+    print(f'whatsapp-mock ouvindo em {mock.url}')
+    try:
+        while True:
+            time.sleep(5)
+            print(f'{mock.mensagens} mensagens, {mock.midias} mídias, {mock.limitadas} limitadas (429)')
+    except KeyboardInterrupt:
+        mock.parar()
+
+
+if __name__ == '__main__':
+    main()
@@ -51,7 +51,7 @@ source venv/bin/activate || log_error "Falha ao ativar ambiente virtual."
 pip install -r requirements.txt || log_error "Falha ao instalar dependências Python."
 pip install gunicorn || log_error "Falha ao instalar Gunicorn."
 
-# Criar o banco de dados (se não existir)
+# Criar ou atualizar o esquema do banco de dados (o app não faz isso ao iniciar)
 python src/main.py init_db || log_error "Falha ao inicializar o banco de dados."
 
 # --- 5. Build do Frontend (React) ---
@@ -78,15 +78,38 @@ After=network.target
 User=nginx # Ou um usuário dedicado, como 'hermescaduser'
 Group=nginx # Ou um grupo dedicado
 WorkingDirectory=$PROJECT_DIR/hermescad
-ExecStart=$PROJECT_DIR/hermescad/venv/bin/gunicorn --workers 3 --bind unix:$PROJECT_DIR/hermescad/hermescad.sock -m 007 src.main:app
+Environment=EVENTOS_SOCKET=$PROJECT_DIR/hermescad/eventos.sock
+ExecStart=$PROJECT_DIR/hermescad/venv/bin/gunicorn --workers 3 --threads 4 --timeout 120 --preload --bind unix:$PROJECT_DIR/hermescad/hermescad.sock -m 007 'src.main:create_app()'
 Restart=always
 
 [Install]
 WantedBy=multi-user.target
 EOF
 
-# Habilitar e iniciar o serviço Gunicorn
+# Servidor do feed /api/events (SSE): as conexões abertas ficam num único
+# processo asyncio em vez de prender threads dos workers do Gunicorn
+cat <<EOF > /etc/systemd/system/hermescad-eventos.service
+[Unit]
+Description=HermesCad CRM - feed de eventos (SSE)
+After=network.target
+Before=hermescad.service
+
+[Service]
+User=nginx
+Group=nginx
+WorkingDirectory=$PROJECT_DIR/hermescad
+Environment=EVENTOS_SOCKET=$PROJECT_DIR/hermescad/eventos.sock
+ExecStart=$PROJECT_DIR/hermescad/venv/bin/python -m src.services.servidor_eventos --unix $PROJECT_DIR/hermescad/sse.sock
+Restart=always
+
+[Install]
+WantedBy=multi-user.target
+EOF
+
+# Habilitar e iniciar os serviços
 systemctl daemon-reload
+systemctl start hermescad-eventos
+systemctl enable hermescad-eventos || log_error "Falha ao habilitar o serviço de eventos."
 systemctl start hermescad
 systemctl enable hermescad || log_error "Falha ao habilitar o serviço Gunicorn."
 
@@ -98,12 +121,24 @@ cat <<EOF > /etc/nginx/conf.d/hermescad.conf
 server {
     listen 80;
     server_name seu_dominio.com; # **ATUALIZE COM SEU DOMÍNIO OU IP DO SERVIDOR**
+    # Mesmo limite do MAX_CONTENT_LENGTH do app (anexos e importações)
+    client_max_body_size 110m;
 
     location /static/ {
         alias $PROJECT_DIR/hermescad/src/static/;
         try_files \$uri \$uri/ =404;
     }
 
+    # Feed de eventos: conexão longa, sem buffer
+    location /api/events {
+        proxy_pass http://unix:$PROJECT_DIR/hermescad/sse.sock;
+        proxy_http_version 1.1;
+        proxy_set_header Connection '';
+        proxy_buffering off;
+        proxy_cache off;
+        proxy_read_timeout 1h;
+    }
+
     location / {
         proxy_pass http://unix:$PROJECT_DIR/hermescad/hermescad.sock;
         proxy_set_header Host \$host;